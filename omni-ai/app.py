@@ -1,37 +1,468 @@
-from flask import Flask, request, jsonify
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO, TextIOWrapper
+
+_boot_t0 = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, send_file, abort, url_for, stream_with_context, g
 from flask_cors import CORS
 
-from services.schedule import generate_schedule
-from services.summary import generate_daily_summary
+from services.finance import analyze_finances, analyze_finances_batch
+from services.ledger import analyze_ledger, iter_csv, iter_ndjson
 from services.tasks import optimize_tasks
-from services.health import analyze_health
+from services.task_index import delete_task, list_tasks, load_tasks, next_tasks, update_task, upsert_task
+from services.health import analyze_health, analyze_health_batch, rows_to_columns
+from utils import gemini, metrics, singleflight
+from utils.image_store import image_store
+
+# The schedule / summary services pull in PIL and the renderer, and gemini only
+# loads google-genai on the first model call: both are imported on first use so the
+# rule-based routes boot fast and work without GENAI_API_KEY.
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
+IMAGE_MAX_AGE_S = 365 * 24 * 3600
+
+# Add a Server-Timing header with the per-stage breakdown of each request
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+@app.before_request
+def _start_timing():
+    g.t0 = time.perf_counter()
+    g.trace = metrics.start_trace() if SERVER_TIMING else None
+
+@app.after_request
+def _finish_timing(resp):
+    elapsed = time.perf_counter() - g.t0
+    metrics.observe(f"http:{request.endpoint or 'unmatched'}", elapsed)
+    if g.trace is not None:
+        trace = metrics.end_trace(g.trace)
+        trace["total"] = elapsed
+        resp.headers["Server-Timing"] = metrics.server_timing(trace)
+    return resp
+
+def _with_images(result: dict, *fields) -> dict:
+    """
+    Replace image bytes in `fields` with a short /ai/images/<id> URL,
+    or with the legacy data URL when the request has ?inline=1.
+    """
+    from utils.image_utils import to_data_url
+
+    inline = request.args.get("inline", "").lower() in ("1", "true", "yes")
+    out = dict(result)
+    for field in fields:
+        raw = out.get(field)
+        if isinstance(raw, bytes):
+            with metrics.timer("image.encode"):
+                out[field] = to_data_url(raw) if inline else url_for("image", image_id=image_store.put(raw), _external=True)
+    return out
+
+# ---------- admission control ----------
+# Model-bound requests are admitted by load: model calls queued at the limiter and
+# model-bound requests in progress in this process. At a soft limit they get the
+# deterministic result without model calls; at a hard limit a fast 503 with Retry-After.
+# The limits are per worker process; the defaults follow this worker's share of the limiter.
+ADMISSION_SOFT_QUEUE = int(os.getenv("ADMISSION_SOFT_QUEUE", str(max(1, gemini.limiter.max_waiting // 4))))
+ADMISSION_HARD_QUEUE = int(os.getenv("ADMISSION_HARD_QUEUE", str(max(1, gemini.limiter.max_waiting * 3 // 4))))
+ADMISSION_SOFT_ACTIVE = int(os.getenv("ADMISSION_SOFT_ACTIVE", str(2 * gemini.limiter.max_concurrency)))
+ADMISSION_HARD_ACTIVE = int(os.getenv("ADMISSION_HARD_ACTIVE", str(8 * gemini.limiter.max_concurrency)))
+ADMISSION_RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "5"))
+
+_active = 0
+_active_lock = threading.Lock()
+
+def admission(route: str) -> str:
+    """
+    "admit", "degrade" or "reject" for a new model-bound request (counted per route).
+    """
+    waiting = gemini.limiter.waiting
+    if waiting >= ADMISSION_HARD_QUEUE or _active >= ADMISSION_HARD_ACTIVE:
+        decision = "reject"
+    elif waiting >= ADMISSION_SOFT_QUEUE or _active >= ADMISSION_SOFT_ACTIVE:
+        decision = "degrade"
+    else:
+        decision = "admit"
+    metrics.inc("omni_admission_total", help="Admission decisions for model-bound requests.", route=route, decision=decision)
+    return decision
+
+@contextmanager
+def admitted():
+    """
+    Counts a model-bound request as active while it runs.
+    """
+    global _active
+    with _active_lock:
+        _active += 1
+    try:
+        yield
+    finally:
+        with _active_lock:
+            _active -= 1
+
+def admission_stats() -> dict:
+    return {
+        "active": _active,
+        "soft": {"queue": ADMISSION_SOFT_QUEUE, "active": ADMISSION_SOFT_ACTIVE},
+        "hard": {"queue": ADMISSION_HARD_QUEUE, "active": ADMISSION_HARD_ACTIVE},
+    }
+
+def _overloaded():
+    resp = jsonify({"error": "Service overloaded, retry later"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER_S)
+    return resp
+
 @app.route("/ai/schedule/generate", methods=["POST"])
 def schedule():
+    from services.precompute import lookup
+    from services.schedule import check_request, degraded_schedule, generate_schedule
+
+    data = request.get_json(force=True) or {}
+    try:
+        check_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result = lookup("schedule", data)
+    if result is None:
+        decision = admission("schedule")
+        if decision == "reject":
+            return _overloaded()
+        if decision == "degrade":
+            result = degraded_schedule(data)
+        else:
+            with admitted():
+                result = generate_schedule(data)
+    return jsonify(_with_images(result, "visual_schedule"))
+
+@app.route("/ai/schedule/week", methods=["POST"])
+def schedule_week():
+    """
+    Several days in one request: one model call for all days, one background,
+    days rendered in parallel (see generate_week).
+    """
+    from services.schedule_week import generate_week
+
+    # no cheap degraded form for a whole week: only the hard limit applies
+    if admission("schedule_week") == "reject":
+        return _overloaded()
     data = request.get_json(force=True) or {}
-    return jsonify(generate_schedule(data))
+    try:
+        with admitted():
+            result = generate_week(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    out = _with_images(result, "visual_week")
+    out["days"] = [_with_images(d, "visual_schedule") for d in result["days"]]
+    return jsonify(out)
+
+@app.route("/ai/schedule/stream", methods=["POST"])
+def schedule_stream():
+    """
+    Server-Sent Events: the final schedule and the rendered image; when the model is asked,
+    the planner's schedule and the model entries as they arrive come first (see stream_schedule).
+    """
+    from services.precompute import lookup
+    from services.schedule import check_request, degraded_schedule, stream_schedule
+
+    data = request.get_json(force=True) or {}
+    try:
+        check_request(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ready, source = lookup("schedule", data), "precomputed"
+    if ready is None:
+        decision = admission("schedule_stream")
+        if decision == "reject":
+            return _overloaded()
+        if decision == "degrade":
+            ready, source = degraded_schedule(data), "degraded"
+
+    def stored():
+        yield "schedule", {"schedule": ready["schedule"], "reasoning": ready["reasoning"], "source": source}
+        yield "image", {"visual_schedule": ready["visual_schedule"]}
+
+    def live():
+        with admitted():
+            yield from stream_schedule(data)
+
+    def events():
+        for event, payload in (stored() if ready else live()):
+            if event == "image":
+                payload = _with_images(payload, "visual_schedule")
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.route("/ai/summary/daily", methods=["POST"])
 def summary():
+    from services.precompute import lookup
+    from services.summary import degraded_summary, generate_daily_summary
+
     data = request.get_json(force=True) or {}
-    return jsonify(generate_daily_summary(data))
+    result = lookup("summary", data)
+    if result is None:
+        decision = admission("summary")
+        if decision == "reject":
+            return _overloaded()
+        if decision == "degrade":
+            result = degraded_summary(data)
+        else:
+            with admitted():
+                result = generate_daily_summary(data)
+    return jsonify(_with_images(result, "visual"))
+
+@app.route("/ai/summary/warm", methods=["POST"])
+def summary_warm():
+    """
+    Warm the configured SUMMARY_WARM_MOODS; a request body is ignored. The cache is per
+    process: this fills the worker that serves the request. SUMMARY_WARM_ON_START warms
+    every worker, precomputed summaries (cli.py precompute) are shared by all of them.
+    """
+    from services.summary import warm_illustrations
+
+    return jsonify(warm_illustrations())
+
+@app.route("/ai/images/<image_id>", methods=["GET"])
+def image(image_id):
+    from utils.image_utils import sniff_mime
+
+    path = image_store.path(image_id)
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            mimetype = sniff_mime(f.read(16))
+        resp = send_file(path, mimetype=mimetype, etag=image_id, conditional=True, max_age=IMAGE_MAX_AGE_S)
+    else:
+        raw = image_store.get(image_id)
+        if raw is None:
+            abort(404)
+        resp = send_file(BytesIO(raw), mimetype=sniff_mime(raw), etag=image_id, conditional=True, max_age=IMAGE_MAX_AGE_S)
+    # ids are content hashes: the bytes behind a URL never change
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
 
 @app.route("/ai/tasks/optimize", methods=["POST"])
 def tasks():
     data = request.get_json(force=True) or {}
     return jsonify(optimize_tasks(data))
 
+# Per-user task index: edits are O(log n) instead of re-sending and re-sorting the whole list.
+# PUT or POST items creates a user's index; the other routes 404 for users without one.
+@app.route("/ai/tasks/<user_id>", methods=["PUT"])
+def tasks_load(user_id):
+    data = request.get_json(force=True) or {}
+    try:
+        return jsonify({"count": load_tasks(user_id, data.get("tasks", []) if isinstance(data, dict) else data)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/ai/tasks/<user_id>", methods=["GET"])
+def tasks_list(user_id):
+    tasks = list_tasks(user_id)
+    if tasks is None:
+        abort(404)
+    return jsonify({"optimized_tasks": tasks})
+
+@app.route("/ai/tasks/<user_id>/next", methods=["GET"])
+def tasks_next(user_id):
+    k = request.args.get("k", default=5, type=int)
+    tasks = next_tasks(user_id, max(0, k))
+    if tasks is None:
+        abort(404)
+    return jsonify({"tasks": tasks})
+
+@app.route("/ai/tasks/<user_id>/items", methods=["POST"])
+def tasks_upsert(user_id):
+    data = request.get_json(force=True) or {}
+    try:
+        return jsonify(upsert_task(user_id, data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/ai/tasks/<user_id>/items/<task_id>", methods=["PATCH"])
+def tasks_update(user_id, task_id):
+    data = request.get_json(force=True) or {}
+    try:
+        task = update_task(user_id, task_id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if task is None:
+        abort(404)
+    return jsonify(task)
+
+@app.route("/ai/tasks/<user_id>/items/<task_id>", methods=["DELETE"])
+def tasks_delete(user_id, task_id):
+    if not delete_task(user_id, task_id):
+        abort(404)
+    return "", 204
+
 @app.route("/ai/health/analyze", methods=["POST"])
 def health():
     data = request.get_json(force=True) or {}
     return jsonify(analyze_health(data))
 
+@app.route("/ai/health/analyze/batch", methods=["POST"])
+def health_batch():
+    """
+    Many snapshots in one request, scored in one vectorized pass (see analyze_health_batch).
+    Body: columnar JSON {"sleep_hours": [...], ...}, a JSON list of snapshots, or NDJSON
+    (Content-Type application/x-ndjson), one snapshot per line. ?rows=1 returns per-row objects.
+    """
+    try:
+        if "ndjson" in (request.mimetype or ""):
+            lines = (line for line in request.stream if line.strip())
+            columns = rows_to_columns(json.loads(line) for line in lines)
+        else:
+            data = request.get_json(force=True)
+            columns = rows_to_columns(data) if isinstance(data, list) else (data or {})
+        rows = request.args.get("rows", "").lower() in ("1", "true", "yes")
+        return jsonify(analyze_health_batch(columns, rows=rows))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"error": f"Invalid batch: {e}"}), 400
+
+@app.route("/ai/health/trends/<user_id>", methods=["POST"])
+def health_trend_record(user_id):
+    """
+    Add today's (or data["date"]'s) snapshot to the user's rolling state; returns the trend report.
+    """
+    from services.health_trends import record_health
+
+    data = request.get_json(force=True) or {}
+    try:
+        return jsonify(record_health(user_id, data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/ai/health/trends/<user_id>", methods=["GET"])
+def health_trend_get(user_id):
+    from services.health_trends import health_trend
+
+    report = health_trend(user_id)
+    if report is None:
+        return jsonify({"error": "No observations for this user"}), 404
+    return jsonify(report)
+
+@app.route("/ai/health/trends/<user_id>", methods=["DELETE"])
+def health_trend_delete(user_id):
+    from services.health_trends import forget_user
+
+    forget_user(user_id)
+    return "", 204
+
+@app.route("/ai/finance/analyze", methods=["POST"])
+def finance():
+    data = request.get_json(force=True) or {}
+    return jsonify(analyze_finances(data))
+
+@app.route("/ai/finance/analyze/batch", methods=["POST"])
+def finance_batch():
+    """
+    Users x periods x categories in one request (see analyze_finances_batch).
+    """
+    data = request.get_json(force=True) or {}
+    try:
+        return jsonify(analyze_finances_batch(data))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid batch: {e}"}), 400
+
+@app.route("/ai/finance/ledger", methods=["POST"])
+def finance_ledger():
+    """
+    Streaming ledger analysis: the body (raw or a multipart "file" field) is a CSV with a
+    header row or NDJSON, one transaction per line, read and aggregated line by line.
+    Format from ?format=csv|ndjson, else the content type / file name (default CSV).
+    ?savings_goal= and ?monthly_income= are passed on to analyze_finances; ?sign=positive|negative
+    is the sign of expense amounts (default positive) and ?date_format= a strptime format for
+    dates that are not ISO / YYYY/MM/DD / Unix timestamps.
+    """
+    upload = request.files.get("file") if request.mimetype == "multipart/form-data" else None
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format", "").lower()
+    if not fmt:
+        hint = f"{upload.mimetype} {upload.filename}" if upload else request.mimetype
+        fmt = "ndjson" if "ndjson" in (hint or "") else "csv"
+
+    def param(name):
+        return (upload and request.form.get(name)) or request.args.get(name)
+
+    try:
+        lines = TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        transactions = iter_ndjson(lines) if fmt == "ndjson" else iter_csv(lines)
+        income = param("monthly_income")
+        return jsonify(analyze_ledger(
+            transactions,
+            savings_goal=float(param("savings_goal") or 0),
+            monthly_income=float(income) if income else None,
+            sign=(param("sign") or "positive").lower(),
+            date_format=param("date_format"),
+        ))
+    except (ValueError, csv.Error) as e:
+        return jsonify({"error": f"Invalid ledger: {e}"}), 400
+
 @app.route("/health", methods=["GET"])
 def healthcheck():
-    return {"status": "OMNI AI running"}
+    return {
+        "status": "OMNI AI running",
+        "circuit_breakers": gemini.breaker_stats(),
+        "model_limiter": gemini.limiter.stats(),
+        "singleflight": singleflight.stats(),
+        "admission": admission_stats(),
+        "startup": STARTUP,
+    }
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(_sampled_metrics()), mimetype="text/plain; version=0.0.4")
+
+def _sampled_metrics():
+    breakers = gemini.breaker_stats()
+    limiter = gemini.limiter.stats()
+    flights = singleflight.stats()
+    return [
+        ("omni_breaker_open", "gauge", "1 while the model's circuit breaker is not closed.",
+         [({"model": m, "state": b["state"]}, int(b["state"] != "closed")) for m, b in breakers.items()]),
+        ("omni_model_calls_in_flight", "gauge", "Model calls holding a limiter slot.", [({}, limiter["in_flight"])]),
+        ("omni_model_calls_waiting", "gauge", "Model calls queued for a limiter slot.", [({}, limiter["waiting"])]),
+        ("omni_model_requests_active", "gauge", "Admitted model-bound requests in progress.", [({}, _active)]),
+        ("omni_singleflight_coalesced_total", "counter", "Requests that shared another request's upstream run.",
+         [({"flight": name}, f["coalesced"]) for name, f in flights.items()]),
+    ]
+
+def _warm_summaries():
+    from services.summary import warm_illustrations
+
+    warm_illustrations()
+
+# The process render pool forks its workers on import: do it now, before any thread starts
+if os.getenv("RENDER_BACKEND", "inline").lower() == "process":
+    from utils import render_pool  # noqa: F401
+
+# Pre-generate summary illustrations in the background so the first requests hit the cache
+if os.getenv("SUMMARY_WARM_ON_START", "").lower() in ("1", "true", "yes"):
+    threading.Thread(target=_warm_summaries, name="summary-warmup", daemon=True).start()
+
+STARTUP = {
+    "boot_ms": round((time.perf_counter() - _boot_t0) * 1000, 1),
+    "genai_configured": gemini.configured(),
+    "deferred": [m for m in ("google.genai", "PIL.Image") if m not in sys.modules],
+}
+logger.info(f"Startup: {STARTUP}")
+if not STARTUP["genai_configured"]:
+    logger.warning("GENAI_API_KEY is not set: schedule and summary routes serve rule-based results only")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000)
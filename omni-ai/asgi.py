@@ -0,0 +1,129 @@
+"""
+Production entry point: ASGI app for gunicorn + uvicorn workers (see gunicorn.conf.py).
+
+  gunicorn -c gunicorn.conf.py asgi:app
+
+The model-bound routes run on the event loop with the async Gemini client, so
+slow model calls wait as coroutines instead of holding OS threads. Every other
+route is served by the Flask app from app.py, mounted as WSGI.
+"""
+import asyncio
+import functools
+import os
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import ADMISSION_RETRY_AFTER_S, SERVER_TIMING, admission, admitted, app as flask_app
+from utils import metrics
+from utils.image_store import image_store
+
+
+async def _json_body(request: Request) -> dict:
+    body = await request.body()
+    if not body:
+        return {}
+    return await request.json() or {}
+
+def _with_images(request: Request, result: dict, *fields) -> dict:
+    """
+    Same response shape as app._with_images: image URLs, or data URLs with ?inline=1.
+    """
+    from utils.image_utils import to_data_url
+
+    inline = request.query_params.get("inline", "").lower() in ("1", "true", "yes")
+    base_url = str(request.base_url).rstrip("/")
+    out = dict(result)
+    for field in fields:
+        raw = out.get(field)
+        if isinstance(raw, bytes):
+            out[field] = to_data_url(raw) if inline else f"{base_url}/ai/images/{image_store.put(raw)}"
+    return out
+
+def _instrumented(handler):
+    """
+    Same per-route latency and optional Server-Timing header as the Flask hooks in app.py.
+    """
+    @functools.wraps(handler)
+    async def inner(request: Request):
+        t0 = time.perf_counter()
+        token = metrics.start_trace() if SERVER_TIMING else None
+        resp = await handler(request)
+        elapsed = time.perf_counter() - t0
+        metrics.observe(f"http:{handler.__name__}", elapsed)
+        if token is not None:
+            trace = metrics.end_trace(token)
+            trace["total"] = elapsed
+            resp.headers["Server-Timing"] = metrics.server_timing(trace)
+        return resp
+    return inner
+
+def _overloaded() -> JSONResponse:
+    return JSONResponse({"error": "Service overloaded, retry later"}, status_code=503,
+                        headers={"Retry-After": str(ADMISSION_RETRY_AFTER_S)})
+
+@_instrumented
+async def schedule(request: Request):
+    from services.precompute import lookup
+    from services.schedule import agenerate_schedule, check_request, degraded_schedule
+
+    try:
+        data = await _json_body(request)
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    try:
+        check_request(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    # SQLite read: off the event loop
+    result = await asyncio.to_thread(lookup, "schedule", data)
+    if result is None:
+        decision = admission("schedule")
+        if decision == "reject":
+            return _overloaded()
+        if decision == "degrade":
+            # planner + render: CPU only, off the event loop
+            result = await asyncio.to_thread(degraded_schedule, data)
+        else:
+            with admitted():
+                result = await agenerate_schedule(data)
+    return JSONResponse(_with_images(request, result, "visual_schedule"))
+
+@_instrumented
+async def summary(request: Request):
+    from services.precompute import lookup
+    from services.summary import agenerate_daily_summary, degraded_summary
+
+    try:
+        data = await _json_body(request)
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    result = await asyncio.to_thread(lookup, "summary", data)
+    if result is None:
+        decision = admission("summary")
+        if decision == "reject":
+            return _overloaded()
+        if decision == "degrade":
+            result = degraded_summary(data)
+        else:
+            with admitted():
+                result = await agenerate_daily_summary(data)
+    return JSONResponse(_with_images(request, result, "visual"))
+
+
+app = Starlette(
+    routes=[
+        Route("/ai/schedule/generate", schedule, methods=["POST"]),
+        Route("/ai/summary/daily", summary, methods=["POST"]),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=int(os.getenv("WSGI_THREADS", "10")))),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+    ],
+)
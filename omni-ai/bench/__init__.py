@@ -0,0 +1,3 @@
+"""
+Offline benchmark suite, see bench/__main__.py.
+"""
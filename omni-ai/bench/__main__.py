@@ -0,0 +1,145 @@
+"""
+Offline benchmarks (no API key, no network): Gemini is replaced by bench.stub_gemini.
+
+  python -m bench                          run everything, write bench/results/latest.json
+  python -m bench --save-baseline          ... and store it as bench/results/baseline.json
+  python -m bench --compare                fail (exit 1) if a case got slower than the baseline
+  python -m bench --only extract_json --quick
+  python -m bench --latency 0.8 --image-latency 3 --failure-rate 0.1   (end-to-end cases)
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "results")
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+# end-to-end cases must measure the pipeline, not the result cache or a remote store
+os.environ.setdefault("SCHEDULE_CACHE_BACKEND", "off")
+os.environ.setdefault("RENDER_BACKEND", "inline")
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench import stub_gemini  # noqa: E402
+from bench.cases import CASES  # noqa: E402
+
+
+def measure(fn, min_time: float, max_reps: int) -> dict:
+    fn()  # warm-up: imports, lru caches, first allocation
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_reps and (len(samples) < 5 or time.perf_counter() < deadline):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "reps": len(samples),
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "min_ms": samples[0] * 1000,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Cases whose median is more than `tolerance` (fraction) slower than the baseline.
+    """
+    regressions = []
+    for key, cur in results["cases"].items():
+        base = baseline.get("cases", {}).get(key)
+        if not base:
+            continue
+        ratio = cur["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        cur["baseline_median_ms"] = base["median_ms"]
+        cur["change"] = ratio - 1
+        if ratio - 1 > tolerance:
+            regressions.append(key)
+    return regressions
+
+def _print_table(results: dict) -> None:
+    print(f"{'case':<58} {'median ms':>11} {'p95 ms':>11} {'reps':>6} {'vs base':>9}")
+    for key, r in results["cases"].items():
+        change = f"{r['change']:+.0%}" if "change" in r else ""
+        print(f"{key:<58} {r['median_ms']:>11.3f} {r['p95_ms']:>11.3f} {r['reps']:>6} {change:>9}")
+
+def _write(path: str, results: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="OMNI AI offline benchmarks")
+    parser.add_argument("--only", action="append", help="run cases whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="shorter runs (noisier)")
+    parser.add_argument("--min-time", type=float, default=None, help="seconds per case (default 1.0, 0.2 with --quick)")
+    parser.add_argument("--max-reps", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub text model latency (s)")
+    parser.add_argument("--image-latency", type=float, default=None, help="stub image model latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on regressions")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown of the median (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    stub = stub_gemini.install(
+        latency=args.latency,
+        image_latency=args.image_latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+    )
+    min_time = args.min_time if args.min_time is not None else (0.2 if args.quick else 1.0)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "stub": {"latency": args.latency, "image_latency": stub.image_latency, "jitter": args.jitter, "failure_rate": args.failure_rate},
+        "cases": {},
+    }
+    for name, size, setup in CASES:
+        if args.only and not any(o in name for o in args.only):
+            continue
+        key = f"{name} [{size}]"
+        print(f"  {key} ...", file=sys.stderr, flush=True)
+        results["cases"][key] = measure(setup(), min_time, args.max_reps)
+
+    regressions = []
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first.", file=sys.stderr)
+            return 2
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    _print_table(results)
+    _write(args.out, results)
+    if args.save_baseline:
+        _write(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}:")
+        for key in regressions:
+            print(f"  {key}: {results['cases'][key]['change']:+.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Benchmark cases: (name, size, setup) where setup() returns the zero-argument callable to time.
+Each hot path runs at a realistic size and at an extreme one.
+"""
+import itertools
+import json
+import random
+
+_rng = random.Random(42)
+
+ACTIVITY_TYPES = ["focus", "study", "work", "health", "admin", "social"]
+PRIORITIES = ["low", "medium", "high"]
+CATEGORIES = ["rent", "food", "transport", "subscriptions", "utilities", "fun", "health", "education"]
+
+
+# ---------- inputs ----------
+def activities(n: int):
+    return [{
+        "name": f"Activity {i}",
+        "duration": _rng.choice([5, 10, 15, 30, 45, 60, 90]),
+        "type": _rng.choice(ACTIVITY_TYPES),
+        "priority": _rng.choice(PRIORITIES),
+    } for i in range(n)]
+
+def schedule(n: int, slot_min: int = 45, day_start: int = 8 * 60):
+    out = []
+    cur = day_start
+    for i in range(n):
+        out.append({"start": f"{cur // 60:02d}:{cur % 60:02d}", "end": f"{(cur + slot_min) // 60:02d}:{(cur + slot_min) % 60:02d}", "activity": f"Activity {i}"})
+        cur += slot_min
+    return out
+
+def model_text(n: int, slot_min: int = 45, trailing_brace: bool = False) -> str:
+    body = json.dumps({"schedule": schedule(n, slot_min, 0), "reasoning": ["Focus first.", "Breaks after long blocks."]})
+    tail = "\nIf you want, I can adjust {anything} later." if trailing_brace else ""
+    return f"Sure! Here is the plan:\n```json\n{body}\n```{tail}"
+
+def health_snapshots(n: int):
+    return [{
+        "sleep_hours": round(_rng.uniform(3, 10), 1),
+        "water_intake_liters": round(_rng.uniform(0.3, 3.5), 1),
+        "exercise_minutes": _rng.randint(0, 120),
+        "stress_level": _rng.choice(["low", "medium", "high", "unknown"]),
+    } for _ in range(n)]
+
+def finances(n_categories: int):
+    names = CATEGORIES + [f"category_{i}" for i in range(max(0, n_categories - len(CATEGORIES)))]
+    return {
+        "expenses": {name: round(_rng.uniform(5, 900), 2) for name in names[:n_categories]},
+        "savings_goal": 500,
+        "monthly_income": 3200,
+    }
+
+def tasks(n: int):
+    out = []
+    for i in range(n):
+        roll = _rng.random()
+        if roll < 0.1:
+            deadline = "none"
+        elif roll < 0.15:
+            deadline = "not a date"
+        else:
+            deadline = f"2026-{_rng.randint(1, 12):02d}-{_rng.randint(1, 28):02d}"
+        out.append({"title": f"Task {i}", "deadline": deadline, "duration": _rng.choice([15, 30, 60])})
+    return out
+
+
+# ---------- cases ----------
+def _fallback_schedule(n):
+    from services.schedule import _fallback_schedule
+    acts = activities(n)
+    return lambda: _fallback_schedule(acts, "00:00", "23:59")
+
+def _validate_schedule(n):
+    from services.schedule import _validate_schedule
+    # 1-minute slots at the extreme end so the whole day fits
+    sched = schedule(n, slot_min=45 if n * 45 <= 14 * 60 else 1, day_start=0)
+    return lambda: _validate_schedule(sched, "00:00", "23:59")
+
+def _extract_json(n, trailing_brace=False):
+    from services.schedule import _extract_json
+    text = model_text(n, slot_min=1, trailing_brace=trailing_brace)
+    return lambda: _extract_json(text)
+
+def _render(n):
+    from utils.background_cache import decode_background
+    from utils.image_utils import render_schedule_image
+    from bench.stub_gemini import canned_image
+    base = decode_background(canned_image())
+    sched = schedule(n, slot_min=max(1, (14 * 60) // n), day_start=8 * 60)
+    return lambda: render_schedule_image(sched, base_image=base)
+
+def _analyze_health(n):
+    from services.health import analyze_health
+    snapshots = health_snapshots(n)
+    return lambda: [analyze_health(s) for s in snapshots]
+
+def _analyze_health_batch(n):
+    from services.health import analyze_health_batch, rows_to_columns
+    columns = rows_to_columns(health_snapshots(n))
+    return lambda: analyze_health_batch(columns)
+
+def _analyze_finances(n):
+    from services.finance import analyze_finances
+    data = finances(n)
+    return lambda: analyze_finances(data)
+
+def _analyze_finances_batch(users, periods=12):
+    from services.finance import analyze_finances_batch
+    data = {
+        "categories": CATEGORIES,
+        "expenses": [[[round(_rng.uniform(0, 900), 2) for _ in CATEGORIES] for _ in range(periods)] for _ in range(users)],
+        "monthly_income": [round(_rng.uniform(1500, 5000), 2) for _ in range(users)],
+        "savings_goal": 500,
+    }
+    return lambda: analyze_finances_batch(data)
+
+def _analyze_ledger(n):
+    from services.ledger import analyze_ledger, iter_csv
+    lines = ["date,category,amount\n"] + [
+        f"2025-{_rng.randint(1, 12):02d}-{_rng.randint(1, 28):02d},{_rng.choice(CATEGORIES)},{_rng.uniform(1, 300):.2f}\n"
+        for _ in range(n)
+    ]
+    return lambda: analyze_ledger(iter_csv(iter(lines)), savings_goal=500)
+
+def _optimize_tasks(n):
+    from services.tasks import optimize_tasks
+    data = {"tasks": tasks(n)}
+    return lambda: optimize_tasks(data)
+
+def _task_index(n):
+    from services.task_index import TaskIndex
+    index = TaskIndex()
+    index.load(tasks(n))
+    edits = iter(itertools.cycle(tasks(1000)))
+    # one edit + a "what's next" query, as a client would issue per change
+    return lambda: (index.upsert(next(edits)), index.top(10))
+
+def _schedule_e2e(n, refine=False):
+    # full generate_schedule through the stub client; the result cache is off (see __main__)
+    from services.schedule import generate_schedule
+    acts = activities(n)
+    counter = iter(range(10 ** 9))
+    # a distinct energy label per call keeps single-flight and caches out of the measurement
+    return lambda: generate_schedule({"day_start": "08:00", "day_end": "22:00", "energy": f"run-{next(counter)}", "activities": acts, "refine": refine})
+
+def _schedule_week_e2e(n_days, refine=False):
+    from services.schedule_week import generate_week
+    acts = activities(4 * n_days)
+    counter = iter(range(10 ** 9))
+    return lambda: generate_week({"days": n_days, "energy": f"run-{next(counter)}", "activities": acts, "refine": refine})
+
+def _summary_e2e(n):
+    from services.summary import generate_daily_summary
+    counter = iter(range(10 ** 9))
+    return lambda: generate_daily_summary({"mood": f"mood {next(counter)}"})
+
+
+CASES = [
+    ("fallback_schedule", "10 activities", lambda: _fallback_schedule(10)),
+    ("fallback_schedule", "5000 activities", lambda: _fallback_schedule(5000)),
+    ("validate_schedule", "15 entries", lambda: _validate_schedule(15)),
+    ("validate_schedule", "1400 entries", lambda: _validate_schedule(1400)),
+    ("extract_json", "12 entries", lambda: _extract_json(12)),
+    ("extract_json", "1400 entries + trailing brace", lambda: _extract_json(1400, trailing_brace=True)),
+    ("render_schedule_image", "10 entries", lambda: _render(10)),
+    ("render_schedule_image", "200 entries", lambda: _render(200)),
+    ("analyze_health", "1 snapshot", lambda: _analyze_health(1)),
+    ("analyze_health", "10000 snapshots", lambda: _analyze_health(10000)),
+    ("analyze_health_batch", "10000 snapshots", lambda: _analyze_health_batch(10000)),
+    ("analyze_finances", "8 categories", lambda: _analyze_finances(8)),
+    ("analyze_finances", "5000 categories", lambda: _analyze_finances(5000)),
+    ("analyze_finances_batch", "1000 users x 12 months", lambda: _analyze_finances_batch(1000)),
+    ("analyze_ledger", "100000 csv rows", lambda: _analyze_ledger(100000)),
+    ("optimize_tasks", "20 tasks", lambda: _optimize_tasks(20)),
+    ("optimize_tasks", "50000 tasks", lambda: _optimize_tasks(50000)),
+    ("task_index", "upsert + top 10 of 50000 tasks", lambda: _task_index(50000)),
+    ("schedule_e2e", "10 activities", lambda: _schedule_e2e(10)),
+    ("schedule_e2e", "10 activities, model refine", lambda: _schedule_e2e(10, refine=True)),
+    ("schedule_week_e2e", "7 days", lambda: _schedule_week_e2e(7)),
+    ("schedule_week_e2e", "7 days, model refine", lambda: _schedule_week_e2e(7, refine=True)),
+    ("summary_e2e", "1 mood", lambda: _summary_e2e(1)),
+]
@@ -0,0 +1,152 @@
+"""
+Offline stand-in for the google-genai client, for benchmarks.
+
+  from bench import stub_gemini
+  stub_gemini.install(latency=0.8, image_latency=3.0, failure_rate=0.1)
+
+install() assigns utils.gemini.client, so every service call goes through the
+usual limiter / breaker / metrics path without network access or an API key.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+
+class StubError(RuntimeError):
+    pass
+
+
+def canned_schedule(n: int = 8, day_start: str = "08:00", slot_min: int = 45) -> str:
+    """
+    Model-style schedule text: a short preamble, the JSON object, and a trailing remark.
+    """
+    h, m = day_start.split(":")
+    cur = int(h) * 60 + int(m)
+    entries = []
+    for i in range(n):
+        entries.append({"start": f"{cur // 60:02d}:{cur % 60:02d}", "end": f"{(cur + slot_min) // 60:02d}:{(cur + slot_min) % 60:02d}", "activity": f"Activity {i + 1}"})
+        cur += slot_min
+    body = json.dumps({"schedule": entries, "reasoning": ["Deep work in the morning.", "Breaks after focus blocks."]})
+    return f"Here is your optimized schedule:\n{body}\nLet me know if you need changes."
+
+def canned_week(days, n: int = 4, slot_min: int = 45) -> str:
+    """
+    Week-style answer for [(date, day_start), ...].
+    """
+    out = []
+    for d, day_start in days:
+        body = json.loads(canned_schedule(n, day_start, slot_min).splitlines()[1])
+        out.append({"date": d, "schedule": body["schedule"]})
+    return json.dumps({"days": out, "reasoning": ["Heavy days balanced with lighter ones."]})
+
+_WEEK_DAY = re.compile(r'"date": "(\d{4}-\d{2}-\d{2})", "day_start": "(\d{2}:\d{2})"')
+
+def canned_image(size=(1024, 1024), color="#eef2f7") -> bytes:
+    from PIL import Image
+
+    out = BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class _Models:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, **kwargs):
+        self._owner._wait(model)
+        return self._owner._response(model, contents)
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        owner = self._owner
+        owner._wait(model)
+        text = owner.text
+        step = max(1, owner.chunk_chars)
+        for i in range(0, len(text), step):
+            if owner.chunk_latency:
+                time.sleep(owner.chunk_latency)
+            yield SimpleNamespace(text=text[i:i + step], candidates=[])
+
+
+class _AsyncModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, **kwargs):
+        await asyncio.sleep(self._owner._delay(model))
+        self._owner._maybe_fail(model)
+        return self._owner._response(model, contents)
+
+
+class StubClient:
+    """
+    Mimics client.models / client.aio.models of google-genai.
+
+    latency / image_latency: seconds per text / image call (streams: time to first chunk)
+    jitter: +/- fraction applied to every latency
+    failure_rate: share of calls raising StubError
+    text / image: canned outputs (defaults: canned_schedule() and a plain PNG)
+    """
+
+    def __init__(self, latency: float = 0.0, image_latency: float | None = None, jitter: float = 0.0,
+                 failure_rate: float = 0.0, text: str | None = None, image: bytes | None = None,
+                 chunk_chars: int = 64, chunk_latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.image_latency = latency if image_latency is None else image_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.text = text if text is not None else canned_schedule()
+        self.image = image if image is not None else canned_image()
+        self.chunk_chars = chunk_chars
+        self.chunk_latency = chunk_latency
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = _Models(self)
+        self.aio = SimpleNamespace(models=_AsyncModels(self))
+
+    def _delay(self, model: str) -> float:
+        base = self.image_latency if "image" in model else self.latency
+        with self._lock:
+            self.calls += 1
+            spread = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, base * (1 + spread))
+
+    def _maybe_fail(self, model: str) -> None:
+        with self._lock:
+            failed = self.failure_rate and self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            raise StubError(f"stub failure for {model}")
+
+    def _wait(self, model: str) -> None:
+        delay = self._delay(model)
+        if delay:
+            time.sleep(delay)
+        self._maybe_fail(model)
+
+    def _response(self, model: str, contents=()):
+        if "image" in model:
+            part = SimpleNamespace(inline_data=SimpleNamespace(data=self.image, mime_type="image/png"), text=None)
+            return SimpleNamespace(text=None, candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+        # week prompts (services.schedule_week) get one schedule per listed day
+        days = _WEEK_DAY.findall(str(contents[0])) if contents else []
+        return SimpleNamespace(text=canned_week(days) if days else self.text, candidates=[])
+
+
+def install(**kwargs) -> StubClient:
+    """
+    Replace the process-wide Gemini client with a StubClient(**kwargs).
+    """
+    from utils import gemini
+
+    client = StubClient(**kwargs)
+    gemini.client = client
+    return client
@@ -0,0 +1,88 @@
+"""
+OMNI AI command line tools.
+
+  python cli.py warm-summary [--url http://localhost:8000]   (warms one worker process only)
+  python cli.py precompute inputs.ndjson [--concurrency 8] [--render-workers 4] [--force]
+"""
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+
+def _post(url: str, payload: dict, timeout: float):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def warm_summary(args) -> int:
+    # The illustration cache lives in each serving process, so this warms only the worker
+    # that takes the POST (it warms its configured SUMMARY_WARM_MOODS). To warm every worker
+    # use SUMMARY_WARM_ON_START=1, or precompute the summaries into the shared store:
+    #   python cli.py precompute moods.ndjson   with lines {"summary": {"mood": "calm"}}
+    report = _post(args.url.rstrip("/") + "/ai/summary/warm", {}, args.timeout)
+    print(json.dumps(report, indent=2))
+    return 1 if report.get("failed") else 0
+
+
+def _read_entries(f):
+    # a JSON array, or one JSON object per line
+    text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def precompute(args) -> int:
+    # Runs in this process and writes to the store the routes read (PRECOMPUTE_PATH).
+    # The render backend is read when the services load, so set it first.
+    os.environ["RENDER_BACKEND"] = args.render_backend
+    if args.render_workers:
+        os.environ["RENDER_WORKERS"] = str(args.render_workers)
+    from services.precompute import precompute as run
+
+    if args.inputs == "-":
+        entries = _read_entries(sys.stdin)
+    else:
+        with open(args.inputs, encoding="utf-8") as f:
+            entries = _read_entries(f)
+
+    try:
+        report = run(entries, concurrency=args.concurrency, force=args.force)
+    except RuntimeError as e:
+        print(f"precompute: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="cli.py", description="OMNI AI tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("warm-summary", help="pre-generate the SUMMARY_WARM_MOODS illustrations in the worker that answers")
+    p.add_argument("--url", default="http://localhost:8000")
+    p.add_argument("--timeout", type=float, default=300)
+    p.set_defaults(func=warm_summary)
+
+    p = sub.add_parser("precompute", help="generate tomorrow's schedules and summaries into the result store")
+    p.add_argument("inputs", help='JSON array or NDJSON of {"user_id", "schedule": {...}, "summary": {...}}; - for stdin')
+    p.add_argument("--concurrency", type=int, default=8, help="users processed at once")
+    p.add_argument("--render-backend", default="process", choices=["process", "inline"])
+    p.add_argument("--render-workers", type=int, default=0, help="render processes (default: RENDER_WORKERS)")
+    p.add_argument("--force", action="store_true", help="recompute results already in the store")
+    p.set_defaults(func=precompute)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
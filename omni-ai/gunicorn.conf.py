@@ -0,0 +1,19 @@
+# Production launcher: gunicorn -c gunicorn.conf.py asgi:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Set WEB_CONCURRENCY to the CPUs the container is given; the host's CPU count overshoots
+# under a cgroup quota and multiplies every per-worker limit below
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+accesslog = "-"
+
+# Image URLs must resolve in whichever worker gets the GET, so share the store on disk
+if workers > 1:
+    os.environ.setdefault("IMAGE_STORE_DIR", "/tmp/omni-images")
+
+# Workers split GEMINI_MAX_CONCURRENCY / GEMINI_MAX_WAITING between them (utils/gemini.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
@@ -1,3 +1,6 @@
+import os
+
+
 def _to_float(x, default=0.0):
     try:
         if x is None:
@@ -151,3 +154,123 @@ def analyze_finances(data: dict):
         "key_insights": insights,
         "action_plan": sorted(actions, key=lambda x: x["priority"]),
     }
+
+
+# ---------- batch ----------
+# Cells (users x periods x categories) accepted by one batch request
+FINANCE_BATCH_MAX_CELLS = int(os.getenv("FINANCE_BATCH_MAX_CELLS", "20000000"))
+
+def _per_cell(np, value, shape, name):
+    """
+    Scalar, per-user list or users x periods matrix -> float array of `shape` (nan = missing).
+    """
+    if value is None:
+        return np.full(shape, np.nan)
+    arr = np.array(value, dtype=float)  # None -> nan
+    if arr.ndim == 1:
+        arr = arr[:, None]
+    try:
+        return np.broadcast_to(arr, shape).astype(float)
+    except ValueError:
+        raise ValueError(f"`{name}` must be a number, one value per user, or a users x periods matrix.")
+
+def _nullable(np, arr, mask=None, digits=2):
+    out = np.round(arr, digits).astype(object)
+    out[np.isnan(arr) if mask is None else mask] = None
+    return out.tolist()
+
+def analyze_finances_batch(data: dict) -> dict:
+    """
+    analyze_finances for every user and period at once, vectorized with NumPy.
+
+    data: {
+      "users": [...], "periods": [...], "categories": [...],
+      "expenses": users x periods x categories amounts,
+      "monthly_income": number | per user | users x periods   (optional),
+      "savings_goal":   number | per user | users x periods   (optional),
+      "insights": false   (true adds analyze_finances' key_insights per cell; slower)
+    }
+    Returns users x periods (x categories) columnar arrays; month-over-month deltas
+    compare each period with the previous one (null for the first).
+    Raises ValueError on malformed input.
+    """
+    import numpy as np
+
+    if not isinstance(data, dict):
+        raise ValueError("The batch must be a JSON object.")
+    categories = list(data.get("categories") or [])
+    expenses = np.array(data.get("expenses") or [], dtype=float)
+    if expenses.ndim != 3 or expenses.shape[2] != len(categories):
+        raise ValueError("`expenses` must be a users x periods x categories matrix matching `categories`.")
+    if expenses.size > FINANCE_BATCH_MAX_CELLS:
+        raise ValueError(f"At most {FINANCE_BATCH_MAX_CELLS} cells per batch.")
+    n_users, n_periods, _ = expenses.shape
+    users = list(data.get("users") or range(n_users))
+    periods = list(data.get("periods") or range(n_periods))
+    if len(users) != n_users or len(periods) != n_periods:
+        raise ValueError("`users` / `periods` do not match the `expenses` matrix.")
+
+    shape = (n_users, n_periods)
+    income = _per_cell(np, data.get("monthly_income", data.get("income")), shape, "monthly_income")
+    goal = np.nan_to_num(_per_cell(np, data.get("savings_goal"), shape, "savings_goal"))
+
+    # same cleaning as analyze_finances: only positive amounts count
+    cleaned = np.where(np.nan_to_num(expenses) > 0, np.nan_to_num(expenses), 0.0)
+    total = cleaned.sum(axis=2)
+    spent = total > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percent = np.where(spent[..., None], cleaned / total[..., None] * 100.0, 0.0)
+
+    top = percent.argmax(axis=2) if categories else np.zeros(shape, dtype=int)
+    top_percent = np.take_along_axis(percent, top[..., None], axis=2)[..., 0] if categories else np.zeros(shape)
+
+    has_income = ~np.isnan(income)
+    has_goal = goal > 0
+    disposable = income - total
+    feasible = disposable >= goal
+
+    risk = np.full(shape, "low", dtype=object)
+    risk[~has_income & has_goal] = "medium"
+    risk[has_income & has_goal & (disposable < goal * 1.2)] = "medium"
+    risk[has_income & ((disposable < 0) | (has_goal & ~feasible))] = "high"
+    risk[~spent] = "unknown"
+
+    # month over month, from the same matrices
+    delta = np.full(shape, np.nan)
+    delta_pct = np.full(shape, np.nan)
+    category_delta = np.full(cleaned.shape, np.nan)
+    if n_periods > 1:
+        prev = total[:, :-1]
+        delta[:, 1:] = total[:, 1:] - prev
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta_pct[:, 1:] = np.where(prev > 0, delta[:, 1:] / prev * 100.0, np.nan)
+        category_delta[:, 1:] = cleaned[:, 1:] - cleaned[:, :-1]
+
+    category_names = np.array(categories or [None], dtype=object)
+    result = {
+        "users": users,
+        "periods": periods,
+        "categories": categories,
+        "total_spent": np.round(total, 2).tolist(),
+        "percent": np.round(percent, 1).tolist(),
+        "top_category": np.where(spent, category_names[top], None).tolist(),
+        "top_percent": np.round(top_percent, 1).tolist(),
+        "required_income_for_goal": _nullable(np, total + goal, ~has_goal),
+        "disposable_after_expenses": _nullable(np, disposable),
+        "savings_feasible": np.where(has_income & has_goal, feasible, None).tolist(),
+        "risk_level": risk.tolist(),
+        "mom_delta": _nullable(np, delta),
+        "mom_delta_pct": _nullable(np, delta_pct, digits=1),
+        "category_mom_delta": _nullable(np, category_delta),
+    }
+
+    if data.get("insights"):
+        result["key_insights"] = [[
+            analyze_finances({
+                "expenses": dict(zip(categories, cleaned[u, p].tolist())),
+                "savings_goal": float(goal[u, p]),
+                "monthly_income": None if np.isnan(income[u, p]) else float(income[u, p]),
+            })["key_insights"]
+            for p in range(n_periods)] for u in range(n_users)]
+
+    return result
@@ -1,3 +1,34 @@
+import os
+
+# Thresholds, shared by analyze_health and analyze_health_batch
+SLEEP_CRITICAL_H = 6
+SLEEP_MIN_H = 7
+WATER_LOW_L = 1.5
+WATER_MIN_L = 2
+EXERCISE_VERY_LOW_MIN = 10
+EXERCISE_MIN = 30
+RISK_HIGH = 7
+RISK_MEDIUM = 4
+
+# (points, label) per level, worst first
+SLEEP_LEVELS = ((3, "critically low"), (2, "below recommended minimum"), (0, "adequate"))
+STRESS_LEVELS = ((3, "high stress reported"), (1, "moderate stress"), (0, "low stress"))
+WATER_LEVELS = ((2, "low hydration"), (1, "slightly low hydration"), (0, "good hydration"))
+EXERCISE_LEVELS = ((2, "very low activity"), (0, "light activity"), (0, "good activity level"))
+
+# In priority order: the first one that applies is the priority action
+REC_SLEEP = "Increase sleep to 7–8 hours per night"
+REC_STRESS = "Add daily stress-reduction activities (10–15 minutes)"
+REC_WATER = "Increase water intake to 2–2.5 liters per day"
+REC_EXERCISE = "Aim for at least 30 minutes of light exercise per day"
+DEFAULT_ACTION = "Maintain current habits"
+
+# Rows accepted by one batch request
+HEALTH_BATCH_MAX_ROWS = int(os.getenv("HEALTH_BATCH_MAX_ROWS", "1000000"))
+
+FIELDS = ("sleep_hours", "water_intake_liters", "exercise_minutes", "stress_level")
+
+
 def analyze_health(data):
     sleep = data.get("sleep_hours", 0)
     water = data.get("water_intake_liters", 0)
@@ -8,66 +39,181 @@ def analyze_health(data):
     factors = {}
 
     # Sleep
-    if sleep < 6:
-        risk_score += 3
-        factors["sleep"] = "critically low"
-    elif sleep < 7:
-        risk_score += 2
-        factors["sleep"] = "below recommended minimum"
+    if sleep < SLEEP_CRITICAL_H:
+        level = 0
+    elif sleep < SLEEP_MIN_H:
+        level = 1
     else:
-        factors["sleep"] = "adequate"
+        level = 2
+    risk_score += SLEEP_LEVELS[level][0]
+    factors["sleep"] = SLEEP_LEVELS[level][1]
 
     # Stress
-    if stress == "high":
-        risk_score += 3
-        factors["stress"] = "high stress reported"
-    elif stress == "medium":
-        risk_score += 1
-        factors["stress"] = "moderate stress"
-    else:
-        factors["stress"] = "low stress"
+    level = {"high": 0, "medium": 1}.get(stress, 2)
+    risk_score += STRESS_LEVELS[level][0]
+    factors["stress"] = STRESS_LEVELS[level][1]
 
     # Hydration
-    if water < 1.5:
-        risk_score += 2
-        factors["hydration"] = "low hydration"
-    elif water < 2:
-        risk_score += 1
-        factors["hydration"] = "slightly low hydration"
+    if water < WATER_LOW_L:
+        level = 0
+    elif water < WATER_MIN_L:
+        level = 1
     else:
-        factors["hydration"] = "good hydration"
+        level = 2
+    risk_score += WATER_LEVELS[level][0]
+    factors["hydration"] = WATER_LEVELS[level][1]
 
     # Exercise
-    if exercise < 10:
-        risk_score += 2
-        factors["exercise"] = "very low activity"
-    elif exercise < 30:
-        factors["exercise"] = "light activity"
+    if exercise < EXERCISE_VERY_LOW_MIN:
+        level = 0
+    elif exercise < EXERCISE_MIN:
+        level = 1
     else:
-        factors["exercise"] = "good activity level"
+        level = 2
+    risk_score += EXERCISE_LEVELS[level][0]
+    factors["exercise"] = EXERCISE_LEVELS[level][1]
 
-    # Risk level
-    if risk_score >= 7:
-        risk = "high"
-    elif risk_score >= 4:
-        risk = "medium"
-    else:
-        risk = "low"
+    risk = risk_level(risk_score)
 
     recommendations = []
 
-    if sleep < 7:
-        recommendations.append("Increase sleep to 7–8 hours per night")
+    if sleep < SLEEP_MIN_H:
+        recommendations.append(REC_SLEEP)
     if stress == "high":
-        recommendations.append("Add daily stress-reduction activities (10–15 minutes)")
-    if water < 2:
-        recommendations.append("Increase water intake to 2–2.5 liters per day")
-    if exercise < 30:
-        recommendations.append("Aim for at least 30 minutes of light exercise per day")
+        recommendations.append(REC_STRESS)
+    if water < WATER_MIN_L:
+        recommendations.append(REC_WATER)
+    if exercise < EXERCISE_MIN:
+        recommendations.append(REC_EXERCISE)
 
     return {
         "burnout_risk": risk,
         "risk_factors": factors,
         "recommendations": recommendations,
-        "priority_action": recommendations[0] if recommendations else "Maintain current habits"
+        "priority_action": recommendations[0] if recommendations else DEFAULT_ACTION
     }
+
+
+def risk_level(score) -> str:
+    if score >= RISK_HIGH:
+        return "high"
+    if score >= RISK_MEDIUM:
+        return "medium"
+    return "low"
+
+
+# ---------- batch ----------
+def _recommendation_table():
+    # bit i set <=> recommendation i applies; index by the row's bitmask
+    recs = (REC_SLEEP, REC_STRESS, REC_WATER, REC_EXERCISE)
+    table = [[r for i, r in enumerate(recs) if mask >> i & 1] for mask in range(16)]
+    return table, [t[0] if t else DEFAULT_ACTION for t in table]
+
+def _column(np, values, n, default):
+    if values is None:
+        return np.full(n, default, dtype=float)
+    col = np.asarray(values, dtype=float)  # None -> nan; non-numeric raises ValueError
+    return np.where(np.isnan(col), default, col)
+
+def analyze_health_batch(columns: dict, rows: bool = False) -> dict:
+    """
+    analyze_health for many snapshots in one vectorized pass.
+
+    columns: {"sleep_hours": [...], "water_intake_liters": [...], "exercise_minutes": [...],
+              "stress_level": [...], "ids": [...] (optional, echoed back)}
+    Missing columns / null entries get analyze_health's defaults.
+    Returns columnar results (burnout_risk, risk_score, risk_factors.{sleep,stress,hydration,exercise},
+    recommendations, priority_action), or {"results": [analyze_health-shaped dicts]} with rows=True.
+    Raises ValueError on ragged or non-numeric input.
+    """
+    import numpy as np
+
+    lengths = {len(columns[f]) for f in FIELDS + ("ids",) if columns.get(f) is not None}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length.")
+    n = lengths.pop() if lengths else 0
+    if n > HEALTH_BATCH_MAX_ROWS:
+        raise ValueError(f"At most {HEALTH_BATCH_MAX_ROWS} rows per batch.")
+
+    sleep = _column(np, columns.get("sleep_hours"), n, 0)
+    water = _column(np, columns.get("water_intake_liters"), n, 0)
+    exercise = _column(np, columns.get("exercise_minutes"), n, 0)
+    stress = np.asarray(columns["stress_level"] if columns.get("stress_level") is not None else ["unknown"] * n, dtype=object)
+
+    # level per factor: 0 = worst ... 2 = fine, same cut-offs as analyze_health
+    sleep_level = np.where(sleep < SLEEP_CRITICAL_H, 0, np.where(sleep < SLEEP_MIN_H, 1, 2))
+    stress_high = stress == "high"
+    stress_level = np.where(stress_high, 0, np.where(stress == "medium", 1, 2))
+    water_level = np.where(water < WATER_LOW_L, 0, np.where(water < WATER_MIN_L, 1, 2))
+    exercise_level = np.where(exercise < EXERCISE_VERY_LOW_MIN, 0, np.where(exercise < EXERCISE_MIN, 1, 2))
+
+    def points(levels):
+        return np.array([p for p, _ in levels])
+
+    def labels(levels):
+        return np.array([label for _, label in levels], dtype=object)
+
+    score = (
+        points(SLEEP_LEVELS)[sleep_level]
+        + points(STRESS_LEVELS)[stress_level]
+        + points(WATER_LEVELS)[water_level]
+        + points(EXERCISE_LEVELS)[exercise_level]
+    )
+    risk = np.array(["low", "medium", "high"], dtype=object)[(score >= RISK_MEDIUM).astype(int) + (score >= RISK_HIGH)]
+
+    mask = (
+        (sleep < SLEEP_MIN_H).astype(int)
+        | stress_high.astype(int) << 1
+        | (water < WATER_MIN_L).astype(int) << 2
+        | (exercise < EXERCISE_MIN).astype(int) << 3
+    )
+    rec_table, action_table = _recommendation_table()
+
+    result = {
+        "burnout_risk": risk.tolist(),
+        "risk_score": score.tolist(),
+        "risk_factors": {
+            "sleep": labels(SLEEP_LEVELS)[sleep_level].tolist(),
+            "stress": labels(STRESS_LEVELS)[stress_level].tolist(),
+            "hydration": labels(WATER_LEVELS)[water_level].tolist(),
+            "exercise": labels(EXERCISE_LEVELS)[exercise_level].tolist(),
+        },
+        "recommendations": [rec_table[m] for m in mask.tolist()],
+        "priority_action": [action_table[m] for m in mask.tolist()],
+    }
+
+    ids = columns.get("ids")
+    if rows:
+        factors = result["risk_factors"]
+        out = [
+            {"burnout_risk": risk_, "risk_factors": {"sleep": s, "stress": st, "hydration": h, "exercise": e},
+             "recommendations": recs, "priority_action": action}
+            for risk_, s, st, h, e, recs, action in zip(
+                result["burnout_risk"], factors["sleep"], factors["stress"], factors["hydration"],
+                factors["exercise"], result["recommendations"], result["priority_action"])
+        ]
+        if ids is not None:
+            for row, id_ in zip(out, ids):
+                row["id"] = id_
+        return {"count": n, "results": out}
+
+    if ids is not None:
+        result["ids"] = list(ids)
+    return {"count": n, **result}
+
+def rows_to_columns(rows) -> dict:
+    """
+    Columnar input for analyze_health_batch from an iterable of snapshot dicts (e.g. NDJSON lines).
+    A row's "id" / "user_id" goes to the ids column.
+    """
+    columns = {f: [] for f in FIELDS}
+    ids = []
+    for row in rows:
+        if len(ids) >= HEALTH_BATCH_MAX_ROWS:
+            raise ValueError(f"At most {HEALTH_BATCH_MAX_ROWS} rows per batch.")
+        for f in FIELDS:
+            columns[f].append(row.get(f))
+        ids.append(row.get("id", row.get("user_id")))
+    if any(i is not None for i in ids):
+        columns["ids"] = ids
+    return columns
@@ -0,0 +1,294 @@
+import os
+import sqlite3
+import struct
+import threading
+from array import array
+from datetime import date
+
+from services.health import (
+    EXERCISE_LEVELS, EXERCISE_MIN, EXERCISE_VERY_LOW_MIN, RISK_MEDIUM, SLEEP_CRITICAL_H, SLEEP_LEVELS,
+    SLEEP_MIN_H, STRESS_LEVELS, WATER_LEVELS, WATER_LOW_L, WATER_MIN_L, analyze_health, risk_level,
+)
+
+# Rolling window for the windowed means (observations)
+HEALTH_TREND_WINDOW = int(os.getenv("HEALTH_TREND_WINDOW", "7"))
+# Smoothing of the exponential moving averages (weight of the newest observation)
+HEALTH_TREND_ALPHA = float(os.getenv("HEALTH_TREND_ALPHA", "0.3"))
+# A metric that stays in its bad range this many observations in a row adds a risk point
+HEALTH_TREND_STREAK = int(os.getenv("HEALTH_TREND_STREAK", "3"))
+
+# Tracked series; "score" is analyze_health's daily risk score
+METRICS = ("sleep", "water", "exercise", "stress", "score")
+SLEEP, WATER, EXERCISE, STRESS, SCORE = range(len(METRICS))
+
+STRESS_POINTS = {"high": STRESS_LEVELS[0][0], "medium": STRESS_LEVELS[1][0]}
+STRESS_LABELS = {points: label for label, points in STRESS_POINTS.items()}
+
+_HEADER = struct.Struct("<IIIi")  # window, observations, ring position, last day (ordinal)
+
+
+# ---------- state ----------
+class UserTrend:
+    """
+    Compact rolling state of one user: per metric an EMA, a ring buffer of the last
+    `window` values with its running sum, and the current bad-range streak.
+    update() is O(1) (plus an O(window) resum once per lap); the state serializes to ~500 bytes.
+    """
+
+    __slots__ = ("window", "n", "pos", "last_day", "ema", "ring", "ring_sum", "streak", "prev_ema", "prev_streak")
+
+    def __init__(self, window: int = HEALTH_TREND_WINDOW):
+        k = len(METRICS)
+        self.window = max(1, int(window))
+        self.n = 0
+        self.pos = 0            # next ring slot
+        self.last_day = 0       # date.toordinal() of the latest observation
+        self.ema = array("d", bytes(8 * k))
+        self.ring = array("d", bytes(8 * k * self.window))
+        self.ring_sum = array("d", bytes(8 * k))
+        self.streak = array("d", bytes(8 * k))
+        # state before the latest observation, so a same-day correction replaces it in O(1)
+        self.prev_ema = array("d", bytes(8 * k))
+        self.prev_streak = array("d", bytes(8 * k))
+
+    def update(self, values, day: int) -> None:
+        """
+        values: one number per METRICS entry; day: date ordinal, not older than the latest one.
+        """
+        k = len(METRICS)
+        if self.n and day < self.last_day:
+            raise ValueError("Observation is older than the latest one for this user.")
+
+        if self.n and day == self.last_day:
+            # correction of today's observation: undo it, then re-apply at the same slot
+            self.pos = (self.pos - 1) % self.window
+            self.ema[:] = self.prev_ema
+            self.streak[:] = self.prev_streak
+            first = self.n == 1
+        else:
+            first = self.n == 0
+            self.n += 1
+            self.prev_ema[:] = self.ema
+            self.prev_streak[:] = self.streak
+
+        base = self.pos * k
+        for i in range(k):
+            v = float(values[i])
+            self.ring_sum[i] += v - self.ring[base + i]
+            self.ring[base + i] = v
+            self.ema[i] = v if first else self.ema[i] + HEALTH_TREND_ALPHA * (v - self.ema[i])
+            self.streak[i] = self.streak[i] + 1 if _bad(i, v) else 0
+
+        self.pos = (self.pos + 1) % self.window
+        self.last_day = day
+        if self.pos == 0:
+            # once per lap: recompute the running sums to shed float drift
+            for i in range(k):
+                self.ring_sum[i] = sum(self.ring[j * k + i] for j in range(self.window))
+
+    def latest(self):
+        k = len(METRICS)
+        base = ((self.pos - 1) % self.window) * k
+        return self.ring[base:base + k]
+
+    def window_mean(self):
+        count = min(self.n, self.window) or 1
+        return [s / count for s in self.ring_sum]
+
+    def to_bytes(self) -> bytes:
+        return b"".join((
+            _HEADER.pack(self.window, self.n, self.pos, self.last_day),
+            self.ema.tobytes(), self.ring.tobytes(), self.ring_sum.tobytes(),
+            self.streak.tobytes(), self.prev_ema.tobytes(), self.prev_streak.tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "UserTrend":
+        window, n, pos, last_day = _HEADER.unpack_from(blob)
+        trend = cls(window)
+        trend.n, trend.pos, trend.last_day = n, pos, last_day
+        offset = _HEADER.size
+        for name in ("ema", "ring", "ring_sum", "streak", "prev_ema", "prev_streak"):
+            arr = getattr(trend, name)
+            size = arr.itemsize * len(arr)
+            arr[:] = array("d", blob[offset:offset + size])
+            offset += size
+        return trend
+
+
+def _bad(i: int, v: float) -> bool:
+    if i == SLEEP:
+        return v < SLEEP_MIN_H
+    if i == WATER:
+        return v < WATER_MIN_L
+    if i == EXERCISE:
+        return v < EXERCISE_MIN
+    if i == STRESS:
+        return v >= STRESS_POINTS["high"]
+    return v >= RISK_MEDIUM
+
+
+# ---------- persistence ----------
+class TrendStore:
+    """
+    UserTrend records by user id, in memory or in a SQLite table (one small blob per user).
+    With SQLite every update is a read-modify-write in one transaction, so several
+    worker processes can share the file.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or None
+        self._mem = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: no fsync per update; a crash can lose only the latest commits
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS health_trends (user_id TEXT PRIMARY KEY, state BLOB NOT NULL, last_day INTEGER NOT NULL)"
+            )
+
+    def get(self, user_id: str):
+        with self._lock:
+            return self._load(user_id)
+
+    def update(self, user_id: str, values, day: int) -> UserTrend:
+        with self._lock:
+            if self._db is None:
+                trend = self._mem.get(user_id) or UserTrend()
+                trend.update(values, day)
+                self._mem[user_id] = trend
+                return trend
+
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                trend = self._load(user_id) or UserTrend()
+                trend.update(values, day)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO health_trends (user_id, state, last_day) VALUES (?, ?, ?)",
+                    (user_id, trend.to_bytes(), trend.last_day),
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return trend
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._mem.pop(user_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM health_trends WHERE user_id = ?", (user_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            users = self._db.execute("SELECT COUNT(*) FROM health_trends").fetchone()[0] if self._db else len(self._mem)
+        return {"users": users, "persistent": self._db is not None}
+
+    def _load(self, user_id: str):
+        if self._db is None:
+            return self._mem.get(user_id)
+        row = self._db.execute("SELECT state FROM health_trends WHERE user_id = ?", (user_id,)).fetchone()
+        return UserTrend.from_bytes(row[0]) if row else None
+
+
+# memory | sqlite (default: survives restarts, shared by worker processes)
+_store = TrendStore(
+    path=os.getenv("HEALTH_TRENDS_PATH", "health_trends.sqlite3")
+    if os.getenv("HEALTH_TRENDS_BACKEND", "sqlite").lower() == "sqlite" else None,
+)
+
+
+# ---------- scoring ----------
+def _points(levels, level: int) -> int:
+    return levels[level][0]
+
+def _level(value: float, low: float, minimum: float) -> int:
+    return 0 if value < low else 1 if value < minimum else 2
+
+def _snapshot_score(sleep: float, water: float, exercise: float, stress: float) -> float:
+    # analyze_health's points, for (possibly fractional) averaged values
+    return (
+        _points(SLEEP_LEVELS, _level(sleep, SLEEP_CRITICAL_H, SLEEP_MIN_H))
+        + _points(WATER_LEVELS, _level(water, WATER_LOW_L, WATER_MIN_L))
+        + _points(EXERCISE_LEVELS, _level(exercise, EXERCISE_VERY_LOW_MIN, EXERCISE_MIN))
+        + stress
+    )
+
+def _number(data: dict, key: str) -> float:
+    try:
+        return float(data.get(key) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _observation(data: dict):
+    sleep = _number(data, "sleep_hours")
+    water = _number(data, "water_intake_liters")
+    exercise = _number(data, "exercise_minutes")
+    stress = STRESS_POINTS.get(data.get("stress_level"), 0)
+    return [sleep, water, exercise, stress, _snapshot_score(sleep, water, exercise, stress)]
+
+def _day(value) -> int:
+    if not value:
+        return date.today().toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+def _report(user_id: str, trend: UserTrend) -> dict:
+    latest = trend.latest()
+    mean = trend.window_mean()
+    streaks = {name: int(trend.streak[i]) for i, name in enumerate(METRICS[:SCORE])}
+
+    # sustained problems weigh in on top of the window average
+    long_streaks = [name for name, days in streaks.items() if days >= HEALTH_TREND_STREAK]
+    trend_score = mean[SCORE] + len(long_streaks)
+
+    drift = trend.ema[SCORE] - mean[SCORE]
+    direction = "worsening" if drift > 0.5 else "improving" if drift < -0.5 else "stable"
+
+    today = analyze_health({
+        "sleep_hours": latest[SLEEP],
+        "water_intake_liters": latest[WATER],
+        "exercise_minutes": latest[EXERCISE],
+        "stress_level": STRESS_LABELS.get(int(latest[STRESS]), "low"),
+    })
+    return {
+        "user_id": user_id,
+        "observations": trend.n,
+        "last_date": date.fromordinal(trend.last_day).isoformat(),
+        "burnout_risk": risk_level(trend_score),
+        "trend_score": round(trend_score, 2),
+        "direction": direction,
+        "daily": today,
+        "window_mean": {name: round(mean[i], 2) for i, name in enumerate(METRICS)},
+        "ema": {name: round(trend.ema[i], 2) for i, name in enumerate(METRICS)},
+        "bad_streaks": streaks,
+        "sustained": long_streaks,
+    }
+
+
+# ---------- main ----------
+def record_health(user_id: str, data: dict) -> dict:
+    """
+    Add one snapshot (analyze_health input, plus optional "date": "YYYY-MM-DD", default today)
+    to the user's rolling state and return the trend report. A second snapshot for the
+    latest date replaces it. Raises ValueError for bad dates or dates older than the latest.
+    """
+    trend = _store.update(str(user_id), _observation(data), _day(data.get("date")))
+    return _report(str(user_id), trend)
+
+def health_trend(user_id: str):
+    """
+    Trend report from the stored state (no history scan), or None for unknown users.
+    """
+    trend = _store.get(str(user_id))
+    return _report(str(user_id), trend) if trend is not None else None
+
+def forget_user(user_id: str) -> None:
+    _store.delete(str(user_id))
+
+def stats() -> dict:
+    return _store.stats()
@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+from services.finance import _to_float, analyze_finances
+
+# Distinct categories kept per upload; further ones are folded into "other"
+LEDGER_MAX_CATEGORIES = int(os.getenv("LEDGER_MAX_CATEGORIES", "5000"))
+
+INCOME_TYPES = ("income", "credit", "deposit")
+INCOME_CATEGORIES = ("income", "salary", "paycheck")
+# Money returned for an expense: always reduces its category, whatever the sign
+REFUND_TYPES = ("refund", "reversal", "chargeback")
+# Sign of an expense amount in the ledger; the opposite sign is a refund
+EXPENSE_SIGNS = ("positive", "negative")
+
+_CATEGORY_KEYS = ("category", "cat", "label")
+_AMOUNT_KEYS = ("amount", "value", "sum")
+_DATE_KEYS = ("date", "timestamp", "booked_at")
+
+
+# ---------- parsing ----------
+def iter_csv(lines):
+    """
+    Transactions (dicts with lower-cased keys) from CSV text lines with a header row.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    keys = [h.strip().lower() for h in header]
+    for row in reader:
+        if row:
+            yield dict(zip(keys, row))
+
+def iter_ndjson(lines):
+    """
+    Transactions from NDJSON text lines; blank lines are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            row = json.loads(line)
+            yield {str(k).lower(): v for k, v in row.items()} if isinstance(row, dict) else {}
+
+def _first(row: dict, keys):
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+_YEAR_FIRST = re.compile(r"(\d{4})[-/.](\d{1,2})(?:[-/.](\d{1,2}))?(?:[T ].*)?$")
+_EPOCH = re.compile(r"\d{9,13}(?:\.\d*)?$")
+
+def _month(value, date_format=None):
+    """
+    "YYYY-MM" of a transaction date, None when there is none. Without date_format: ISO dates
+    and datetimes, YYYY/MM/DD, YYYY.MM.DD and Unix timestamps (seconds or milliseconds);
+    day/month orders are ambiguous and need an explicit strptime date_format.
+    Raises ValueError for a date it cannot read.
+    """
+    if value in (None, ""):
+        return None
+    text = str(value).strip()
+    if date_format:
+        return datetime.strptime(text, date_format).strftime("%Y-%m")
+    if isinstance(value, (int, float)) or _EPOCH.match(text):
+        ts = float(text)
+        if ts > 1e11:
+            ts /= 1000
+        return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m")
+    m = _YEAR_FIRST.match(text)
+    if m and 1 <= int(m.group(2)) <= 12 and (m.group(3) is None or 1 <= int(m.group(3)) <= 31):
+        return f"{m.group(1)}-{int(m.group(2)):02d}"
+    raise ValueError(f"unrecognized date {text[:40]!r} (pass date_format, e.g. %d/%m/%Y)")
+
+
+# ---------- aggregation ----------
+def aggregate_ledger(transactions, sign: str = "positive", date_format=None) -> dict:
+    """
+    One pass over a transaction iterable; memory grows with the number of categories
+    and months, not with the number of transactions.
+
+    A transaction is income when its "type" is income/credit/deposit or its category is
+    income/salary/paycheck (a negative income amount is a reversal). Everything else is an
+    expense: `sign` is the sign expenses carry in this ledger ("positive", or "negative" for
+    bank exports), amounts of the other sign and "type" refund/reversal/chargeback rows are
+    refunds and reduce their category (net spend per category floors at 0).
+    Raises ValueError for an unknown sign or an unreadable date (see _month).
+    Returns monthly averages: {"expenses": {category: amount}, "monthly_income", "months",
+    "transactions", "skipped", "first_month", "last_month"}.
+    """
+    if sign not in EXPENSE_SIGNS:
+        raise ValueError(f"sign must be one of {', '.join(EXPENSE_SIGNS)}.")
+    direction = 1.0 if sign == "positive" else -1.0
+
+    totals = {}
+    income = 0.0
+    months = set()
+    count = skipped = 0
+
+    for row in transactions:
+        amount = _to_float(_first(row, _AMOUNT_KEYS), None)
+        if amount is None:
+            skipped += 1
+            continue
+        count += 1
+
+        month = _month(_first(row, _DATE_KEYS), date_format)
+        if month:
+            months.add(month)
+
+        category = " ".join(str(_first(row, _CATEGORY_KEYS) or "uncategorized").split()).lower()
+        kind = str(row.get("type") or "").strip().lower()
+        if kind in INCOME_TYPES or category in INCOME_CATEGORIES:
+            # inflows are positive in either convention
+            income += amount
+            continue
+        spend = -abs(amount) if kind in REFUND_TYPES else amount * direction
+
+        if category not in totals and len(totals) >= LEDGER_MAX_CATEGORIES:
+            category = "other"
+        totals[category] = totals.get(category, 0.0) + spend
+
+    n_months = max(1, len(months))
+    return {
+        "expenses": {k: round(max(0.0, v) / n_months, 2) for k, v in totals.items()},
+        "monthly_income": round(income / n_months, 2) if income else None,
+        "months": n_months,
+        "transactions": count,
+        "skipped": skipped,
+        "first_month": min(months) if months else None,
+        "last_month": max(months) if months else None,
+    }
+
+def analyze_ledger(transactions, savings_goal=0, monthly_income=None, sign="positive", date_format=None) -> dict:
+    """
+    aggregate_ledger + analyze_finances on the monthly averages.
+    An explicit monthly_income overrides the income found in the ledger.
+    """
+    ledger = aggregate_ledger(transactions, sign=sign, date_format=date_format)
+    income = monthly_income if monthly_income is not None else ledger["monthly_income"]
+    result = analyze_finances({
+        "expenses": ledger.pop("expenses"),
+        "savings_goal": savings_goal,
+        "monthly_income": income,
+    })
+    result["ledger"] = ledger
+    return result
@@ -0,0 +1,211 @@
+import os
+from functools import reduce
+from math import gcd
+from typing import Any, Dict, List
+
+# Value of one scheduled minute per priority
+PRIORITY_WEIGHT = {"low": 1, "medium": 2, "high": 4}
+# Activity types that need energy: placed in the user's peak, followed by breaks
+DEMANDING_TYPES = ("focus", "study", "work")
+
+# Knapsack table size limit (activities x capacity steps, one byte each); above it a priority-greedy selection is used
+PLANNER_DP_BUDGET = int(os.getenv("PLANNER_DP_BUDGET", "20000000"))
+
+# Default break rhythm: a break of BREAK_LEN_MIN after every BREAK_EVERY_MIN of demanding work
+BREAK_EVERY_MIN = 50
+BREAK_LEN_MIN = 10
+
+MORNING_PROFILES = ("morning", "early", "early bird", "morning person")
+EVENING_PROFILES = ("evening", "night", "night owl", "late")
+
+
+class _Item:
+    __slots__ = ("index", "name", "duration", "weight", "demanding", "start")
+
+    def __init__(self, index: int, a: Dict[str, Any]):
+        self.index = index
+        self.name = a.get("name") or a.get("title") or "Activity"
+        try:
+            self.duration = max(1, int(a.get("duration", 30)))
+        except (TypeError, ValueError):
+            self.duration = 30
+        self.weight = PRIORITY_WEIGHT.get(str(a.get("priority", "medium")).lower(), PRIORITY_WEIGHT["medium"])
+        self.demanding = str(a.get("type", "")).lower() in DEMANDING_TYPES
+        self.start = _parse_time(a.get("fixed_start") or a.get("start"))
+
+
+def _parse_time(value):
+    try:
+        h, m = str(value).split(":")
+        return int(h) * 60 + int(m)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _hhmm(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+def _entry(start: int, end: int, activity: str) -> Dict[str, str]:
+    return {"start": _hhmm(start), "end": _hhmm(end), "activity": activity}
+
+
+# ---------- selection ----------
+def _cost(item: _Item, break_every_min: int, break_len_min: int) -> int:
+    # demanding work also uses up the breaks it will be followed by
+    if item.demanding and break_every_min > 0:
+        return item.duration + break_len_min * (item.duration // break_every_min)
+    return item.duration
+
+def _select(items: List[_Item], capacity: int, cost) -> List[_Item]:
+    """
+    0/1 knapsack: the subset with the most priority-weighted minutes whose cost fits capacity.
+    """
+    costs = [cost(i) for i in items]
+    if sum(costs) <= capacity:
+        return list(items)
+    if capacity <= 0 or not items:
+        return []
+
+    # work in units of the common divisor of all durations (usually 5 or 15 minutes)
+    step = reduce(gcd, costs)
+    units = capacity // step
+    if len(items) * units > PLANNER_DP_BUDGET:
+        return _select_greedy(items, costs, capacity)
+
+    import numpy as np
+
+    # one vectorized row per activity; candidates come from the previous row (0/1, not unbounded)
+    best = np.zeros(units + 1, dtype=np.int64)
+    took = np.zeros((len(items), units + 1), dtype=bool)
+    for k, (item, c) in enumerate(zip(items, costs)):
+        w = c // step
+        if w > units:
+            continue
+        candidate = best[:units + 1 - w] + item.weight * item.duration
+        better = candidate > best[w:]
+        took[k, w:] = better
+        best[w:] = np.where(better, candidate, best[w:])
+
+    chosen = []
+    u = units
+    for k in range(len(items) - 1, -1, -1):
+        if took[k][u]:
+            chosen.append(items[k])
+            u -= costs[k] // step
+    chosen.reverse()
+    return chosen
+
+def _select_greedy(items: List[_Item], costs: List[int], capacity: int) -> List[_Item]:
+    # value per minute is the priority weight: best priority first, shorter first to fit more
+    chosen = []
+    left = capacity
+    for c, item in sorted(zip(costs, items), key=lambda x: (-x[1].weight, x[0], x[1].index)):
+        if c <= left:
+            chosen.append(item)
+            left -= c
+    chosen.sort(key=lambda i: i.index)
+    return chosen
+
+
+# ---------- ordering ----------
+def _order(items: List[_Item], energy: str) -> List[_Item]:
+    """
+    Demanding work in the energy peak: first for morning profiles, last for evening ones,
+    alternated with lighter activities otherwise (no back-to-back heavy blocks).
+    """
+    rank = lambda i: (-i.weight, i.index)
+    heavy = sorted((i for i in items if i.demanding), key=rank)
+    light = sorted((i for i in items if not i.demanding), key=rank)
+    profile = str(energy or "").strip().lower()
+    if profile in MORNING_PROFILES:
+        return heavy + light
+    if profile in EVENING_PROFILES:
+        return light + heavy
+    out = []
+    for k in range(max(len(heavy), len(light))):
+        out.extend(group[k] for group in (heavy, light) if k < len(group))
+    return out
+
+
+# ---------- placement ----------
+def _place(items: List[_Item], gaps: List[List[int]], state: Dict, break_every_min: int, break_len_min: int):
+    """
+    First fit into the free gaps ([cursor, end] lists, updated in place), with a break after
+    every `break_every_min` minutes of demanding work. Returns the items that did not fit.
+    """
+    left = []
+    for item in items:
+        for gap in gaps:
+            if gap[0] + item.duration > gap[1]:
+                continue
+            start = gap[0]
+            state["out"].append(_entry(start, start + item.duration, item.name))
+            gap[0] = start + item.duration
+            key = id(gap)
+            if item.demanding:
+                state["focus"][key] = state["focus"].get(key, 0) + item.duration
+                if break_every_min > 0 and state["focus"][key] >= break_every_min and gap[0] + break_len_min <= gap[1]:
+                    state["out"].append(_entry(gap[0], gap[0] + break_len_min, "Break"))
+                    gap[0] += break_len_min
+                    state["focus"][key] = 0
+            break
+        else:
+            left.append(item)
+    return left
+
+
+# ---------- main ----------
+def plan_schedule(activities: List[Dict[str, Any]], day_start: str, day_end: str, energy: str = "balanced",
+                  break_every_min: int = BREAK_EVERY_MIN, break_len_min: int = BREAK_LEN_MIN):
+    """
+    Deterministic day plan. Returns (schedule, unscheduled activity names).
+
+    1. activities with "fixed_start" (or "start") "HH:MM" are pinned; on overlap the higher priority wins
+    2. flexible activities are chosen by a knapsack over the remaining free time,
+       maximizing priority-weighted minutes (breaks included in the cost)
+    3. they are ordered by the energy profile and packed first-fit into the free gaps;
+       whatever still fits afterwards fills the leftover holes
+    """
+    ds = _parse_time(day_start)
+    de = _parse_time(day_end)
+    if ds is None or de is None or de <= ds:
+        raise ValueError("Invalid day_start / day_end.")
+
+    items = [_Item(k, a) for k, a in enumerate(activities) if isinstance(a, dict)]
+    fixed = [i for i in items if i.start is not None]
+    flexible = [i for i in items if i.start is None]
+    unscheduled = []
+
+    # 1) pinned blocks
+    blocks = []
+    for item in sorted(fixed, key=lambda i: (-i.weight, i.start, i.index)):
+        s, e = item.start, item.start + item.duration
+        if ds <= s and e <= de and all(e <= bs or s >= be for bs, be, _ in blocks):
+            blocks.append((s, e, item.name))
+        else:
+            unscheduled.append(item)
+    blocks.sort()
+
+    gaps = []
+    cur = ds
+    for s, e, _ in blocks:
+        if s > cur:
+            gaps.append([cur, s])
+        cur = max(cur, e)
+    if cur < de:
+        gaps.append([cur, de])
+
+    # 2) selection, 3) ordering and placement
+    cost = lambda i: _cost(i, break_every_min, break_len_min)
+    chosen = _select(flexible, sum(e - s for s, e in gaps), cost)
+    chosen_ids = {id(i) for i in chosen}
+    state = {"out": [_entry(s, e, name) for s, e, name in blocks], "focus": {}}
+    left = _place(_order(chosen, energy), gaps, state, break_every_min, break_len_min)
+
+    rest = left + [i for i in flexible if id(i) not in chosen_ids]
+    rest.sort(key=lambda i: (-i.weight, i.duration, i.index))
+    unscheduled += _place(rest, gaps, state, break_every_min, break_len_min)
+
+    schedule = sorted(state["out"], key=lambda x: x["start"])
+    while schedule and schedule[-1]["activity"] == "Break":
+        schedule.pop()
+    return schedule, [i.name for i in sorted(unscheduled, key=lambda i: i.index)]
@@ -0,0 +1,118 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.cache import make_cache
+from utils.singleflight import canonical_key
+
+logger = logging.getLogger(__name__)
+
+# Results computed ahead of time by `cli.py precompute` and checked by the routes before any
+# model call. off (default): no store, no lookups; sqlite: shared by the CLI run and the
+# serving processes (both need the same PRECOMPUTE_PATH).
+_store = make_cache(
+    os.getenv("PRECOMPUTE_BACKEND", "off"),
+    max_items=int(os.getenv("PRECOMPUTE_MAX", "100000")),
+    # a nightly run covers the next day
+    ttl=float(os.getenv("PRECOMPUTE_TTL_S", "129600")),
+    path=os.getenv("PRECOMPUTE_PATH", "precomputed.sqlite3"),
+)
+metrics.register_cache("precomputed", _store)
+
+
+# ---------- keys ----------
+def _schedule_key(data: dict) -> str:
+    from services.schedule import _fingerprint, _parse_request
+    return "schedule:" + _fingerprint(*_parse_request(data))
+
+def _summary_key(data: dict) -> str:
+    # the illustration cache's key: moods that normalize alike share one entry
+    from services.summary import DEFAULT_MOOD, _normalize_mood
+    return "summary:" + canonical_key({"mood": _normalize_mood(data.get("mood", DEFAULT_MOOD))})
+
+_KEYS = {"schedule": _schedule_key, "summary": _summary_key}
+
+
+# ---------- serving ----------
+def lookup(kind: str, data: dict):
+    """
+    The precomputed result for a "schedule" / "summary" request body, or None.
+    """
+    if _store is None:
+        return None
+    try:
+        result = _store.get(_KEYS[kind](data))
+    except Exception as e:
+        # a bad body is reported by the service itself
+        logger.debug(f"Precomputed lookup skipped: {e}")
+        return None
+    if result is not None and kind == "summary":
+        # the text echoes the caller's own spelling of the mood
+        from services.summary import DEFAULT_MOOD, _summary_text
+        result = {**result, "summary": _summary_text(data.get("mood", DEFAULT_MOOD))}
+    return result
+
+
+# ---------- batch ----------
+def _compute_schedule(data: dict):
+    from services import schedule
+    result, cacheable = schedule._generate_schedule(*schedule._parse_request(data))
+    return result if cacheable else None
+
+def _compute_summary(data: dict):
+    from services.summary import DEFAULT_MOOD, _generate_daily_summary
+    result = _generate_daily_summary(data.get("mood", DEFAULT_MOOD))
+    return result if result["visual"] else None
+
+_COMPUTE = {"schedule": _compute_schedule, "summary": _compute_summary}
+
+def precompute(entries, concurrency: int = 4, force: bool = False) -> dict:
+    """
+    Generate and store results for entries {"user_id", "schedule": {...}, "summary": {...}}
+    (either part optional; each is the body the client will send). Identical bodies run once.
+    Fallback results (model failed or unavailable) are not stored, so the morning request retries.
+    Returns {"jobs", "stored", "cached", "fallback", "failed": [{"user_id", "kind", "error"}], "seconds"}.
+    """
+    if _store is None:
+        raise RuntimeError("PRECOMPUTE_BACKEND is off: set it to sqlite (and PRECOMPUTE_PATH) for the CLI and the service.")
+
+    jobs = {}
+    report = {"jobs": 0, "stored": 0, "cached": 0, "fallback": 0, "failed": [], "seconds": 0.0}
+    for entry in entries:
+        for kind in _COMPUTE:
+            data = entry.get(kind)
+            if isinstance(data, dict):
+                try:
+                    key = _KEYS[kind](data)
+                except Exception as e:
+                    report["failed"].append({"user_id": entry.get("user_id"), "kind": kind, "error": str(e)})
+                    continue
+                jobs.setdefault(key, (kind, entry.get("user_id"), data))
+    report["jobs"] = len(jobs)
+
+    def run(item):
+        key, (kind, user_id, data) = item
+        if not force and key in _store:
+            return "cached", None
+        try:
+            result = _COMPUTE[kind](data)
+        except Exception as e:
+            logger.warning(f"Precompute {kind} failed for user {user_id}: {type(e).__name__}: {e}")
+            return "failed", {"user_id": user_id, "kind": kind, "error": f"{type(e).__name__}: {e}"}
+        if result is None:
+            return "fallback", None
+        _store.set(key, result)
+        return "stored", None
+
+    t0 = time.perf_counter()
+    # concurrency bounds the users in flight; the model limiter bounds the upstream calls
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="precompute") as pool:
+        for outcome, failure in pool.map(run, jobs.items()):
+            if failure:
+                report["failed"].append(failure)
+            else:
+                report[outcome] += 1
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    return report
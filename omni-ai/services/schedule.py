@@ -1,9 +1,61 @@
+import asyncio
 import json
-import re
-from typing import Any, Dict, List
-
-from utils.gemini import client
-from utils.image_utils import extract_image_from_response, render_schedule_image
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from services.planner import EVENING_PROFILES, MORNING_PROFILES, _parse_time, plan_schedule
+from utils import gemini, metrics
+from utils.background_cache import background_cache
+from utils.cache import make_cache
+from utils.image_utils import extract_image_from_response
+from utils.json_stream import JSONObjectScanner, first_object
+from utils.render_pool import render_schedule
+from utils.singleflight import SingleFlight, canonical_key
+
+# End-to-end budget for the model calls of one request (seconds). The schedule
+# falls back to the deterministic planner and the image to a plain canvas.
+SCHEDULE_DEADLINE_S = float(os.getenv("SCHEDULE_DEADLINE_S", "25"))
+
+# When the model is asked for the schedule:
+#   auto   - the deterministic planner answers; Gemini only refines requests with "refine": true
+#            (the planner already fits the most priority-weighted time, an overfull day included)
+#   always - Gemini first, planner on failure
+#   never  - planner only
+# Without GENAI_API_KEY the planner's schedule is final (and cacheable) in every mode.
+SCHEDULE_LLM = os.getenv("SCHEDULE_LLM", "auto").strip().lower()
+
+SCHEDULE_MODEL = "gemini-2.5-flash"
+BG_MODEL = "gemini-2.5-flash-image"
+BG_PROMPT = (
+    "Generate a clean minimal planner background (no text), white/light theme, "
+    "modern UI paper texture, subtle lines, professional, visally appealing."
+    "the activities font size has to be respective to the slot they re in."
+)
+
+# Shared by all requests: schedule model calls and renders
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SCHEDULE_WORKERS", "16")),
+    thread_name_prefix="schedule",
+)
+# Background calls run beside them in their own pool: concurrent misses wait on the
+# background cache's per-key lock, and must not take the threads schedule calls need
+_bg_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SCHEDULE_BG_WORKERS", "8")),
+    thread_name_prefix="schedule-bg",
+)
+
+_flight = SingleFlight("schedule")
+
+# Finished schedules (model output + rendered image) keyed by the request fingerprint
+_results = make_cache(
+    os.getenv("SCHEDULE_CACHE_BACKEND", "memory"),
+    max_items=int(os.getenv("SCHEDULE_CACHE_MAX", "512")),
+    ttl=float(os.getenv("SCHEDULE_CACHE_TTL_S", "86400")),
+    path=os.getenv("SCHEDULE_CACHE_PATH", "schedule_cache.sqlite3"),
+)
+metrics.register_cache("schedule", _results)
 
 # ---------- helpers ----------
 def _hhmm_to_min(s: str) -> int:
@@ -17,7 +69,7 @@ def _min_to_hhmm(m: int) -> str:
 
 def _extract_json(text: str) -> Dict[str, Any]:
     """
-    Gemini sometimes wraps JSON with text. We pull the first {...} block.
+    Gemini sometimes wraps JSON with text. We pull the first balanced {...} block.
     """
     text = text.strip()
     # Try direct parse
@@ -26,11 +78,41 @@ def _extract_json(text: str) -> Dict[str, Any]:
     except Exception:
         pass
 
-    # Find first JSON object block
-    m = re.search(r"\{.*\}", text, flags=re.DOTALL)
-    if not m:
-        raise ValueError("No JSON object found in Gemini output.")
-    return json.loads(m.group(0))
+    # Single brace/string-aware pass; ignores trailing text and braces
+    return first_object(text)
+
+def _iter_model_schedule(chunks, scanner: JSONObjectScanner, day_start: str, day_end: str, deadline: Optional[float] = None):
+    """
+    Yields validated schedule entries from streamed model output as each one closes.
+    Stops reading once the top-level object is complete (scanner.value() then has it).
+    Raises on the first invalid entry, so the caller can abort the generation.
+    """
+    last_end = day_start
+    scan_s = validate_s = 0.0
+    try:
+        for chunk in chunks:
+            t0 = time.perf_counter()
+            items = scanner.feed(getattr(chunk, "text", "") or "")
+            scan_s += time.perf_counter() - t0
+            for item in items:
+                if not isinstance(item, dict):
+                    raise ValueError("Schedule item missing keys.")
+                # each entry must fit after the previous one
+                t0 = time.perf_counter()
+                _validate_schedule([item], last_end, day_end)
+                validate_s += time.perf_counter() - t0
+                last_end = item["end"]
+                yield item
+            if scanner.done:
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("Schedule stream exceeded deadline")
+        if not scanner.done:
+            raise ValueError("No JSON object found in Gemini output.")
+    finally:
+        # parsing is interleaved with the stream: report the summed CPU time once
+        metrics.observe("schedule.extract_json", scan_s)
+        metrics.observe("schedule.validate", validate_s)
 
 def _validate_schedule(schedule: List[Dict[str, str]], day_start: str, day_end: str) -> None:
     ds = _hhmm_to_min(day_start)
@@ -50,69 +132,48 @@ def _validate_schedule(schedule: List[Dict[str, str]], day_start: str, day_end:
 
 def _fallback_schedule(activities: List[Dict[str, Any]], day_start: str, day_end: str, break_every_min: int = 50, break_len_min: int = 10):
     """
-    Deterministic fallback: priority sort + breaks.
+    Deterministic schedule (see services.planner), without the list of left-out activities.
     """
-    ds = _hhmm_to_min(day_start)
-    de = _hhmm_to_min(day_end)
-
-    def prio(a):
-        p = str(a.get("priority", "medium")).lower()
-        return {"low": 1, "medium": 2, "high": 3}.get(p, 2)
+    schedule, _ = plan_schedule(activities, day_start, day_end, break_every_min=break_every_min, break_len_min=break_len_min)
+    return schedule
 
-    # Focus tasks first, then others
-    acts = sorted(activities, key=lambda a: (prio(a), a.get("type", "") == "focus"), reverse=True)
-
-    cur = ds
-    out = []
-    focus_counter = 0
-
-    for a in acts:
-        dur = int(a.get("duration", 30))
-        name = a.get("name") or a.get("title") or "Activity"
-
-        if cur + dur > de:
-            break
-
-        out.append({"start": _min_to_hhmm(cur), "end": _min_to_hhmm(cur + dur), "activity": name})
-        cur += dur
-
-        # insert breaks after focus-y work
-        typ = str(a.get("type", "")).lower()
-        if typ in ["focus", "study", "work"]:
-            focus_counter += dur
-            if focus_counter >= break_every_min and cur + break_len_min <= de:
-                out.append({"start": _min_to_hhmm(cur), "end": _min_to_hhmm(cur + break_len_min), "activity": "Break"})
-                cur += break_len_min
-                focus_counter = 0
-
-    return out
-
-# ---------- main ----------
-def generate_schedule(data: Dict[str, Any]) -> Dict[str, Any]:
+def _plan(activities: List[Dict[str, Any]], day_start: str, day_end: str, energy: str):
     """
-    Input (recommended):
-    {
-      "day_start":"08:00",
-      "day_end":"22:00",
-      "energy":"morning",
-      "activities":[
-        {"name":"Study AI","duration":120,"type":"focus","priority":"high"},
-        ...
-      ]
-    }
+    (schedule, reasoning, unscheduled) from the deterministic planner.
     """
-    day_start = data.get("day_start", "08:00")
-    day_end = data.get("day_end", "22:00")
-    energy = data.get("energy", "balanced")
-
-    activities = data.get("activities")
-    if activities is None:
-        # Backward compatible with your old "tasks" shape
-        tasks = data.get("tasks", [])
-        activities = [{"name": t.get("title"), "duration": t.get("duration", 60), "type": "focus", "priority": "medium"} for t in tasks]
-
-    # 1) Ask Gemini to create an optimized schedule as STRICT JSON
-    gemini_prompt = f"""
+    with metrics.timer("schedule.plan"):
+        schedule, unscheduled = plan_schedule(activities, day_start, day_end, energy)
+    profile = str(energy).strip().lower()
+    placement = "Focus work first, while energy is highest." if profile in MORNING_PROFILES \
+        else "Focus work last, when energy peaks." if profile in EVENING_PROFILES \
+        else "Focus work alternated with lighter activities."
+    reasoning = [
+        "Activities chosen to fit the most priority-weighted time into the day.",
+        placement,
+        "Breaks inserted after long focus periods.",
+    ]
+    if unscheduled:
+        reasoning.append(f"Did not fit: {', '.join(map(str, unscheduled))}.")
+    return schedule, reasoning, unscheduled
+
+def _wants_model(refine: bool, reasoning: List[str]):
+    """
+    (ask the model?, reasoning). A request that wanted the model while no API key is set
+    keeps the planner's schedule and says why.
+    """
+    if SCHEDULE_LLM == "never" or not (refine or SCHEDULE_LLM == "always"):
+        return False, reasoning
+    if not gemini.configured():
+        return False, reasoning + ["AI refinement skipped: Gemini is not configured (GENAI_API_KEY not set)."]
+    return True, reasoning
+
+# ---------- model calls ----------
+def _build_prompt(activities: List[Dict[str, Any]], day_start: str, day_end: str, energy: str, draft: Optional[List[Dict[str, str]]] = None) -> str:
+    draft_text = f"""
+Draft schedule to improve (fit in what it left out if possible):
+{json.dumps(draft, ensure_ascii=False)}
+""" if draft else ""
+    return f"""
 You are an expert personal scheduler.
 
 Create an optimized daily schedule from the provided activities and constraints.
@@ -124,10 +185,11 @@ Constraints:
 - Insert breaks (5–15 minutes) after long focus periods.
 - Avoid back-to-back heavy focus blocks.
 - Keep the schedule realistic and ordered.
+- Activities with a fixed_start must start exactly at that time.
 
 Activities (name, duration minutes, type, priority):
 {json.dumps(activities, ensure_ascii=False)}
-
+{draft_text}
 Return ONLY valid JSON in exactly this format (no markdown, no extra text):
 {{
   "schedule": [
@@ -140,55 +202,388 @@ Return ONLY valid JSON in exactly this format (no markdown, no extra text):
 }}
 """
 
-    schedule = None
-    reasoning = None
+def _parse_model_schedule(resp, day_start: str, day_end: str):
+    """
+    (schedule, reasoning) from a Gemini response. Raises if the output is unusable.
+    """
+    with metrics.timer("schedule.extract_json"):
+        parsed = _extract_json(getattr(resp, "text", "") or "")
+    schedule = parsed.get("schedule")
+
+    if not isinstance(schedule, list) or not schedule:
+        raise ValueError("Gemini returned empty schedule.")
 
+    with metrics.timer("schedule.validate"):
+        _validate_schedule(schedule, day_start, day_end)
+
+    return schedule, _reasoning(parsed)
+
+def _reasoning(parsed: Dict[str, Any]) -> List[str]:
+    reasoning = parsed.get("reasoning")
+    if not isinstance(reasoning, list):
+        reasoning = ["Schedule optimized based on energy, priorities, and breaks."]
+    return reasoning
+
+@metrics.timed("schedule.model")
+def _request_schedule(prompt: str, day_start: str, day_end: str, deadline: Optional[float] = None):
+    """
+    Ask Gemini for a STRICT JSON schedule. Raises if the output is unusable.
+    The output is streamed: generation stops as soon as the object closes, an entry is invalid
+    or the deadline passes.
+    """
+    chunks = gemini.generate_content_stream(
+        model=SCHEDULE_MODEL,
+        contents=[prompt]
+    )
+    scanner = JSONObjectScanner("schedule")
     try:
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[gemini_prompt]
-        )
+        schedule = list(_iter_model_schedule(chunks, scanner, day_start, day_end, deadline))
+    finally:
+        chunks.close()
 
-        parsed = _extract_json(getattr(resp, "text", "") or "")
-        schedule = parsed.get("schedule")
-        reasoning = parsed.get("reasoning")
+    if not schedule:
+        raise ValueError("Gemini returned empty schedule.")
 
-        if not isinstance(schedule, list) or not schedule:
-            raise ValueError("Gemini returned empty schedule.")
+    return schedule, _reasoning(scanner.value())
 
-        _validate_schedule(schedule, day_start, day_end)
+def _generate_background() -> Optional[bytes]:
+    img_resp = gemini.generate_content(
+        model=BG_MODEL,
+        contents=[BG_PROMPT]
+    )
+    return extract_image_from_response(img_resp)
+
+@metrics.timed("schedule.background")
+def _request_background():
+    """
+    Nice background from Gemini image (optional); the true schedule is overlaid with PIL.
+    Served from the background cache; the image model only runs on a miss.
+    """
+    return background_cache.get(BG_PROMPT, BG_MODEL, _generate_background)
+
+def _fallback(plan, e: Exception):
+    # 2) Fallback to the planner's schedule if Gemini output is malformed or late
+    metrics.inc("omni_fallback_total", help="Responses served by a fallback path.", service="schedule", reason=type(e).__name__)
+    schedule, reasoning, _ = plan
+    cause = "AI output/format limits" if isinstance(e, ValueError) else "the AI service being unavailable or late"
+    reasoning = reasoning + [
+        f"Used deterministic scheduling due to {cause}.",
+        f"Fallback reason: {type(e).__name__}"
+    ]
+    return schedule, reasoning
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+def _parse_request(data: Dict[str, Any]):
+    day_start = data.get("day_start", "08:00")
+    day_end = data.get("day_end", "22:00")
+    energy = data.get("energy", "balanced")
+    refine = bool(data.get("refine", False))
 
-        if not isinstance(reasoning, list):
-            reasoning = ["Schedule optimized based on energy, priorities, and breaks."]
+    activities = data.get("activities")
+    if activities is None:
+        # Backward compatible with your old "tasks" shape
+        tasks = data.get("tasks", [])
+        activities = [{"name": t.get("title"), "duration": t.get("duration", 60), "type": "focus", "priority": "medium"} for t in tasks if isinstance(t, dict)]
+    if not isinstance(activities, list):
+        raise ValueError("activities must be a list.")
 
-    except Exception as e:
-        # 2) Fallback deterministic scheduling if Gemini output is malformed
-        schedule = _fallback_schedule(activities, day_start, day_end)
-        reasoning = [
-            "Used deterministic fallback scheduling due to AI output/format limits.",
-            f"Fallback reason: {type(e).__name__}"
-        ]
+    ds, de = _parse_time(day_start), _parse_time(day_end)
+    if ds is None or de is None or not 0 <= ds < de <= 24 * 60:
+        # overnight ranges (22:00-02:00) are not supported
+        raise ValueError("day_start and day_end must be HH:MM times with day_start before day_end.")
+
+    return day_start, day_end, energy, activities, refine
+
+def check_request(data: Dict[str, Any]) -> None:
+    """
+    Raises ValueError when a schedule request body is unusable (the routes answer 400).
+    """
+    _parse_request(data)
 
-    # 3) Generate a nice background with Gemini image (optional), then overlay the true schedule with PIL
-    base_bytes = None
+def _normalize_activity(a: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(a)
+    name = a.get("name") or a.get("title") or "Activity"
+    out["name"] = " ".join(str(name).split())
+    out.pop("title", None)
     try:
-        bg_prompt = (
-            "Generate a clean minimal planner background (no text), white/light theme, "
-            "modern UI paper texture, subtle lines, professional, visally appealing."
-            "the activities font size has to be respective to the slot they re in."
-        )
-        img_resp = client.models.generate_content(
-            model="gemini-2.5-flash-image",
-            contents=[bg_prompt]
-        )
-        base_bytes = extract_image_from_response(img_resp)
+        out["duration"] = int(a.get("duration", 30))
+    except (TypeError, ValueError):
+        pass
+    out["type"] = str(a.get("type", "")).strip().lower()
+    out["priority"] = str(a.get("priority", "medium")).strip().lower()
+    return out
+
+def _fingerprint(day_start: str, day_end: str, energy: str, activities: List[Dict[str, Any]], refine: bool = False) -> str:
+    """
+    Canonical hash of everything the schedule depends on.
+    """
+    return canonical_key({
+        "day_start": str(day_start).strip(),
+        "day_end": str(day_end).strip(),
+        "energy": str(energy).strip().lower(),
+        "activities": [_normalize_activity(a) if isinstance(a, dict) else a for a in activities],
+        "refine": refine,
+    })
+
+# ---------- main ----------
+def generate_schedule(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Input (recommended):
+    {
+      "day_start":"08:00",
+      "day_end":"22:00",
+      "energy":"morning",
+      "activities":[
+        {"name":"Study AI","duration":120,"type":"focus","priority":"high"},
+        ...
+      ],
+      "refine": false    (optional: ask Gemini to improve the planner's schedule)
+    }
+    Activities with "fixed_start": "HH:MM" are kept at that time.
+    """
+    request = _parse_request(data)
+    key = _fingerprint(*request)
+
+    if _results is not None:
+        cached = _results.get(key)
+        if cached is not None:
+            return cached
+
+    # identical requests in flight (retries, double clicks) share one upstream run
+    return _flight.do(key, _generate_and_cache, key, *request)
+
+def _generate_and_cache(key: str, *request) -> Dict[str, Any]:
+    result, cacheable = _generate_schedule(*request)
+    # fallbacks after a failed model call are not cached, so the next request retries the model
+    if cacheable and _results is not None:
+        _results.set(key, result)
+    return result
+
+@metrics.timed("schedule.total")
+def _generate_schedule(day_start: str, day_end: str, energy: str, activities: List[Dict[str, Any]], refine: bool = False):
+    """
+    Returns (result, cacheable).
+    """
+    deadline = time.monotonic() + SCHEDULE_DEADLINE_S
+
+    # 1) + 3) are independent: start the schedule and the background call together
+    bg_future = _bg_executor.submit(metrics.bind(_request_background))
+
+    plan = _plan(activities, day_start, day_end, energy)
+    schedule, reasoning, _ = plan
+    cacheable = True
+    use_model, reasoning = _wants_model(refine, reasoning)
+    if use_model:
+        schedule_future = None
+        try:
+            # breaker open or no API key: keep the planner's schedule
+            gemini.ensure_available(SCHEDULE_MODEL)
+            with metrics.timer("schedule.prompt"):
+                prompt = _build_prompt(activities, day_start, day_end, energy, schedule)
+            schedule_future = _executor.submit(metrics.bind(_request_schedule), prompt, day_start, day_end, deadline)
+            schedule, reasoning = schedule_future.result(timeout=_remaining(deadline))
+        except Exception as e:
+            # still queued: drop it; already running: it stops at the deadline
+            if schedule_future is not None:
+                schedule_future.cancel()
+            cacheable = False
+            schedule, reasoning = _fallback(plan, e)
+
+    # Background is optional: past the deadline we draw on the plain white canvas
+    try:
+        base_image = bg_future.result(timeout=_remaining(deadline))
+    except gemini.GeminiNotConfigured:
+        base_image = None
     except Exception:
-        base_bytes = None
+        # outage or timeout: the plain canvas is not cached, the next request retries
+        bg_future.cancel()
+        base_image = None
+        cacheable = False
 
-    visual_schedule = render_schedule_image(schedule, base_image_bytes=base_bytes)
+    # PNG bytes; the route turns them into a URL (or a data URL)
+    with metrics.timer("schedule.render"):
+        visual_schedule = render_schedule(schedule, base_image=base_image)
 
     return {
         "schedule": schedule,
         "reasoning": reasoning,
         "visual_schedule": visual_schedule
+    }, cacheable
+
+# ---------- overload ----------
+def degraded_schedule(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The planner's schedule on the plain canvas, without model calls: served when the
+    service is overloaded. A cached full result is still returned when there is one.
+    """
+    request = _parse_request(data)
+    if _results is not None:
+        cached = _results.get(_fingerprint(*request))
+        if cached is not None:
+            return cached
+
+    day_start, day_end, energy, activities, _ = request
+    metrics.inc("omni_fallback_total", help="Responses served by a fallback path.", service="schedule", reason="overload")
+    schedule, reasoning, _ = _plan(activities, day_start, day_end, energy)
+    with metrics.timer("schedule.render"):
+        visual_schedule = render_schedule(schedule)
+    return {
+        "schedule": schedule,
+        "reasoning": reasoning + ["Served without AI refinement due to high load."],
+        "visual_schedule": visual_schedule
     }
+
+# ---------- streaming (SSE) ----------
+def stream_schedule(data: Dict[str, Any]):
+    """
+    Progressive schedule generation. Yields (event, payload):
+      fallback  {"schedule", "reasoning"}            planner's schedule, when the model is asked next
+      item      {"index", "item"}                    each validated model entry as it is parsed
+      schedule  {"schedule", "reasoning", "source"}  final schedule ("planner", "model", "fallback" or "cache")
+      image     {"visual_schedule": bytes}           rendered image
+    """
+    day_start, day_end, energy, activities, refine = request = _parse_request(data)
+    key = _fingerprint(*request)
+
+    cached = _results.get(key) if _results is not None else None
+    if cached is not None:
+        yield "schedule", {"schedule": cached["schedule"], "reasoning": cached["reasoning"], "source": "cache"}
+        yield "image", {"visual_schedule": cached["visual_schedule"]}
+        return
+
+    deadline = time.monotonic() + SCHEDULE_DEADLINE_S
+    bg_future = _bg_executor.submit(metrics.bind(_request_background))
+
+    plan = _plan(activities, day_start, day_end, energy)
+    schedule, reasoning, _ = plan
+    source = "planner"
+
+    use_model, reasoning = _wants_model(refine, reasoning)
+    if use_model:
+        yield "fallback", {
+            "schedule": schedule,
+            "reasoning": ["Instant deterministic plan; the AI schedule follows."],
+        }
+
+        items = []
+        scanner = JSONObjectScanner("schedule")
+        try:
+            gemini.ensure_available(SCHEDULE_MODEL)
+            chunks = gemini.generate_content_stream(
+                model=SCHEDULE_MODEL,
+                contents=[_build_prompt(activities, day_start, day_end, energy, schedule)]
+            )
+            try:
+                for item in _iter_model_schedule(chunks, scanner, day_start, day_end, deadline):
+                    items.append(item)
+                    yield "item", {"index": len(items) - 1, "item": item}
+            finally:
+                chunks.close()
+
+            if not items:
+                raise ValueError("Gemini returned empty schedule.")
+            schedule, reasoning, source = items, _reasoning(scanner.value()), "model"
+        except Exception as e:
+            schedule, reasoning = _fallback(plan, e)
+            source = "fallback"
+
+    yield "schedule", {"schedule": schedule, "reasoning": reasoning, "source": source}
+
+    cacheable = source != "fallback"
+    try:
+        base_image = bg_future.result(timeout=_remaining(deadline))
+    except gemini.GeminiNotConfigured:
+        base_image = None
+    except Exception:
+        bg_future.cancel()
+        base_image = None
+        cacheable = False
+    with metrics.timer("schedule.render"):
+        visual_schedule = render_schedule(schedule, base_image=base_image)
+    yield "image", {"visual_schedule": visual_schedule}
+
+    if cacheable and _results is not None:
+        _results.set(key, {"schedule": schedule, "reasoning": reasoning, "visual_schedule": visual_schedule})
+
+# ---------- async (ASGI serving) ----------
+async def _arequest_schedule(prompt: str, day_start: str, day_end: str):
+    with metrics.timer("schedule.model"):
+        resp = await gemini.agenerate_content(
+            model=SCHEDULE_MODEL,
+            contents=[prompt]
+        )
+        return _parse_model_schedule(resp, day_start, day_end)
+
+async def _agenerate_background() -> Optional[bytes]:
+    img_resp = await gemini.agenerate_content(
+        model=BG_MODEL,
+        contents=[BG_PROMPT]
+    )
+    return extract_image_from_response(img_resp)
+
+async def _arequest_background():
+    with metrics.timer("schedule.background"):
+        return await background_cache.aget(BG_PROMPT, BG_MODEL, _agenerate_background)
+
+async def agenerate_schedule(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    generate_schedule for the event loop: model calls use the async client,
+    so waiting on Gemini does not hold a thread. The planner, the result cache
+    (SQLite I/O and pickling with that backend) and rendering run in worker threads.
+    """
+    request = _parse_request(data)
+    key = _fingerprint(*request)
+
+    if _results is not None:
+        cached = await asyncio.to_thread(_results.get, key)
+        if cached is not None:
+            return cached
+
+    return await _flight.ado(key, _agenerate_and_cache, key, *request)
+
+async def _agenerate_and_cache(key: str, *request) -> Dict[str, Any]:
+    with metrics.timer("schedule.total"):
+        result, cacheable = await _agenerate_schedule(*request)
+    if cacheable and _results is not None:
+        await asyncio.to_thread(_results.set, key, result)
+    return result
+
+async def _agenerate_schedule(day_start: str, day_end: str, energy: str, activities: List[Dict[str, Any]], refine: bool = False):
+    deadline = time.monotonic() + SCHEDULE_DEADLINE_S
+
+    bg_task = asyncio.ensure_future(_arequest_background())
+
+    # CPU-bound knapsack: off the event loop like the render below
+    plan = await asyncio.to_thread(_plan, activities, day_start, day_end, energy)
+    schedule, reasoning, _ = plan
+    cacheable = True
+    use_model, reasoning = _wants_model(refine, reasoning)
+    if use_model:
+        try:
+            gemini.ensure_available(SCHEDULE_MODEL)
+            with metrics.timer("schedule.prompt"):
+                prompt = _build_prompt(activities, day_start, day_end, energy, schedule)
+            schedule, reasoning = await asyncio.wait_for(_arequest_schedule(prompt, day_start, day_end), _remaining(deadline))
+        except Exception as e:
+            cacheable = False
+            schedule, reasoning = _fallback(plan, e)
+
+    try:
+        base_image = await asyncio.wait_for(bg_task, _remaining(deadline))
+    except gemini.GeminiNotConfigured:
+        base_image = None
+    except Exception:
+        base_image = None
+        cacheable = False
+
+    # CPU-bound: keep it off the event loop
+    with metrics.timer("schedule.render"):
+        visual_schedule = await asyncio.to_thread(render_schedule, schedule, base_image)
+
+    return {
+        "schedule": schedule,
+        "reasoning": reasoning,
+        "visual_schedule": visual_schedule
+    }, cacheable
@@ -0,0 +1,282 @@
+import json
+import os
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from services import schedule as day
+from services.planner import BREAK_EVERY_MIN, BREAK_LEN_MIN, _cost, _Item, _parse_time, plan_schedule
+from utils import gemini, metrics
+from utils.render_pool import compose, render_schedule
+from utils.singleflight import canonical_key
+
+# Days planned by one week request
+SCHEDULE_WEEK_MAX_DAYS = int(os.getenv("SCHEDULE_WEEK_MAX_DAYS", "14"))
+# Days per row of the composite week image
+SCHEDULE_WEEK_COLUMNS = int(os.getenv("SCHEDULE_WEEK_COLUMNS", "4"))
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+# ---------- request ----------
+def _parse_week(data: Dict[str, Any]):
+    """
+    (days, energy, activities, refine, image); days are {"date", "day_start", "day_end"}.
+    """
+    day_start, day_end, energy, activities, refine = day._parse_request(data)
+
+    try:
+        start = date.fromisoformat(str(data["start_date"])[:10]) if data.get("start_date") else date.today()
+    except ValueError:
+        raise ValueError("start_date must be a date (YYYY-MM-DD).")
+    n = data.get("days", 7)
+    if isinstance(n, str) and n.strip().isdigit():
+        n = int(n)
+    if isinstance(n, bool) or not isinstance(n, int):
+        raise ValueError("days must be an integer.")
+    if not 1 <= n <= SCHEDULE_WEEK_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {SCHEDULE_WEEK_MAX_DAYS}.")
+
+    # per-day hours by date or weekday name, e.g. {"saturday": {"day_start": "10:00"}}
+    hours = data.get("hours") or {}
+    if not isinstance(hours, dict):
+        raise ValueError('hours must be an object, e.g. {"saturday": {"day_start": "10:00"}}.')
+    hours = {str(k).strip().lower(): v for k, v in hours.items() if isinstance(v, dict)}
+    days = []
+    for k in range(n):
+        d = start + timedelta(days=k)
+        h = hours.get(d.isoformat()) or hours.get(WEEKDAYS[d.weekday()]) or {}
+        ds, de = h.get("day_start", day_start), h.get("day_end", day_end)
+        start_min, end_min = _parse_time(ds), _parse_time(de)
+        # same bounds as a single day (services.schedule._parse_request)
+        if start_min is None or end_min is None or not 0 <= start_min < end_min <= 24 * 60:
+            raise ValueError(f"Invalid hours for {d.isoformat()}: day_start and day_end must be HH:MM times with day_start before day_end.")
+        days.append({"date": d.isoformat(), "day_start": ds, "day_end": de})
+
+    image = str(data.get("image", "days")).lower()
+    if image not in ("days", "composite"):
+        raise ValueError('image must be "days" or "composite".')
+    return days, energy, activities, refine, image
+
+def _distribute(activities: List[Dict[str, Any]], days: List[Dict[str, str]]) -> List[List[Dict[str, Any]]]:
+    """
+    Activities per day. "day" (date or weekday name) pins an activity, "repeat": "daily" copies it
+    to every day; the rest go, highest priority and longest first, to the day with the most free
+    time left (the earliest on ties).
+    """
+    per_day = [[] for _ in days]
+    free = [_parse_time(d["day_end"]) - _parse_time(d["day_start"]) for d in days]
+    by_key = {}
+    for k, d in enumerate(days):
+        by_key.setdefault(d["date"], []).append(k)
+        by_key.setdefault(WEEKDAYS[date.fromisoformat(d["date"]).weekday()], []).append(k)
+
+    def assign(k, a, item):
+        per_day[k].append(a)
+        free[k] -= _cost(item, BREAK_EVERY_MIN, BREAK_LEN_MIN)
+
+    flexible = []
+    for index, a in enumerate(activities):
+        if not isinstance(a, dict):
+            continue
+        item = _Item(index, a)
+        pinned = by_key.get(str(a.get("day", "")).strip().lower())
+        if str(a.get("repeat", "")).lower() == "daily":
+            pinned = range(len(days))
+        if pinned:
+            for k in pinned:
+                assign(k, a, item)
+        else:
+            flexible.append((item, a))
+
+    for item, a in sorted(flexible, key=lambda x: (-x[0].weight, -x[0].duration, x[0].index)):
+        assign(max(range(len(days)), key=lambda k: (free[k], -k)), a, item)
+    return per_day
+
+
+# ---------- model ----------
+def _build_week_prompt(days: List[Dict[str, Any]], energy: str) -> str:
+    return f"""
+You are an expert personal scheduler.
+
+Create an optimized schedule for each of these days from its activities and hours.
+
+Constraints:
+- Energy profile: {energy}
+- Insert breaks (5–15 minutes) after long focus periods.
+- Avoid back-to-back heavy focus blocks.
+- Keep every day realistic, ordered and within its hours.
+- Activities with a fixed_start must start exactly at that time.
+- Activities listed under "unscheduled" may move to any day with room.
+
+Days (date, hours, activities, draft schedule, unscheduled):
+{json.dumps(days, ensure_ascii=False)}
+
+Return ONLY valid JSON in exactly this format (no markdown, no extra text):
+{{
+  "days": [
+    {{"date":"YYYY-MM-DD","schedule":[{{"start":"HH:MM","end":"HH:MM","activity":"..."}}]}}
+  ],
+  "reasoning": [
+    "short bullet reason 1",
+    "short bullet reason 2"
+  ]
+}}
+"""
+
+@metrics.timed("schedule_week.model")
+def _request_week(prompt: str):
+    resp = gemini.generate_content(
+        model=day.SCHEDULE_MODEL,
+        contents=[prompt]
+    )
+    with metrics.timer("schedule.extract_json"):
+        parsed = day._extract_json(getattr(resp, "text", "") or "")
+    if not isinstance(parsed.get("days"), list):
+        raise ValueError("Gemini returned no days.")
+    return parsed
+
+def _model_day(parsed: Dict[str, Any], d: Dict[str, Any]):
+    """
+    The model's schedule for day d, or None when it is missing or invalid.
+    """
+    for entry in parsed.get("days", []):
+        if isinstance(entry, dict) and entry.get("date") == d["date"]:
+            schedule = entry.get("schedule")
+            try:
+                if not isinstance(schedule, list) or not schedule:
+                    return None
+                day._validate_schedule(schedule, d["day_start"], d["day_end"])
+            except Exception:
+                return None
+            return schedule
+    return None
+
+def _dropped(activities: List[Dict[str, Any]], schedule: List[Dict[str, Any]]) -> List[str]:
+    """
+    Names of the day's activities the model's schedule leaves out (same names as the planner's unscheduled).
+    """
+    def norm(name):
+        return " ".join(str(name).split()).lower()
+
+    placed = Counter(norm(s.get("activity", "")) for s in schedule if isinstance(s, dict))
+    dropped = []
+    for index, a in enumerate(activities):
+        name = _Item(index, a).name
+        if placed[norm(name)] > 0:
+            placed[norm(name)] -= 1
+        else:
+            dropped.append(name)
+    return dropped
+
+
+# ---------- main ----------
+def generate_week(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Input: generate_schedule's fields plus
+    {
+      "start_date": "2026-10-19",     (default today)
+      "days": 7,
+      "hours": {"saturday": {"day_start": "10:00", "day_end": "18:00"}},   (optional, by weekday or date)
+      "image": "days" | "composite"   (one image per day, or a single image of the week)
+    }
+    Activities may carry "day" (date or weekday) or "repeat": "daily"; the others are spread over the days.
+    Raises ValueError for invalid input.
+    """
+    request = _parse_week(data)
+    days, energy, activities, refine, image = request
+    key = canonical_key({
+        "week": days,
+        "image": image,
+        "request": day._fingerprint(days[0]["day_start"], days[0]["day_end"], energy, activities, refine),
+    })
+
+    if day._results is not None:
+        cached = day._results.get(key)
+        if cached is not None:
+            return cached
+
+    return day._flight.do(key, _generate_and_cache, key, *request)
+
+def _generate_and_cache(key: str, *request) -> Dict[str, Any]:
+    result, cacheable = _generate_week(*request)
+    if cacheable and day._results is not None:
+        day._results.set(key, result)
+    return result
+
+@metrics.timed("schedule_week.total")
+def _generate_week(days: List[Dict[str, str]], energy: str, activities: List[Dict[str, Any]], refine: bool, image: str):
+    """
+    Returns (result, cacheable).
+    """
+    deadline = time.monotonic() + day.SCHEDULE_DEADLINE_S
+
+    # one background for the whole week
+    bg_future = day._bg_executor.submit(metrics.bind(day._request_background))
+
+    out = []
+    with metrics.timer("schedule.plan"):
+        for d, acts in zip(days, _distribute(activities, days)):
+            schedule, unscheduled = plan_schedule(acts, d["day_start"], d["day_end"], energy)
+            out.append({**d, "activities": acts, "schedule": schedule, "unscheduled": unscheduled, "source": "planner"})
+
+    reasoning = [
+        "Activities spread over the days by priority and free time.",
+        "Each day planned to fit the most priority-weighted time, with breaks after long focus periods.",
+    ]
+    cacheable = True
+    use_model, reasoning = day._wants_model(refine, reasoning)
+    if use_model:
+        try:
+            gemini.ensure_available(day.SCHEDULE_MODEL)
+            prompt = _build_week_prompt([
+                {k: d[k] for k in ("date", "day_start", "day_end", "activities", "unscheduled")} | {"draft": d["schedule"]}
+                for d in out
+            ], energy)
+            week_future = day._executor.submit(metrics.bind(_request_week), prompt)
+            try:
+                parsed = week_future.result(timeout=day._remaining(deadline))
+            finally:
+                week_future.cancel()
+            reasoning = day._reasoning(parsed)
+            # days the model got wrong keep the planner's schedule
+            for d in out:
+                schedule = _model_day(parsed, d)
+                if schedule is not None:
+                    d.update(schedule=schedule, unscheduled=_dropped(d["activities"], schedule), source="model")
+                else:
+                    d["source"] = "fallback"
+                    cacheable = False
+        except Exception as e:
+            cacheable = False
+            metrics.inc("omni_fallback_total", help="Responses served by a fallback path.", service="schedule_week", reason=type(e).__name__)
+            for d in out:
+                d["source"] = "fallback"
+            reasoning = reasoning + [f"Fallback reason: {type(e).__name__}"]
+
+    try:
+        base_image = bg_future.result(timeout=day._remaining(deadline))
+    except gemini.GeminiNotConfigured:
+        base_image = None
+    except Exception:
+        bg_future.cancel()
+        base_image = None
+        cacheable = False
+
+    # all days at once (worker processes with RENDER_BACKEND=process)
+    with metrics.timer("schedule.render"):
+        futures = [day._executor.submit(render_schedule, d["schedule"], base_image) for d in out]
+        images = [f.result() for f in futures]
+
+    result = {
+        "days": [{k: d[k] for k in ("date", "day_start", "day_end", "schedule", "unscheduled", "source")} for d in out],
+        "reasoning": reasoning,
+    }
+    if image == "composite":
+        with metrics.timer("schedule_week.compose"):
+            result["visual_week"] = compose(images, [d["date"] for d in out], SCHEDULE_WEEK_COLUMNS)
+    else:
+        for d, raw in zip(result["days"], images):
+            d["visual_schedule"] = raw
+    return result, cacheable
@@ -1,28 +1,208 @@
-from utils.gemini import client
-from utils.image_utils import extract_image_from_response, to_data_url
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def generate_daily_summary(data):
-    mood = data.get("mood", "productive")
+from utils.cache import LRUCache
+from utils import gemini, metrics
+from utils.image_utils import extract_image_from_response
+from utils.render_pool import transcode
+from utils.singleflight import SingleFlight, canonical_key
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "gemini-2.5-flash-image"
+DEFAULT_MOOD = "productive"
+
+# Moods pre-generated by warm_illustrations() (comma separated); at most SUMMARY_WARM_MAX are used
+# so a warm-up never fills more than half of the illustration cache
+SUMMARY_CACHE_MAX = int(os.getenv("SUMMARY_CACHE_MAX", "64"))
+SUMMARY_WARM_MAX = min(int(os.getenv("SUMMARY_WARM_MAX", "16")), max(1, SUMMARY_CACHE_MAX // 2))
+SUMMARY_WARM_MOODS = [m for m in os.getenv(
+    "SUMMARY_WARM_MOODS", "productive,calm,happy,focused,tired,stressed"
+).split(",") if m.strip()][:SUMMARY_WARM_MAX]
+
+# Re-encode model illustrations before caching (png | webp | jpeg; empty keeps the model's bytes)
+SUMMARY_IMAGE_FORMAT = os.getenv("SUMMARY_IMAGE_FORMAT", "").lower()
+SUMMARY_IMAGE_MAX_SIDE = int(os.getenv("SUMMARY_IMAGE_MAX_SIDE", "0")) or None
+
+# Encoded illustrations keyed by normalized mood
+_illustrations = LRUCache(
+    max_items=SUMMARY_CACHE_MAX,
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL_S", "86400")),
+)
+
+metrics.register_cache("summary_illustrations", _illustrations)
+
+_flight = SingleFlight("summary")
+_warming = threading.Lock()
+_not_configured_logged = False
 
-    summary = (
+# ---------- helpers ----------
+def _normalize_mood(mood) -> str:
+    # "  Very   Productive " -> "very productive"
+    return " ".join(str(mood or "").split()).lower() or DEFAULT_MOOD
+
+def _summary_text(mood) -> str:
+    return (
         f"You had a {mood} day. You maintained progress toward your goals "
         "and stayed consistent with your habits."
     )
 
-    prompt = (
+def _prompt(mood: str) -> str:
+    return (
         f"Create a calm, minimal illustration representing a {mood} and balanced day. "
         "Soft lighting, modern aesthetic."
     )
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash-image",
-        contents=[prompt]
+def _generate_illustration(mood: str):
+    # no API key or breaker open: text-only summary right away
+    gemini.ensure_available(SUMMARY_MODEL)
+    response = gemini.generate_content(
+        model=SUMMARY_MODEL,
+        contents=[_prompt(mood)]
     )
 
-    raw = extract_image_from_response(response)
-    image = to_data_url(raw) if raw else None
+    return extract_image_from_response(response)
+
+def _unavailable(e: Exception) -> None:
+    # text-only summary; a missing API key is a configuration state, logged once per process
+    global _not_configured_logged
+    if isinstance(e, gemini.GeminiNotConfigured):
+        if not _not_configured_logged:
+            _not_configured_logged = True
+            logger.warning("Summary illustrations disabled: GENAI_API_KEY not set")
+        return
+    logger.warning(f"Summary illustration unavailable: {type(e).__name__}: {e}")
+    metrics.inc("omni_fallback_total", help="Responses served by a fallback path.", service="summary", reason=type(e).__name__)
+
+def _encode(raw):
+    if raw and SUMMARY_IMAGE_FORMAT:
+        try:
+            with metrics.timer("summary.transcode"):
+                return transcode(raw, SUMMARY_IMAGE_FORMAT, max_side=SUMMARY_IMAGE_MAX_SIDE)
+        except Exception as e:
+            logger.warning(f"Illustration transcode failed, keeping original: {e}")
+    return raw
+
+def _illustration(mood: str):
+    """
+    Raw image bytes for a normalized mood; the image model only runs on a cache miss.
+    """
+    raw = _illustrations.get(mood)
+    if raw is None:
+        raw = _encode(_generate_illustration(mood))
+        if raw:
+            _illustrations.set(mood, raw)
+    return raw
+
+def warm_illustrations(workers: int = 4) -> dict:
+    """
+    Fill the illustration cache for the configured SUMMARY_WARM_MOODS (never caller-chosen
+    moods: each one costs an image generation). One warm-up runs at a time per process.
+    Returns {"warmed": [...], "cached": [...], "failed": [...]}, with "busy": true when
+    another warm-up is already running.
+    """
+    if not _warming.acquire(blocking=False):
+        return {"warmed": [], "cached": [], "failed": [], "busy": True}
+    try:
+        return _warm(workers)
+    finally:
+        _warming.release()
+
+def _warm(workers: int) -> dict:
+    report = {"warmed": [], "cached": [], "failed": []}
+    todo = []
+    for mood in dict.fromkeys(_normalize_mood(m) for m in SUMMARY_WARM_MOODS):
+        if mood in _illustrations:
+            report["cached"].append(mood)
+        else:
+            todo.append(mood)
+
+    def warm(mood):
+        try:
+            return mood, _illustration(mood) is not None
+        except Exception as e:
+            logger.warning(f"Illustration warm-up failed for '{mood}': {e}")
+            return mood, False
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for mood, ok in pool.map(warm, todo):
+                report["warmed" if ok else "failed"].append(mood)
 
+    return report
+
+# ---------- main ----------
+def generate_daily_summary(data):
+    mood = data.get("mood", DEFAULT_MOOD)
+    return _generate_daily_summary(mood)
+
+def _flight_key(mood: str) -> str:
+    return canonical_key({"mood": mood})
+
+@metrics.timed("summary.total")
+def _generate_daily_summary(mood):
+    summary = _summary_text(mood)
+
+    # The illustration is optional: on upstream errors or an open breaker we return text only
+    try:
+        # requests in flight for the same normalized mood ("Happy", "happy ") share one generation
+        normalized = _normalize_mood(mood)
+        raw = _flight.do(_flight_key(normalized), _illustration, normalized)
+    except Exception as e:
+        _unavailable(e)
+        raw = None
+
+    # image bytes; the route turns them into a URL (or a data URL)
     return {
         "summary": summary,
-        "visual": image
+        "visual": raw or None
+    }
+
+def degraded_summary(data):
+    """
+    Text summary without model calls (overload); the illustration only when it is cached.
+    """
+    mood = data.get("mood", DEFAULT_MOOD)
+    metrics.inc("omni_fallback_total", help="Responses served by a fallback path.", service="summary", reason="overload")
+    return {
+        "summary": _summary_text(mood),
+        "visual": _illustrations.get(_normalize_mood(mood))
+    }
+
+# ---------- async (ASGI serving) ----------
+async def _aillustration(mood: str):
+    raw = _illustrations.get(mood)
+    if raw is None:
+        gemini.ensure_available(SUMMARY_MODEL)
+        response = await gemini.agenerate_content(
+            model=SUMMARY_MODEL,
+            contents=[_prompt(mood)]
+        )
+        raw = await asyncio.to_thread(_encode, extract_image_from_response(response))
+        if raw:
+            _illustrations.set(mood, raw)
+    return raw
+
+async def agenerate_daily_summary(data):
+    """
+    generate_daily_summary for the event loop (async model client).
+    """
+    mood = data.get("mood", DEFAULT_MOOD)
+    return await _agenerate_daily_summary(mood)
+
+async def _agenerate_daily_summary(mood):
+    with metrics.timer("summary.total"):
+        try:
+            normalized = _normalize_mood(mood)
+            raw = await _flight.ado(_flight_key(normalized), _aillustration, normalized)
+        except Exception as e:
+            _unavailable(e)
+            raw = None
+
+    return {
+        "summary": _summary_text(mood),
+        "visual": raw or None
     }
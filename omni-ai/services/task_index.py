@@ -0,0 +1,354 @@
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from services.tasks import urgency_key
+
+# Users whose index is cached in memory with the sqlite backend (least recently used ones
+# are dropped and reloaded from the store on their next request)
+TASK_INDEX_MAX_USERS = int(os.getenv("TASK_INDEX_MAX_USERS", "10000"))
+# Tasks per user
+TASK_INDEX_MAX_TASKS = int(os.getenv("TASK_INDEX_MAX_TASKS", "100000"))
+
+_REMOVED = None  # task id of a heap entry that was updated or deleted
+
+
+def _check_task(task) -> None:
+    if not isinstance(task, dict):
+        raise ValueError("Each task must be a JSON object.")
+
+
+class TaskIndex:
+    """
+    One user's open tasks in a binary heap ordered by urgency_key (deadline, priority),
+    with lazy deletion: update/delete mark the old heap entry dead instead of searching it.
+
+    upsert / delete: O(log n)      top(k): O(k log k), heap untouched
+    load: O(n) (heapify)           ordered(): O(n log n)
+    Completed tasks are kept but leave the heap.
+    """
+
+    def __init__(self):
+        self._tasks = {}     # id -> task dict
+        self._entries = {}   # id -> live heap entry [key, seq, id]
+        self._heap = []
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._dead = 0
+        self.version = 0     # store version the index was loaded at / last written as
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def load(self, tasks) -> None:
+        """
+        Replace all tasks (keeps their order for equal keys). Raises ValueError, leaving the
+        index untouched, for a non-list, a non-object task or more than TASK_INDEX_MAX_TASKS.
+        """
+        if isinstance(tasks, (str, bytes, dict)) or not hasattr(tasks, "__iter__"):
+            raise ValueError("tasks must be a list of task objects.")
+        tasks = list(tasks)
+        if len(tasks) > TASK_INDEX_MAX_TASKS:
+            raise ValueError(f"At most {TASK_INDEX_MAX_TASKS} tasks per user.")
+        for task in tasks:
+            _check_task(task)
+
+        self._tasks.clear()
+        self._entries.clear()
+        self._heap = []
+        self._dead = 0
+        for task in tasks:
+            self._put(self._with_id(task), push=False)
+        heapq.heapify(self._heap)
+
+    def upsert(self, task: dict) -> dict:
+        _check_task(task)
+        task = self._with_id(task)
+        if task["id"] not in self._tasks and len(self._tasks) >= TASK_INDEX_MAX_TASKS:
+            raise ValueError(f"At most {TASK_INDEX_MAX_TASKS} tasks per user.")
+        self._put(task, push=True)
+        return task
+
+    def update(self, task_id: str, changes: dict):
+        _check_task(changes)
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+        return self.upsert({**task, **changes, "id": task_id})
+
+    def delete(self, task_id: str) -> bool:
+        if self._tasks.pop(task_id, None) is None:
+            return False
+        self._kill(task_id)
+        self._compact()
+        return True
+
+    def top(self, k: int):
+        """
+        The k most urgent open tasks, in order. Best-first walk over the heap array
+        (children of i are 2i+1, 2i+2), skipping dead entries.
+        """
+        heap = self._heap
+        out = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(out) < k:
+            entry, i = heapq.heappop(frontier)
+            if entry[2] is not _REMOVED:
+                out.append(self._tasks[entry[2]])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return out
+
+    def tasks(self):
+        """
+        All tasks, in insertion order.
+        """
+        return list(self._tasks.values())
+
+    def ordered(self):
+        """
+        All tasks: open ones by urgency, then completed ones.
+        """
+        live = sorted(e for e in self._heap if e[2] is not _REMOVED)
+        done = [t for tid, t in self._tasks.items() if tid not in self._entries]
+        return [self._tasks[e[2]] for e in live] + done
+
+    def _with_id(self, task: dict) -> dict:
+        task = dict(task)
+        if task.get("id") in (None, ""):
+            task["id"] = str(next(self._ids))
+            while task["id"] in self._tasks:
+                task["id"] = str(next(self._ids))
+        task["id"] = str(task["id"])
+        return task
+
+    def _put(self, task: dict, push: bool) -> None:
+        task_id = task["id"]
+        self._kill(task_id)
+        self._tasks[task_id] = task
+        if task.get("completed"):
+            self._compact()
+            return
+        entry = [urgency_key(task), next(self._seq), task_id]
+        self._entries[task_id] = entry
+        if push:
+            heapq.heappush(self._heap, entry)
+        else:
+            self._heap.append(entry)
+        self._compact()
+
+    def _kill(self, task_id: str) -> None:
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            entry[2] = _REMOVED
+            self._dead += 1
+
+    def _compact(self) -> None:
+        # drop dead entries once they are half the heap: amortized O(1) per operation
+        if self._dead > 64 and self._dead * 2 > len(self._heap):
+            self._heap = [e for e in self._heap if e[2] is not _REMOVED]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+
+# ---------- persistence ----------
+class TaskStore:
+    """
+    TaskIndex per user, in memory or in SQLite (one row per task, plus a per-user version).
+    With SQLite the file is the source of truth shared by all worker processes: every request
+    checks the user's version and reloads a stale or evicted index, and every write is a
+    read-modify-write in one transaction that bumps the version.
+    """
+
+    def __init__(self, path: str | None = None, max_users: int = TASK_INDEX_MAX_USERS):
+        self.path = path or None
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS task_users (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS task_items (user_id TEXT NOT NULL, task_id TEXT NOT NULL, task TEXT NOT NULL, "
+                "PRIMARY KEY (user_id, task_id))"
+            )
+
+    def read(self, user_id: str, fn):
+        """
+        fn(index) for the user's current index, or None when the user has no stored index.
+        """
+        with self._lock:
+            index = self._current(user_id)
+            return None if index is None else fn(index)
+
+    def load(self, user_id: str, tasks) -> int:
+        """
+        Replace the user's tasks (creates the index). Returns the task count.
+        """
+        def write(index):
+            index.load(tasks)
+            if self._db is not None:
+                self._db.execute("DELETE FROM task_items WHERE user_id = ?", (user_id,))
+            self._put_rows(user_id, index.tasks())
+            return len(index)
+        return self._write(user_id, write, create=True)
+
+    def upsert(self, user_id: str, task: dict) -> dict:
+        """
+        Add or replace one task (creates the index). Raises ValueError when the user is full.
+        """
+        def write(index):
+            task_out = index.upsert(task)
+            self._put_rows(user_id, [task_out])
+            return task_out
+        return self._write(user_id, write, create=True)
+
+    def update(self, user_id: str, task_id: str, changes: dict):
+        """
+        The updated task, or None for an unknown user or task.
+        """
+        def write(index):
+            task = index.update(task_id, changes)
+            if task is not None:
+                self._put_rows(user_id, [task])
+            return task
+        return self._write(user_id, write)
+
+    def delete(self, user_id: str, task_id: str) -> bool:
+        def write(index):
+            if not index.delete(task_id):
+                return False
+            if self._db is not None:
+                self._db.execute("DELETE FROM task_items WHERE user_id = ? AND task_id = ?", (user_id, task_id))
+            return True
+        return bool(self._write(user_id, write))
+
+    def stats(self) -> dict:
+        with self._lock:
+            users = self._db.execute("SELECT COUNT(*) FROM task_users").fetchone()[0] if self._db else len(self._indexes)
+            return {
+                "users": users,
+                "cached_users": len(self._indexes),
+                "cached_tasks": sum(len(i) for i in self._indexes.values()),
+                "persistent": self._db is not None,
+            }
+
+    def _write(self, user_id: str, fn, create: bool = False):
+        # fn(index) applies the change to the index and, with SQLite, to task_items
+        with self._lock:
+            if self._db is None:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    if not create:
+                        return None
+                    index = TaskIndex()
+                result = fn(index)
+                self._indexes[user_id] = index
+                return result
+
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                index = self._current(user_id)
+                if index is None:
+                    if not create:
+                        self._db.execute("ROLLBACK")
+                        return None
+                    index = TaskIndex()
+                result = fn(index)
+                if result is None or result is False:
+                    # unknown task: nothing changed
+                    self._db.execute("ROLLBACK")
+                    return result
+                index.version += 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO task_users (user_id, version) VALUES (?, ?)", (user_id, index.version)
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # the in-memory index may hold the change that was not stored
+                self._indexes.pop(user_id, None)
+                raise
+            self._db.execute("COMMIT")
+            self._cache(user_id, index)
+            return result
+
+    def _current(self, user_id: str):
+        """
+        The user's index at the stored version (reloaded when stale or evicted), or None.
+        """
+        if self._db is None:
+            return self._indexes.get(user_id)
+        row = self._db.execute("SELECT version FROM task_users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            self._indexes.pop(user_id, None)
+            return None
+        index = self._indexes.get(user_id)
+        if index is None or index.version != row[0]:
+            index = TaskIndex()
+            # rowid order: insertion order, rewritten tasks last (as their new heap entries)
+            index.load(json.loads(t) for (t,) in self._db.execute(
+                "SELECT task FROM task_items WHERE user_id = ? ORDER BY rowid", (user_id,)
+            ))
+            index.version = row[0]
+        self._cache(user_id, index)
+        return index
+
+    def _cache(self, user_id: str, index: TaskIndex) -> None:
+        self._indexes[user_id] = index
+        self._indexes.move_to_end(user_id)
+        # only a cache with SQLite behind it; the memory backend keeps every user
+        while self._db is not None and len(self._indexes) > self.max_users:
+            self._indexes.popitem(last=False)
+
+    def _put_rows(self, user_id: str, tasks) -> None:
+        if self._db is not None:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO task_items (user_id, task_id, task) VALUES (?, ?, ?)",
+                ((user_id, t["id"], json.dumps(t)) for t in tasks),
+            )
+
+
+# sqlite (default: shared by worker processes, survives restarts) | memory (one process only)
+_store = TaskStore(
+    path=os.getenv("TASK_INDEX_PATH", "task_index.sqlite3")
+    if os.getenv("TASK_INDEX_BACKEND", "sqlite").lower() == "sqlite" else None,
+)
+
+
+# ---------- main ----------
+def load_tasks(user_id: str, tasks) -> int:
+    return _store.load(str(user_id), tasks)
+
+def list_tasks(user_id: str):
+    """
+    All tasks, open ones by urgency then completed ones; None for a user without an index.
+    """
+    return _store.read(str(user_id), lambda index: index.ordered())
+
+def next_tasks(user_id: str, k: int):
+    """
+    The k most urgent open tasks; None for a user without an index.
+    """
+    return _store.read(str(user_id), lambda index: index.top(k))
+
+def upsert_task(user_id: str, task: dict) -> dict:
+    return _store.upsert(str(user_id), task)
+
+def update_task(user_id: str, task_id: str, changes: dict):
+    return _store.update(str(user_id), str(task_id), changes)
+
+def delete_task(user_id: str, task_id: str) -> bool:
+    return _store.delete(str(user_id), str(task_id))
+
+def stats() -> dict:
+    return _store.stats()
@@ -1,18 +1,43 @@
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+
+# No (or unparseable) deadline sorts after every real date
+NO_DEADLINE = date.max.toordinal()
+
+# Within the same deadline, more important tasks first
+PRIORITY_RANK = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+DEFAULT_PRIORITY_RANK = PRIORITY_RANK["medium"]
+
+@lru_cache(maxsize=8192)
+def parse_deadline(deadline) -> int:
+    """
+    Day ordinal of a "YYYY-MM-DD" deadline (NO_DEADLINE when missing or invalid).
+    """
+    if not deadline or deadline == "none":
+        return NO_DEADLINE
+    try:
+        # fast path for canonical ISO dates, strptime for the rest (e.g. "2026-3-7")
+        if len(deadline) == 10 and deadline[4] == "-" and deadline[7] == "-":
+            return date.fromisoformat(deadline).toordinal()
+        return datetime.strptime(deadline, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return NO_DEADLINE
+
+def urgency_key(task) -> tuple:
+    """
+    Composite sort key: (deadline, priority). Smaller is more urgent.
+    """
+    deadline = task.get("deadline")
+    priority = str(task.get("priority") or "").strip().lower()
+    return (
+        parse_deadline(deadline if isinstance(deadline, str) else None),
+        PRIORITY_RANK.get(priority, DEFAULT_PRIORITY_RANK),
+    )
 
 def optimize_tasks(data):
     tasks = data.get("tasks", [])
 
-    def task_priority(task):
-        deadline = task.get("deadline")
-        if not deadline or deadline == "none":
-            return datetime.max
-        try:
-            return datetime.strptime(deadline, "%Y-%m-%d")
-        except ValueError:
-            return datetime.max
-
-    sorted_tasks = sorted(tasks, key=task_priority)
+    sorted_tasks = sorted(tasks, key=urgency_key)
 
     return {
         "explanation": "Tasks reordered based on upcoming deadlines and urgency.",
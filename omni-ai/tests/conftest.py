@@ -0,0 +1,11 @@
+import os
+import sys
+
+# modules import each other as top-level packages (utils, services), as under gunicorn
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# keep state in memory: no SQLite files next to the code, no model calls
+for name in ("TASK_INDEX_BACKEND", "HEALTH_TRENDS_BACKEND", "SCHEDULE_CACHE_BACKEND"):
+    os.environ.setdefault(name, "memory")
+os.environ.setdefault("PRECOMPUTE_BACKEND", "off")
+os.environ.pop("GENAI_API_KEY", None)
@@ -0,0 +1,67 @@
+import pytest
+
+import app as web
+from services import schedule, summary
+from utils import gemini
+
+DAY = {"day_start": "09:00", "day_end": "12:00", "activities": [{"name": "Write", "duration": 60}]}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    monkeypatch.setattr(schedule, "_results", None)
+    monkeypatch.setattr(web, "ADMISSION_SOFT_QUEUE", 100)
+    monkeypatch.setattr(web, "ADMISSION_HARD_QUEUE", 200)
+    monkeypatch.setattr(web, "ADMISSION_SOFT_ACTIVE", 2)
+    monkeypatch.setattr(web, "ADMISSION_HARD_ACTIVE", 4)
+    monkeypatch.setattr(web, "ADMISSION_RETRY_AFTER_S", 7)
+
+
+@pytest.mark.parametrize("active,waiting,decision", [
+    (0, 0, "admit"), (2, 0, "degrade"), (0, 100, "degrade"), (4, 0, "reject"), (0, 200, "reject"),
+])
+def test_decision_by_active_requests_and_queue(monkeypatch, active, waiting, decision):
+    monkeypatch.setattr(web, "_active", active)
+    monkeypatch.setattr(type(gemini.limiter), "waiting", property(lambda self: waiting))
+    assert web.admission("test") == decision
+
+
+def test_admitted_counts_until_the_request_ends():
+    with pytest.raises(RuntimeError):
+        with web.admitted():
+            assert web._active == 1
+            raise RuntimeError()
+    assert web._active == 0
+
+
+def test_soft_limit_serves_the_degraded_result(monkeypatch):
+    monkeypatch.setattr(web, "_active", 2)
+    monkeypatch.setattr(schedule, "generate_schedule", lambda data: pytest.fail("model path under load"))
+    monkeypatch.setattr(summary, "generate_daily_summary", lambda data: pytest.fail("model path under load"))
+    client = web.app.test_client()
+
+    resp = client.post("/ai/schedule/generate", json=DAY)
+    assert resp.status_code == 200
+    assert "Served without AI refinement due to high load." in resp.get_json()["reasoning"]
+
+    resp = client.post("/ai/summary/daily", json={"mood": "calm"})
+    assert resp.status_code == 200
+    assert resp.get_json()["summary"] == summary._summary_text("calm")
+
+
+@pytest.mark.parametrize("path,body", [
+    ("/ai/schedule/generate", DAY), ("/ai/summary/daily", {"mood": "calm"}), ("/ai/schedule/week", DAY),
+])
+def test_hard_limit_is_a_fast_503_with_retry_after(monkeypatch, path, body):
+    monkeypatch.setattr(web, "_active", 4)
+    resp = web.app.test_client().post(path, json=body)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "7"
+
+
+def test_invalid_requests_are_rejected_before_admission(monkeypatch):
+    monkeypatch.setattr(web, "_active", 4)
+    resp = web.app.test_client().post("/ai/schedule/generate", json={**DAY, "day_start": "25:00"})
+    assert resp.status_code == 400
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from utils.background_cache import CANVAS_SIZE, BackgroundCache
+
+
+def png(color="#336699", size=(64, 32)) -> bytes:
+    out = BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_hits_are_decoded_and_resized_once():
+    cache = BackgroundCache(max_bytes=1 << 24)
+    calls = []
+    generate = lambda: calls.append(1) or png()
+
+    first = cache.get("calm", "m", generate)
+    assert first.size == CANVAS_SIZE and first.mode == "RGB"
+    assert cache.get("calm", "m", generate) is first
+    assert len(calls) == 1
+    assert first.info["cache_key"] == BackgroundCache.key("calm", "m", 0)
+
+
+def test_concurrent_misses_generate_once():
+    cache = BackgroundCache(max_bytes=1 << 24)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.05)
+        return png()
+
+    threads = [threading.Thread(target=cache.get, args=("calm", "m", generate)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(2)
+    assert len(calls) == 1
+
+
+def test_empty_generation_is_not_cached():
+    cache = BackgroundCache(max_bytes=1 << 24)
+    assert cache.get("calm", "m", lambda: None) is None
+    assert cache.get("calm", "m", png) is not None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    BackgroundCache(max_bytes=1 << 24, disk_dir=str(tmp_path)).get("calm", "m", png)
+    restarted = BackgroundCache(max_bytes=1 << 24, disk_dir=str(tmp_path))
+    img = restarted.get("calm", "m", lambda: (_ for _ in ()).throw(AssertionError("generated again")))
+    assert img.size == CANVAS_SIZE
+
+
+def test_async_misses_generate_once():
+    cache = BackgroundCache(max_bytes=1 << 24)
+    calls = []
+
+    async def agenerate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return png()
+
+    async def run():
+        return await asyncio.gather(*(cache.aget("calm", "m", agenerate) for _ in range(5)))
+
+    images = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(img is images[0] for img in images)
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from utils.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise RuntimeError("upstream down")
+
+
+def trip(breaker, calls):
+    for _ in range(calls):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+
+
+def test_opens_at_the_failure_ratio():
+    breaker = CircuitBreaker("t", failure_ratio=0.5, min_calls=4, window=10, open_s=60)
+    breaker.call(lambda: 1)
+    trip(breaker, 1)
+    breaker.call(lambda: 1)
+    assert breaker.state == CLOSED  # 1 failure in 3 calls, below min_calls
+    trip(breaker, 1)
+    assert breaker.state == OPEN    # 2 of 4
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 1)
+    assert breaker.rejected == 1 and breaker.opened == 1
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("t", min_calls=2, slow_call_s=0.0, open_s=60)
+    breaker.call(time.sleep, 0.001)
+    breaker.call(time.sleep, 0.001)
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_one_probe_and_closes_on_success():
+    breaker = CircuitBreaker("t", min_calls=2, open_s=0.05)
+    trip(breaker, 2)
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.available()
+
+    assert breaker.allow()          # the probe
+    assert not breaker.allow()      # everyone else waits for it
+    assert not breaker.available()
+    breaker.record(True, 0.01)
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("t", min_calls=2, open_s=0.05)
+    trip(breaker, 2)
+    time.sleep(0.06)
+    trip(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 1)
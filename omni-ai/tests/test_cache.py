@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from utils.cache import LRUCache, SQLiteCache, make_cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_items=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+
+
+def test_lru_weight_bound_keeps_the_newest_entry():
+    cache = LRUCache(max_items=10, max_weight=10, weigh=len)
+    cache.set("a", b"x" * 6)
+    cache.set("b", b"x" * 6)
+    assert "a" not in cache and "b" in cache
+    cache.set("c", b"x" * 20)  # alone over the bound, still kept
+    assert len(cache) == 1 and cache.stats()["weight"] == 20
+    cache.set("c", b"x" * 3)  # replacing an entry replaces its weight
+    assert cache.stats()["weight"] == 3
+
+
+def test_lru_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_items=4, ttl=10)
+    cache.set("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert "a" not in cache
+    assert cache.get("a", "gone") == "gone"
+    assert cache.stats()["weight"] == 0
+
+
+def test_sqlite_cache_persists_and_evicts(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, max_items=2)
+    cache.set("a", {"schedule": [1, 2]})
+    cache.set("b", 2)
+    assert cache.get("a") == {"schedule": [1, 2]}  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert "b" not in cache
+
+    reopened = SQLiteCache(path, max_items=2)
+    assert reopened.get("a") == {"schedule": [1, 2]} and reopened.get("c") == 3
+    assert len(reopened) == 2
+
+
+def test_sqlite_cache_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=10)
+    cache.set("a", 1)
+    now[0] += 11
+    assert cache.get("a") is None and "a" not in cache
+
+
+def test_make_cache_backends(tmp_path):
+    assert isinstance(make_cache("memory", 4), LRUCache)
+    assert isinstance(make_cache(" SQLite ", 4, path=str(tmp_path / "c.sqlite3")), SQLiteCache)
+    assert make_cache("off", 4) is None
+    with pytest.raises(ValueError):
+        make_cache("redis", 4)
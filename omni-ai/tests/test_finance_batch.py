@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from services.finance import analyze_finances, analyze_finances_batch
+
+CATEGORIES = ["rent", "food", "subscriptions", "transport"]
+
+
+def random_batch(rng, users=4, periods=3):
+    expenses = [[[rng.choice((0, -5, rng.randrange(1, 900))) for _ in CATEGORIES] for _ in range(periods)] for _ in range(users)]
+    income = [[rng.choice((None, rng.randrange(500, 4000))) for _ in range(periods)] for _ in range(users)]
+    goal = [rng.choice((0, 100, 800)) for _ in range(users)]
+    return {"users": [f"u{k}" for k in range(users)], "categories": CATEGORIES,
+            "expenses": expenses, "monthly_income": income, "savings_goal": goal, "insights": True}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_every_cell_matches_analyze_finances(seed):
+    data = random_batch(random.Random(seed))
+    out = analyze_finances_batch(data)
+    for u in range(len(data["users"])):
+        for p in range(len(data["expenses"][u])):
+            income = data["monthly_income"][u][p]
+            single = analyze_finances({
+                "expenses": dict(zip(CATEGORIES, data["expenses"][u][p])),
+                "savings_goal": data["savings_goal"][u],
+                "monthly_income": income,
+            })
+            assert out["risk_level"][u][p] == single["risk_level"]
+            assert out["total_spent"][u][p] == single["summary"]["total_spent"]
+            assert out["key_insights"][u][p] == single["key_insights"]
+            if single["breakdown"]:
+                assert out["top_category"][u][p] == single["breakdown"][0]["category"]
+                assert out["top_percent"][u][p] == single["breakdown"][0]["percent"]
+                assert out["disposable_after_expenses"][u][p] == single["summary"]["disposable_after_expenses"]
+            else:
+                assert out["top_category"][u][p] is None
+
+
+def test_month_over_month_deltas():
+    out = analyze_finances_batch({"categories": ["food"], "expenses": [[[100], [150], [0], [50]]]})
+    assert out["mom_delta"] == [[None, 50.0, -150.0, 50.0]]
+    assert out["mom_delta_pct"] == [[None, 50.0, -100.0, None]]
+    assert out["users"] == [0] and out["periods"] == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    [{"expenses": []}],
+    "text",
+    {"categories": ["a"], "expenses": [[1, 2]]},
+    {"categories": ["a"], "expenses": [[[1]]], "users": ["x", "y"]},
+    {"categories": ["a"], "expenses": [[[1]], [[2]]], "monthly_income": [1, 2, 3]},
+])
+def test_malformed_batches_raise_value_error(data):
+    with pytest.raises(ValueError):
+        analyze_finances_batch(data)
+
+
+def test_route_answers_400_for_a_list_body():
+    from app import app
+
+    resp = app.test_client().post("/ai/finance/analyze/batch", json=[{"expenses": []}])
+    assert resp.status_code == 400
+    assert "JSON object" in resp.get_json()["error"]
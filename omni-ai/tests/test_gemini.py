@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import gemini
+from utils.breaker import CircuitOpenError
+from utils.limiter import ModelLimiter
+
+
+class _Models:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, model, contents, **kwargs):
+        self.calls += 1
+        return "ok"
+
+
+class _Client:
+    def __init__(self):
+        self.models = _Models()
+        self.aio = self  # never reached while the breaker is open
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = _Client()
+    monkeypatch.setattr(gemini, "client", stub)
+    # one slot, held by the test; waiters would block for the whole timeout
+    limiter = ModelLimiter(max_concurrency=1, max_waiting=8, wait_timeout=5)
+    monkeypatch.setattr(gemini, "limiter", limiter)
+    monkeypatch.setattr(gemini, "_breakers", {})
+    limiter.acquire()
+    yield stub
+    limiter.release()
+
+
+def open_breaker(model):
+    breaker = gemini.breaker_for(model)
+    for _ in range(breaker.min_calls):
+        breaker.record(False, 0.0)
+    assert breaker.state == "open"
+
+
+def test_open_breaker_fails_before_queueing_for_a_slot(client):
+    open_breaker("m")
+    t0 = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        gemini.generate_content(model="m", contents=["x"])
+    with pytest.raises(CircuitOpenError):
+        next(gemini.generate_content_stream(model="m", contents=["x"]))
+    assert time.monotonic() - t0 < 1
+    assert gemini.limiter.waiting == 0
+    assert client.models.calls == 0
+
+
+def test_closed_breaker_still_waits_for_the_slot(client):
+    done = threading.Event()
+    threading.Thread(target=lambda: (gemini.generate_content(model="m", contents=["x"]), done.set())).start()
+    end = time.monotonic() + 2
+    while gemini.limiter.waiting == 0 and time.monotonic() < end:
+        time.sleep(0.005)
+    assert gemini.limiter.waiting == 1 and not done.is_set()
+    gemini.limiter.release()
+    assert done.wait(2)
+    gemini.limiter.acquire()
+    assert client.models.calls == 1
+
+
+def test_async_open_breaker_fails_fast(client):
+    open_breaker("m")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(asyncio.wait_for(gemini.agenerate_content(model="m", contents=["x"]), 1))
@@ -0,0 +1,53 @@
+import itertools
+import json
+
+import pytest
+
+import app as web
+from services.health import analyze_health, analyze_health_batch, rows_to_columns
+
+# values on and around every threshold
+SNAPSHOTS = [
+    {"sleep_hours": s, "water_intake_liters": w, "exercise_minutes": e, "stress_level": st}
+    for s, w, e, st in itertools.product(
+        (0, 5.9, 6, 6.5, 7, 9), (0, 1.49, 1.5, 2, 3), (0, 9, 10, 29, 30, 60), ("high", "medium", "low", "unknown"))
+]
+
+
+def test_rows_match_analyze_health():
+    out = analyze_health_batch(rows_to_columns(SNAPSHOTS), rows=True)
+    assert out["count"] == len(SNAPSHOTS)
+    assert out["results"] == [analyze_health(s) for s in SNAPSHOTS]
+
+
+def test_missing_values_get_analyze_health_defaults():
+    snapshots = [{}, {"sleep_hours": 8}, {"stress_level": "high", "water_intake_liters": None}]
+    out = analyze_health_batch(rows_to_columns(snapshots), rows=True)
+    assert out["results"] == [analyze_health({k: v for k, v in s.items() if v is not None}) for s in snapshots]
+
+
+def test_columnar_output_and_ids():
+    out = analyze_health_batch({"sleep_hours": [8, 4], "stress_level": ["low", "high"], "ids": ["a", "b"]})
+    assert out["ids"] == ["a", "b"]
+    assert out["burnout_risk"] == [analyze_health({"sleep_hours": 8, "stress_level": "low"})["burnout_risk"],
+                                   analyze_health({"sleep_hours": 4, "stress_level": "high"})["burnout_risk"]]
+    assert len(out["risk_factors"]["sleep"]) == 2
+
+
+@pytest.mark.parametrize("columns", [{"sleep_hours": [1, 2], "exercise_minutes": [1]}, {"sleep_hours": ["lots"]}])
+def test_invalid_columns(columns):
+    with pytest.raises(ValueError):
+        analyze_health_batch(columns)
+
+
+def test_route_accepts_ndjson_and_rejects_ragged_input():
+    client = web.app.test_client()
+    body = "\n".join(json.dumps({**s, "id": k}) for k, s in enumerate(SNAPSHOTS[:5])) + "\n\n"
+    resp = client.post("/ai/health/analyze/batch?rows=1", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [r.pop("id") for r in results] == list(range(5))
+    assert results == [analyze_health(s) for s in SNAPSHOTS[:5]]
+
+    ragged = client.post("/ai/health/analyze/batch", json={"sleep_hours": [1, 2], "exercise_minutes": [1]})
+    assert ragged.status_code == 400
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+import app as web
+from utils.image_store import ImageStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 32
+
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path, monkeypatch):
+    s = ImageStore(max_bytes=1 << 20, directory=str(tmp_path) if request.param == "disk" else None)
+    monkeypatch.setattr(web, "image_store", s)
+    return s
+
+
+def test_ids_are_content_hashes(store):
+    image_id = store.put(PNG)
+    assert image_id == store.put(PNG) == ImageStore.image_id(PNG)
+    assert store.get(image_id) == PNG
+    assert store.get("../" + image_id) is None
+    assert store.get("0" * 32) is None
+
+
+def test_route_serves_with_etag_and_answers_304(store):
+    image_id = store.put(PNG)
+    client = web.app.test_client()
+
+    resp = client.get(f"/ai/images/{image_id}")
+    assert resp.status_code == 200
+    assert resp.data == PNG
+    assert resp.mimetype == "image/png"
+    assert resp.headers["ETag"] == f'"{image_id}"'
+    assert "immutable" in resp.headers["Cache-Control"]
+
+    again = client.get(f"/ai/images/{image_id}", headers={"If-None-Match": f'"{image_id}"'})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    assert client.get("/ai/images/" + "0" * 32).status_code == 404
+    assert client.get("/ai/images/not-an-id").status_code == 404
+
+
+def test_disk_sweep_drops_expired_then_oldest(tmp_path):
+    store = ImageStore(max_bytes=2 * (len(PNG) + 1), directory=str(tmp_path), ttl=100)
+    ids = [store.put(PNG + bytes([k])) for k in range(4)]
+    for age, image_id in zip((500, 30, 20, 10), ids):
+        t = 1000 - age
+        os.utime(store.path(image_id), (t, t))
+
+    assert store.sweep(now=1000) == 2  # the expired one, then the oldest over the size bound
+    assert [store.get(i) is not None for i in ids] == [False, False, True, True]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from utils.json_stream import JSONObjectScanner, first_object
+
+DOC = {
+    "schedule": [
+        {"start": "09:00", "end": "10:00", "activity": "Write \"report\" {draft}"},
+        {"start": "10:00", "end": "10:10", "activity": "Break \\ [coffee]"},
+    ],
+    "reasoning": ["a } in a string", "quote \" and backslash \\"],
+}
+TEXT = "Sure! Here is the plan:\n```json\n" + json.dumps(DOC) + "\n```\nTrailing {braces}."
+
+
+def feed_in_chunks(scanner, text, size):
+    entries = []
+    for i in range(0, len(text), size):
+        entries += scanner.feed(text[i:i + size])
+    return entries
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(TEXT)])
+def test_any_chunk_split_gives_the_same_object_and_entries(size):
+    scanner = JSONObjectScanner(array_key="schedule")
+    entries = feed_in_chunks(scanner, TEXT, size)
+    assert scanner.done
+    assert scanner.value() == DOC
+    assert entries == DOC["schedule"]
+
+
+def test_split_inside_an_escape_sequence():
+    scanner = JSONObjectScanner()
+    # the backslash ends one chunk, the escaped quote starts the next
+    assert scanner.feed('{"a": "x\\') == []
+    assert not scanner.done
+    scanner.feed('"}", "b": 1}')
+    assert scanner.done
+    assert scanner.value() == {"a": 'x"}', "b": 1}
+
+
+def test_escaped_quotes_and_braces_do_not_close_the_object():
+    scanner = JSONObjectScanner()
+    scanner.feed('{"a": "\\"}\\\\", "b": "{[", "c": [1, {"d": "]"}]} tail }')
+    assert scanner.value() == {"a": '"}\\', "b": "{[", "c": [1, {"d": "]"}]}
+
+
+def test_entries_are_reported_in_the_chunk_they_complete():
+    scanner = JSONObjectScanner(array_key="items")
+    assert scanner.feed('{"items": [{"n": 1}, {"n"') == [{"n": 1}]
+    assert scanner.feed(': 2}]') == [{"n": 2}]
+    assert not scanner.done
+    assert scanner.feed("}") == []
+    assert scanner.done
+
+
+def test_nested_arrays_with_the_same_key_are_not_entries():
+    scanner = JSONObjectScanner(array_key="items")
+    entries = scanner.feed('{"other": {"items": [{"n": 0}]}, "items": [{"n": 1}]}')
+    assert entries == [{"n": 1}]
+
+
+def test_incomplete_object():
+    scanner = JSONObjectScanner()
+    scanner.feed('{"a": [1, 2')
+    assert not scanner.done
+    with pytest.raises(ValueError):
+        scanner.value()
+
+
+def test_first_object_skips_braces_in_prose():
+    assert first_object('Use {braces} wisely. {"ok": true}') == {"ok": True}
+    with pytest.raises(ValueError):
+        first_object("no json here")
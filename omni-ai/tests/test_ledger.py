@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+import app as web
+from services.ledger import _month, aggregate_ledger, iter_csv, iter_ndjson
+
+CSV = """Date,Category,Amount,Type
+2026-01-03,Food,100,
+2026-01-20,Salary,3000,
+2026-02-02, food ,50,
+2026-02-10,Food,30,refund
+2026-02-11,Rent,1000,
+2026-02-12,Rent,oops,
+"""
+
+
+def test_csv_rows_have_lower_cased_keys():
+    rows = list(iter_csv(io.StringIO(CSV)))
+    assert rows[0] == {"date": "2026-01-03", "category": "Food", "amount": "100", "type": ""}
+    assert len(rows) == 6
+    assert list(iter_csv(io.StringIO(""))) == []
+
+
+def test_ndjson_skips_blank_lines():
+    lines = ['{"Amount": 5, "Category": "x"}', "", "  ", "[1]"]
+    assert list(iter_ndjson(lines)) == [{"amount": 5, "category": "x"}, {}]
+
+
+def test_aggregate_monthly_averages_refunds_and_income():
+    ledger = aggregate_ledger(iter_csv(io.StringIO(CSV)))
+    assert ledger["months"] == 2 and (ledger["first_month"], ledger["last_month"]) == ("2026-01", "2026-02")
+    assert ledger["expenses"] == {"food": 60.0, "rent": 500.0}  # (100 + 50 - 30) / 2
+    assert ledger["monthly_income"] == 1500.0
+    assert (ledger["transactions"], ledger["skipped"]) == (5, 1)
+
+
+def test_negative_sign_bank_exports():
+    rows = [{"amount": "-40", "category": "food"}, {"amount": "15", "category": "food"}, {"amount": "2000", "type": "credit"}]
+    ledger = aggregate_ledger(rows, sign="negative")
+    assert ledger["expenses"] == {"food": 25.0}
+    assert ledger["monthly_income"] == 2000.0
+    with pytest.raises(ValueError):
+        aggregate_ledger(rows, sign="minus")
+
+
+@pytest.mark.parametrize("value,fmt,month", [
+    ("2026-03-09", None, "2026-03"),
+    ("2026/3/9", None, "2026-03"),
+    ("2026-03-09T10:00:00Z", None, "2026-03"),
+    (1772409600, None, "2026-03"),
+    ("1772409600000", None, "2026-03"),
+    ("09/03/2026", "%d/%m/%Y", "2026-03"),
+    ("", None, None),
+])
+def test_month(value, fmt, month):
+    assert _month(value, fmt) == month
+
+
+@pytest.mark.parametrize("value", ["09/03/2026", "2026-13-01", "yesterday"])
+def test_ambiguous_or_bad_dates_raise(value):
+    with pytest.raises(ValueError):
+        _month(value)
+
+
+def test_route_reads_raw_csv_multipart_and_ndjson():
+    client = web.app.test_client()
+
+    raw = client.post("/ai/finance/ledger", data=CSV, content_type="text/csv")
+    assert raw.status_code == 200
+    assert raw.get_json()["ledger"]["months"] == 2
+
+    upload = client.post("/ai/finance/ledger", content_type="multipart/form-data", data={
+        "file": (io.BytesIO(CSV.encode("utf-8-sig")), "ledger.csv"), "savings_goal": "100"})
+    assert upload.status_code == 200
+    assert upload.get_json()["ledger"] == raw.get_json()["ledger"]
+
+    ndjson = "\n".join(json.dumps(r) for r in iter_csv(io.StringIO(CSV)))
+    lines = client.post("/ai/finance/ledger?format=ndjson", data=ndjson)
+    assert lines.get_json()["ledger"] == raw.get_json()["ledger"]
+
+    bad = client.post("/ai/finance/ledger", data="date,amount\n31/12/2026,5\n", content_type="text/csv")
+    assert bad.status_code == 400
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.limiter import LimiterFullError, ModelLimiter
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_queue_overflow_is_rejected():
+    limiter = ModelLimiter(max_concurrency=1, max_waiting=1, wait_timeout=5)
+    limiter.acquire()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), limiter.release()))
+    waiter.start()
+    wait_until(lambda: limiter.waiting == 1)
+
+    with pytest.raises(LimiterFullError):
+        limiter.acquire()
+    assert limiter.rejected == 1
+
+    limiter.release()
+    waiter.join(2)
+    assert not waiter.is_alive()
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_waiter_times_out_and_leaves_the_queue():
+    limiter = ModelLimiter(max_concurrency=1, max_waiting=4, wait_timeout=0.05)
+    limiter.acquire()
+    t0 = time.monotonic()
+    with pytest.raises(LimiterFullError):
+        limiter.acquire()
+    assert time.monotonic() - t0 >= 0.05
+    assert limiter.timeouts == 1
+    assert limiter.waiting == 0
+
+    # the slot still works normally afterwards
+    limiter.release()
+    with limiter.slot():
+        assert limiter.in_flight == 1
+    assert limiter.in_flight == 0
+
+
+def test_released_slot_goes_to_the_oldest_waiter():
+    limiter = ModelLimiter(max_concurrency=1, max_waiting=4, wait_timeout=5)
+    limiter.acquire()
+    order = []
+
+    def worker(n):
+        with limiter.slot():
+            order.append(n)
+
+    threads = []
+    for n in range(3):
+        threads.append(threading.Thread(target=worker, args=(n,)))
+        threads[-1].start()
+        wait_until(lambda: limiter.waiting == n + 1)
+    limiter.release()
+    for t in threads:
+        t.join(2)
+    assert order == [0, 1, 2]
+    assert limiter.in_flight == 0
+
+
+def test_async_overflow_and_timeout():
+    async def run():
+        limiter = ModelLimiter(max_concurrency=1, max_waiting=1, wait_timeout=0.05)
+        await limiter.acquire_async()
+        queued = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+
+        with pytest.raises(LimiterFullError):
+            await limiter.acquire_async()
+        with pytest.raises(LimiterFullError):
+            await queued
+        assert (limiter.rejected, limiter.timeouts, limiter.waiting) == (1, 1, 0)
+
+        limiter.release()
+        async with limiter.aslot():
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from services.planner import _parse_time, plan_schedule
+
+TYPES = ("focus", "study", "work", "exercise", "chores", "")
+PRIORITIES = ("low", "medium", "high")
+
+
+def random_day(rng, n):
+    activities = []
+    for k in range(n):
+        a = {
+            "name": f"task {k}",
+            "duration": rng.choice((5, 10, 15, 20, 30, 45, 60, 90, 120)),
+            "priority": rng.choice(PRIORITIES),
+            "type": rng.choice(TYPES),
+        }
+        if rng.random() < 0.2:
+            a["fixed_start"] = f"{rng.randrange(6, 23):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+        activities.append(a)
+    return activities
+
+
+def check(activities, day_start, day_end, schedule, unscheduled):
+    ds, de = _parse_time(day_start), _parse_time(day_end)
+    blocks = [(_parse_time(e["start"]), _parse_time(e["end"]), e["activity"]) for e in schedule]
+
+    # inside the day, in order, without overlaps
+    for s, e, _ in blocks:
+        assert ds <= s < e <= de
+    for (_, e1, _), (s2, _, _) in zip(blocks, blocks[1:]):
+        assert e1 <= s2
+
+    # every activity exactly once: either placed (with its duration and fixed start) or unscheduled
+    placed = {name: (s, e) for s, e, name in blocks if name != "Break"}
+    assert len(placed) == len([b for b in blocks if b[2] != "Break"])
+    by_name = {a["name"]: a for a in activities}
+    assert set(placed) | set(unscheduled) == set(by_name)
+    assert not set(placed) & set(unscheduled)
+    for name, (s, e) in placed.items():
+        a = by_name[name]
+        assert e - s == a["duration"]
+        if "fixed_start" in a:
+            assert s == _parse_time(a["fixed_start"])
+    if schedule:
+        assert schedule[-1]["activity"] != "Break"
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("energy", ["morning", "evening", "balanced"])
+def test_random_days_keep_the_invariants(seed, energy):
+    rng = random.Random(seed)
+    activities = random_day(rng, rng.randrange(0, 25))
+    day_start, day_end = rng.choice((("08:00", "18:00"), ("06:30", "23:00"), ("09:00", "12:00")))
+    schedule, unscheduled = plan_schedule(activities, day_start, day_end, energy)
+    check(activities, day_start, day_end, schedule, unscheduled)
+
+
+def test_overlapping_fixed_activities_keep_the_higher_priority():
+    activities = [
+        {"name": "low", "duration": 60, "priority": "low", "fixed_start": "10:00"},
+        {"name": "high", "duration": 60, "priority": "high", "fixed_start": "10:30"},
+        {"name": "outside", "duration": 30, "fixed_start": "07:00"},
+    ]
+    schedule, unscheduled = plan_schedule(activities, "09:00", "17:00")
+    assert {"start": "10:30", "end": "11:30", "activity": "high"} in schedule
+    assert unscheduled == ["low", "outside"]
+    check(activities, "09:00", "17:00", schedule, unscheduled)
+
+
+def test_overfull_day_keeps_the_highest_priority_minutes():
+    activities = [
+        {"name": "a", "duration": 60, "priority": "low"},
+        {"name": "b", "duration": 60, "priority": "high"},
+        {"name": "c", "duration": 60, "priority": "medium"},
+    ]
+    schedule, unscheduled = plan_schedule(activities, "09:00", "11:00")
+    assert [e["activity"] for e in schedule] == ["b", "c"]
+    assert unscheduled == ["a"]
+
+
+def test_demanding_work_is_followed_by_a_break():
+    activities = [{"name": "deep work", "duration": 50, "type": "focus"}, {"name": "email", "duration": 20}]
+    schedule, _ = plan_schedule(activities, "09:00", "12:00", "morning")
+    assert [e["activity"] for e in schedule] == ["deep work", "Break", "email"]
+
+
+@pytest.mark.parametrize("hours", [("18:00", "09:00"), ("09:00", "09:00"), ("nine", "17:00"), (None, "17:00")])
+def test_unusable_hours_are_rejected(hours):
+    with pytest.raises(ValueError):
+        plan_schedule([{"name": "a"}], *hours)
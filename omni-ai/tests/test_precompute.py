@@ -0,0 +1,63 @@
+import pytest
+
+from services import precompute, schedule, summary
+from utils import gemini
+from utils.cache import LRUCache, make_cache
+
+DAY = {"day_start": "09:00", "day_end": "12:00", "activities": [{"name": "Write", "duration": 60, "type": "focus"}]}
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = make_cache("sqlite", max_items=100, ttl=3600, path=str(tmp_path / "pre.sqlite3"))
+    monkeypatch.setattr(precompute, "_store", store)
+    monkeypatch.setattr(schedule, "_results", None)
+    monkeypatch.setattr(summary, "_illustrations", LRUCache(max_items=8))
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    calls = []
+    monkeypatch.setattr(summary, "_generate_illustration", lambda mood: calls.append(mood) or b"\x89PNG\r\n\x1a\n" + mood.encode())
+    return store, calls
+
+
+def test_entries_are_computed_once_and_served_by_lookup(store):
+    _, calls = store
+    entries = [
+        {"user_id": "a", "schedule": DAY, "summary": {"mood": "Happy"}},
+        {"user_id": "b", "schedule": dict(DAY), "summary": {"mood": "happy "}},
+        {"user_id": "c", "summary": {"mood": "calm"}},
+    ]
+    report = precompute.precompute(entries, concurrency=2)
+    assert (report["jobs"], report["stored"], report["failed"]) == (3, 3, [])
+    assert sorted(calls) == ["calm", "happy"]
+
+    planned = precompute.lookup("schedule", DAY)
+    assert planned["schedule"][0]["activity"] == "Write"
+    # a mood spelled differently still hits, and the text keeps the caller's spelling
+    hit = precompute.lookup("summary", {"mood": "HAPPY"})
+    assert hit["visual"] == b"\x89PNG\r\n\x1a\nhappy"
+    assert hit["summary"] == summary._summary_text("HAPPY")
+    assert precompute.lookup("summary", {"mood": "sad"}) is None
+
+    again = precompute.precompute(entries)
+    assert (again["stored"], again["cached"]) == (0, 3)
+    assert precompute.precompute(entries, force=True)["stored"] == 3
+
+
+def test_fallbacks_and_bad_bodies_are_not_stored(store, monkeypatch):
+    monkeypatch.setattr(summary, "_generate_illustration", lambda mood: None)
+    report = precompute.precompute([
+        {"user_id": "a", "summary": {"mood": "calm"}},
+        {"user_id": "b", "schedule": {**DAY, "day_start": "25:00"}},
+    ])
+    assert report["fallback"] == 1 and report["stored"] == 0
+    assert report["failed"][0]["user_id"] == "b"
+    assert precompute.lookup("summary", {"mood": "calm"}) is None
+    assert precompute.lookup("schedule", {"day_start": "nope"}) is None
+
+
+def test_off_backend(monkeypatch):
+    monkeypatch.setattr(precompute, "_store", None)
+    assert precompute.lookup("schedule", DAY) is None
+    with pytest.raises(RuntimeError):
+        precompute.precompute([{"schedule": DAY}])
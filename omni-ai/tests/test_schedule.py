@@ -0,0 +1,54 @@
+import pytest
+
+from services import schedule
+from utils import gemini
+
+OVERFULL = {
+    "day_start": "09:00", "day_end": "10:00", "energy": "morning",
+    "activities": [{"name": "a", "duration": 50, "priority": "high"}, {"name": "b", "duration": 50}],
+}
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    monkeypatch.setattr(schedule, "_results", None)
+
+
+@pytest.mark.parametrize("mode", ["auto", "always"])
+@pytest.mark.parametrize("refine", [False, True])
+def test_without_api_key_the_plan_is_final_and_cacheable(monkeypatch, mode, refine):
+    monkeypatch.setattr(schedule, "SCHEDULE_LLM", mode)
+    result, cacheable = schedule._generate_schedule(*schedule._parse_request({**OVERFULL, "refine": refine}))
+    assert cacheable
+    assert [e["activity"] for e in result["schedule"]] == ["a"]
+    assert "Did not fit: b." in result["reasoning"]
+    assert not any("format limits" in r for r in result["reasoning"])
+    asked = refine or mode == "always"
+    assert any("not configured" in r for r in result["reasoning"]) == asked
+
+
+def test_auto_mode_does_not_ask_the_model_for_an_overfull_day(monkeypatch):
+    monkeypatch.setattr(gemini, "client", object())  # configured, but must not be used
+    monkeypatch.setattr(schedule, "SCHEDULE_LLM", "auto")
+    assert schedule._wants_model(False, []) == (False, [])
+    assert schedule._wants_model(True, []) == (True, [])
+    monkeypatch.setattr(schedule, "SCHEDULE_LLM", "never")
+    assert schedule._wants_model(True, []) == (False, [])
+
+
+def test_stream_without_api_key_is_planner_only():
+    events = list(schedule.stream_schedule({**OVERFULL, "refine": True}))
+    assert [name for name, _ in events] == ["schedule", "image"]
+    assert events[0][1]["source"] == "planner"
+
+
+def test_equivalent_requests_share_one_cached_result(monkeypatch):
+    from utils.cache import LRUCache
+
+    monkeypatch.setattr(schedule, "_results", LRUCache(max_items=8))
+    first = schedule.generate_schedule(OVERFULL)
+    reordered = {k: OVERFULL[k] for k in reversed(list(OVERFULL))}
+    assert schedule.generate_schedule(reordered) is first
+    assert schedule._results.stats()["hits"] == 1
@@ -0,0 +1,94 @@
+import pytest
+
+from services import schedule, schedule_week
+from utils import gemini
+
+WEEK = {
+    "start_date": "2026-10-19", "days": 2, "day_start": "09:00", "day_end": "12:00",
+    "activities": [
+        {"name": "Write", "duration": 60, "day": "2026-10-19"},
+        {"name": "Read", "duration": 30, "day": "2026-10-19"},
+        {"name": "Gym", "duration": 60, "day": "2026-10-20"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def no_api_key(monkeypatch):
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    monkeypatch.setattr(schedule, "_results", None)
+
+
+def test_dropped_lists_activities_missing_from_the_model_schedule():
+    activities = [{"name": "Write"}, {"title": "Read"}, {"name": "Write"}, {}]
+    placed = [{"activity": " write "}, {"activity": "Break"}, {"activity": "Activity"}]
+    assert schedule_week._dropped(activities, placed) == ["Read", "Write"]
+
+
+def test_model_days_report_what_the_model_left_out(monkeypatch):
+    monkeypatch.setattr(gemini, "client", object())
+    monkeypatch.setattr(gemini, "ensure_available", lambda model: None)
+    monkeypatch.setattr(schedule, "_request_background", lambda: None)
+    monkeypatch.setattr(schedule_week, "_request_week", lambda prompt: {
+        "days": [
+            {"date": "2026-10-19", "schedule": [{"start": "09:00", "end": "10:00", "activity": "Write"}]},
+            {"date": "2026-10-20", "schedule": [{"start": "09:00", "end": "10:00", "activity": "Gym"}]},
+        ],
+        "reasoning": ["ok"],
+    })
+    result, _ = schedule_week._generate_week(*schedule_week._parse_week({**WEEK, "refine": True}))
+    assert [(d["source"], d["unscheduled"]) for d in result["days"]] == [("model", ["Read"]), ("model", [])]
+
+
+def test_distribute_pins_repeats_and_balances():
+    days = schedule_week._parse_week({"start_date": "2026-10-19", "days": 3})[0]  # Monday..Wednesday
+    activities = [
+        {"name": "Standup", "duration": 15, "repeat": "daily"},
+        {"name": "Review", "duration": 60, "day": "Tuesday"},
+        {"name": "Deep work", "duration": 120, "priority": "high"},
+        {"name": "Email", "duration": 30},
+        "not an activity",
+    ]
+    per_day = [[a["name"] for a in acts] for acts in schedule_week._distribute(activities, days)]
+    assert per_day == [["Standup", "Deep work"], ["Standup", "Review"], ["Standup", "Email"]]
+
+
+def test_per_day_hours_by_weekday_or_date():
+    days = schedule_week._parse_week({
+        "start_date": "2026-10-24", "days": 2,  # Saturday, Sunday
+        "hours": {"Saturday": {"day_start": "10:00"}, "2026-10-25": {"day_start": "11:00", "day_end": "15:00"}},
+    })[0]
+    assert [(d["day_start"], d["day_end"]) for d in days] == [("10:00", "22:00"), ("11:00", "15:00")]
+
+
+@pytest.mark.parametrize("data", [
+    {"days": 0}, {"days": 99}, {"days": True}, {"days": "a week"},
+    {"start_date": "tomorrow"},
+    {"hours": ["saturday"]},
+    {"start_date": "2026-10-24", "hours": {"saturday": {"day_start": "18:00", "day_end": "10:00"}}},
+    {"start_date": "2026-10-24", "hours": {"saturday": {"day_end": "24:30"}}},
+    {"image": "gif"},
+])
+def test_invalid_week_requests(data):
+    with pytest.raises(ValueError):
+        schedule_week._parse_week(data)
+
+
+def test_planner_week_without_api_key():
+    result = schedule_week.generate_week({**WEEK, "refine": True, "image": "composite"})
+    assert [d["date"] for d in result["days"]] == ["2026-10-19", "2026-10-20"]
+    assert {d["source"] for d in result["days"]} == {"planner"}
+    assert [[e["activity"] for e in d["schedule"] if e["activity"] != "Break"] for d in result["days"]] == [["Write", "Read"], ["Gym"]]
+    assert result["visual_week"][:8] == b"\x89PNG\r\n\x1a\n"
+    assert any("not configured" in r for r in result["reasoning"])
+
+
+def test_route_returns_one_image_url_per_day():
+    import app as web
+
+    resp = web.app.test_client().post("/ai/schedule/week", json=WEEK)
+    assert resp.status_code == 200
+    days = resp.get_json()["days"]
+    assert all("/ai/images/" in d["visual_schedule"] for d in days)
+    assert web.app.test_client().post("/ai/schedule/week", json={**WEEK, "days": 0}).status_code == 400
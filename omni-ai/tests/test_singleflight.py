@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+from utils.singleflight import SingleFlight, canonical_key
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    flight = SingleFlight("test-coalesce")
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        started.set()
+        release.wait(2)
+        return {"value": 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    wait_until(lambda: flight.coalesced == 4)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(2)
+
+    assert len(runs) == 1
+    assert results == [{"value": 42}] * 5
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    # a later call runs again
+    assert flight.do("k", lambda: 7) == 7
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight("test-error")
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(2)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", work)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(2)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_until(lambda: flight.coalesced == 1)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert errors == ["boom", "boom"]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_coalescing_and_error():
+    async def run():
+        flight = SingleFlight("test-async")
+        runs = []
+
+        async def work(value):
+            runs.append(value)
+            await asyncio.sleep(0.01)
+            if value == "bad":
+                raise ValueError("bad")
+            return value
+
+        assert await asyncio.gather(*(flight.ado("k", work, "v") for _ in range(5))) == ["v"] * 5
+        assert runs == ["v"]
+
+        results = await asyncio.gather(*(flight.ado("e", work, "bad") for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert runs == ["v", "bad"]
+
+    asyncio.run(run())
+
+
+def test_canonical_key_ignores_key_order():
+    assert canonical_key({"a": 1, "b": [1, 2]}) == canonical_key({"b": [1, 2], "a": 1})
+    assert canonical_key({"a": 1}) != canonical_key({"a": 2})
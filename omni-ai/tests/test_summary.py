@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import summary
+from utils import gemini
+from utils.cache import LRUCache
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def illustration(mood):
+        calls.append(mood)
+        release.wait(2)
+        return b"\x89PNG\r\n\x1a\n" + mood.encode()
+
+    async def aillustration(mood):
+        calls.append(mood)
+        await asyncio.sleep(0.05)
+        return b"\x89PNG\r\n\x1a\n" + mood.encode()
+
+    monkeypatch.setattr(summary, "_illustrations", LRUCache(max_items=8))
+    monkeypatch.setattr(summary, "_generate_illustration", illustration)
+    monkeypatch.setattr(summary, "_aillustration", aillustration)
+    return calls, release
+
+
+def test_moods_that_normalize_alike_share_one_generation(model):
+    calls, release = model
+    results = {}
+
+    def ask(mood):
+        results[mood] = summary.generate_daily_summary({"mood": mood})
+
+    threads = [threading.Thread(target=ask, args=(m,)) for m in ("Happy", "happy ", "  HAPPY")]
+    for t in threads:
+        t.start()
+    end = time.monotonic() + 2
+    while summary._flight.coalesced < 2 and time.monotonic() < end:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join(2)
+
+    assert calls == ["happy"]
+    assert {r["visual"] for r in results.values()} == {b"\x89PNG\r\n\x1a\nhappy"}
+    # the text still echoes each caller's mood
+    assert results["Happy"]["summary"].startswith("You had a Happy day")
+
+
+def test_async_moods_that_normalize_alike_share_one_generation(model):
+    calls, _ = model
+
+    async def run():
+        return await asyncio.gather(*(summary.agenerate_daily_summary({"mood": m}) for m in ("Calm", "calm", " calm ")))
+
+    results = asyncio.run(run())
+    assert calls == ["calm"]
+    assert all(r["visual"] for r in results)
+
+
+def test_text_only_summary_without_api_key(monkeypatch):
+    monkeypatch.setattr(summary, "_illustrations", LRUCache(max_items=8))
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    result = summary.generate_daily_summary({"mood": "tired"})
+    assert result == {"summary": summary._summary_text("tired"), "visual": None}
+
+
+def test_missing_api_key_is_logged_once_and_not_counted(monkeypatch, caplog):
+    monkeypatch.setattr(summary, "_illustrations", LRUCache(max_items=8))
+    monkeypatch.setattr(summary, "_not_configured_logged", False)
+    monkeypatch.setattr(gemini, "client", None)
+    monkeypatch.setattr(gemini, "API_KEY", None)
+    counted = []
+    monkeypatch.setattr(summary.metrics, "inc", lambda name, *a, **kw: counted.append(name))
+
+    with caplog.at_level("WARNING", logger=summary.__name__):
+        for mood in ("tired", "calm", "tired"):
+            summary.generate_daily_summary({"mood": mood})
+        with pytest.raises(gemini.GeminiNotConfigured):
+            gemini.generate_content(model=summary.SUMMARY_MODEL, contents=["x"])
+
+    assert len(caplog.records) == 1
+    assert counted == []
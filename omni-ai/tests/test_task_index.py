@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from services import task_index
+from services.task_index import TaskIndex, TaskStore
+from services.tasks import urgency_key
+
+PRIORITIES = ("low", "medium", "high", None)
+
+
+def random_task(rng, k):
+    deadline = rng.choice((None, f"2026-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"))
+    return {"id": str(k), "title": f"t{k}", "deadline": deadline, "priority": rng.choice(PRIORITIES)}
+
+
+def expected_order(tasks):
+    open_tasks = [t for t in tasks.values() if not t.get("completed")]
+    return [t["id"] for t in sorted(open_tasks, key=urgency_key)]
+
+
+def test_random_edits_keep_the_heap_in_urgency_order():
+    rng = random.Random(7)
+    index = TaskIndex()
+    tasks = {str(k): random_task(rng, k) for k in range(300)}
+    index.load(tasks.values())
+
+    for step in range(2000):
+        k = str(rng.randrange(400))
+        op = rng.random()
+        if op < 0.5:
+            tasks[k] = index.upsert(random_task(rng, int(k)))
+        elif op < 0.7 and k in tasks:
+            tasks[k] = index.update(k, {"completed": rng.random() < 0.5})
+        elif op < 0.9:
+            assert index.delete(k) == (tasks.pop(k, None) is not None)
+        if step % 100 == 0:
+            want = expected_order(tasks)
+            # stable order for equal keys is by insertion, so compare keys, not ids
+            got = index.top(10)
+            assert [urgency_key(t) for t in got] == [urgency_key(tasks[i]) for i in want[:10]]
+            assert [urgency_key(t) for t in index.ordered()[:len(want)]] == [urgency_key(tasks[i]) for i in want]
+
+    assert len(index) == len(tasks)
+    # dead entries are compacted away instead of piling up
+    assert len(index._heap) <= 2 * len(expected_order(tasks)) + 65
+
+
+def test_ids_are_assigned_and_completed_tasks_listed_last():
+    index = TaskIndex()
+    index.load([{"title": "a", "deadline": "2026-01-02"}, {"title": "b", "deadline": "2026-01-01"}])
+    c = index.upsert({"title": "c"})
+    assert c["id"] == "3"
+    index.update("2", {"completed": True})
+    assert [t["title"] for t in index.ordered()] == ["a", "c", "b"]
+    assert [t["title"] for t in index.top(5)] == ["a", "c"]
+    assert index.update("missing", {}) is None
+
+
+@pytest.mark.parametrize("tasks", [[5], ["x"], [{"title": "ok"}, None], "abc", {"title": "x"}, 7])
+def test_load_rejects_bad_items_and_keeps_the_index(tasks):
+    index = TaskIndex()
+    index.load([{"title": "keep"}])
+    with pytest.raises(ValueError):
+        index.load(tasks)
+    assert [t["title"] for t in index.ordered()] == ["keep"]
+
+
+def test_load_and_upsert_enforce_the_task_limit(monkeypatch):
+    monkeypatch.setattr(task_index, "TASK_INDEX_MAX_TASKS", 3)
+    index = TaskIndex()
+    with pytest.raises(ValueError):
+        index.load([{"title": str(k)} for k in range(4)])
+    index.load([{"title": str(k)} for k in range(3)])
+    with pytest.raises(ValueError):
+        index.upsert({"title": "one too many"})
+    index.upsert({"id": "1", "title": "replacing is fine"})
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    a, b = TaskStore(path, max_users=1), TaskStore(path)
+    assert a.read("u", len) is None
+
+    a.load("u", [{"title": "x", "deadline": "2026-02-01"}, {"title": "y", "deadline": "2026-01-01"}])
+    assert [t["title"] for t in b.read("u", lambda i: i.ordered())] == ["y", "x"]
+    b.upsert("u", {"title": "z", "deadline": "2025-12-31"})
+    assert [t["title"] for t in a.read("u", lambda i: i.top(1))] == ["z"]
+
+    # evicted from a's cache: reloaded from the file, not lost
+    a.load("other", [])
+    assert a.read("u", len) == 3
+    assert a.delete("u", "1") and not b.delete("u", "1")
+    assert b.update("u", "1", {"title": "gone"}) is None
+    assert b.update("nobody", "1", {}) is None
+
+    with pytest.raises(ValueError):
+        b.load("u", [{"title": "ok"}, 5])
+    assert a.read("u", len) == 2
+
+
+def test_routes():
+    from app import app
+
+    client = app.test_client()
+    assert client.get("/ai/tasks/route-user").status_code == 404
+    assert client.get("/ai/tasks/route-user/next").status_code == 404
+    assert client.put("/ai/tasks/route-user", json={"tasks": [{"title": "a"}, 5]}).status_code == 400
+    assert client.put("/ai/tasks/route-user", json={"tasks": "abc"}).status_code == 400
+    assert client.put("/ai/tasks/route-user", json={"tasks": [{"title": "a"}]}).get_json() == {"count": 1}
+    assert client.patch("/ai/tasks/route-user/items/1", json=[1]).status_code == 400
+    assert client.post("/ai/tasks/route-user/items", json=[1]).status_code == 400
+    assert client.get("/ai/tasks/route-user/next?k=1").get_json() == {"tasks": [{"id": "1", "title": "a"}]}
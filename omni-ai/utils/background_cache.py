@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from utils import metrics
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Planner canvas size used by render_schedule_image
+CANVAS_SIZE = (900, 600)
+
+
+def _image_weight(img) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class BackgroundCache:
+    """
+    Content-addressed cache of generated backgrounds, keyed by (model, prompt, variant).
+
+    Entries are decoded and pre-resized to CANVAS_SIZE, so a hit costs one copy().
+    - memory tier: LRU bounded by decoded bytes
+    - disk tier (optional): PNG files that survive restarts
+    - variants: pool size per (model, prompt); each request picks one at random,
+      so output still varies once the pool is full
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str | None = None, variants: int = 1):
+        self.variants = max(1, int(variants))
+        self.disk_dir = disk_dir or None
+        self._mem = LRUCache(max_items=1024, max_weight=max_bytes, weigh=_image_weight)
+        self._locks = {}
+        self._alocks = {}
+        self._locks_guard = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(prompt: str, model: str, variant: int) -> str:
+        digest = hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()[:32]
+        return f"{digest}-{variant}"
+
+    def get(self, prompt: str, model: str, generate):
+        """
+        Returns a decoded CANVAS_SIZE RGB image, or None.
+        generate(): raw image bytes from the model, called only on a miss.
+        """
+        key = self.key(prompt, model, random.randrange(self.variants))
+
+        img = self._mem.get(key)
+        if img is not None:
+            return img
+
+        # one generation per key; concurrent misses wait for it
+        with self._lock_for(key):
+            if key in self._mem:
+                return self._mem.get(key)
+
+            img = self._load(key)
+            if img is None:
+                raw = generate()
+                if not raw:
+                    return None
+                img = decode_background(raw)
+                self._store(key, img)
+
+            return self._remember(key, img)
+
+    async def aget(self, prompt: str, model: str, agenerate):
+        """
+        get() for the event loop: agenerate() is a coroutine, file and PIL work runs in threads.
+        """
+        key = self.key(prompt, model, random.randrange(self.variants))
+
+        img = self._mem.get(key)
+        if img is not None:
+            return img
+
+        with self._locks_guard:
+            lock = self._alocks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._mem:
+                return self._mem.get(key)
+
+            img = await asyncio.to_thread(self._load, key)
+            if img is None:
+                raw = await agenerate()
+                if not raw:
+                    return None
+                img = await asyncio.to_thread(decode_background, raw)
+                await asyncio.to_thread(self._store, key, img)
+
+            return self._remember(key, img)
+
+    def stats(self) -> dict:
+        return {"variants": self.variants, "disk": bool(self.disk_dir), **self._mem.stats()}
+
+    def _remember(self, key: str, img):
+        # lets the render pool share this image with workers by key
+        img.info["cache_key"] = key
+        self._mem.set(key, img)
+        return img
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def _load(self, key: str):
+        if not self.disk_dir:
+            return None
+        try:
+            with Image.open(self._path(key)) as im:
+                return im.convert("RGB")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Background cache read failed for {key}: {e}")
+            return None
+
+    def _store(self, key: str, img) -> None:
+        if not self.disk_dir:
+            return
+        tmp = self._path(key) + ".tmp"
+        try:
+            img.save(tmp, format="PNG")
+            os.replace(tmp, self._path(key))
+        except Exception as e:
+            logger.warning(f"Background cache write failed for {key}: {e}")
+
+
+@metrics.timed("background.decode")
+def decode_background(raw: bytes):
+    return Image.open(BytesIO(raw)).convert("RGB").resize(CANVAS_SIZE)
+
+
+background_cache = BackgroundCache(
+    max_bytes=int(float(os.getenv("BG_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    disk_dir=os.getenv("BG_CACHE_DIR"),
+    variants=int(os.getenv("BG_VARIANTS", "3")),
+)
+metrics.register_cache("backgrounds", background_cache)
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    closed    -> open       when, over the last `window` calls (at least `min_calls`),
+                            the share of failures reaches `failure_ratio`.
+                            Calls slower than `slow_call_s` count as failures.
+    open      -> half_open  after `open_s`; one probe call is let through
+    half_open -> closed     if the probe succeeds, back to open otherwise
+    """
+
+    def __init__(self, name: str, failure_ratio: float = 0.5, min_calls: int = 5, window: int = 20,
+                 slow_call_s: float = 20.0, open_s: float = 30.0):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.slow_call_s = slow_call_s
+        self.open_s = open_s
+        self._outcomes = deque(maxlen=window)  # True = failure
+        self._latencies = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        True if a call may go upstream now. In half-open state only one probe is admitted.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self) -> bool:
+        """
+        Like allow() but without taking the half-open probe slot.
+        """
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def record(self, ok: bool, latency: float) -> None:
+        failed = (not ok) or latency > self.slow_call_s
+        with self._lock:
+            self._latencies.append(latency)
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+                    self._trip()
+
+    def call(self, fn, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        t0 = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - t0)
+            raise
+        self.record(True, time.monotonic() - t0)
+        return result
+
+    async def acall(self, fn, *args, **kwargs):
+        """
+        call() for coroutine functions.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        t0 = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException:
+            # includes cancellation by a deadline: the call was too slow, and a
+            # half-open probe must always be recorded to free the probe slot
+            self.record(False, time.monotonic() - t0)
+            raise
+        self.record(True, time.monotonic() - t0)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            outcomes = list(self._outcomes)
+            latencies = sorted(self._latencies)
+        return {
+            "state": state,
+            "recent_calls": len(outcomes),
+            "recent_failures": sum(outcomes),
+            "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
@@ -0,0 +1,175 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU.
+    max_items: entry bound
+    max_weight + weigh(value): optional size bound (e.g. bytes)
+    ttl: optional expiry in seconds
+    """
+
+    def __init__(self, max_items: int = 128, max_weight: int | None = None, weigh=None, ttl: float | None = None):
+        self.max_items = max(1, int(max_items))
+        self.max_weight = max_weight
+        self.ttl = ttl
+        self._weigh = weigh or (lambda v: 1)
+        self._data = OrderedDict()  # key -> (value, weight, expires_at)
+        self._weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._data.pop(key)
+                self._weight -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def set(self, key, value) -> None:
+        weight = self._weigh(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._data[key] = (value, weight, expires_at)
+            self._weight += weight
+            self._evict()
+
+    def delete(self, key) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "weight": self._weight, "hits": self.hits, "misses": self.misses}
+
+    def _evict(self) -> None:
+        # always keep the newest entry, even if it alone exceeds max_weight
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_items
+            or (self.max_weight is not None and self._weight > self.max_weight)
+        ):
+            _, (_, weight, _) = self._data.popitem(last=False)
+            self._weight -= weight
+
+
+class SQLiteCache:
+    """
+    Persistent cache in a local SQLite file, same get/set interface as LRUCache.
+    Values are pickled; entries expire after ttl seconds and the least recently
+    used rows are dropped beyond max_items.
+    """
+
+    def __init__(self, path: str, max_items: int = 10000, ttl: float | None = None):
+        self.path = path
+        self.max_items = max(1, int(max_items))
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def set(self, key, value) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, expires_at, now),
+            )
+            self._evict(now)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        excess = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_items
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+
+
+def make_cache(backend: str, max_items: int, ttl: float | None = None, path: str | None = None):
+    """
+    backend: "memory" (LRUCache), "sqlite" (SQLiteCache at path) or "off" (None)
+    """
+    backend = (backend or "memory").strip().lower()
+    if backend in ("off", "none", ""):
+        return None
+    if backend == "memory":
+        return LRUCache(max_items=max_items, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path or "cache.sqlite3", max_items=max_items, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,5 +1,11 @@
 import os
-from google import genai
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.breaker import CircuitBreaker, CircuitOpenError
+from utils.limiter import ModelLimiter
 
 # Load .env for local development (Docker --env-file still works)
 try:
@@ -10,7 +16,140 @@ except Exception:
 
 API_KEY = os.getenv("GENAI_API_KEY")
 
-if not API_KEY:
-    raise RuntimeError("GENAI_API_KEY not set")
+# Created on first use: importing google-genai is slow, and routes that never call
+# the model must keep working without GENAI_API_KEY. Tests/benchmarks may assign a stub.
+client = None
+_client_lock = threading.Lock()
+
+
+class GeminiNotConfigured(RuntimeError):
+    pass
+
+
+def configured() -> bool:
+    return client is not None or bool(API_KEY)
+
+def get_client():
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                if not API_KEY:
+                    raise GeminiNotConfigured("GENAI_API_KEY not set")
+                from google import genai
+                client = genai.Client(api_key=API_KEY)
+    return client
+
+# Cap on concurrent model calls for the whole service. The limiter lives in each worker
+# process (sync and async callers share it), so every worker gets its share of the totals.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_MAX_WAITING = int(os.getenv("GEMINI_MAX_WAITING", "128"))
+
+limiter = ModelLimiter(
+    max_concurrency=max(1, GEMINI_MAX_CONCURRENCY // WEB_CONCURRENCY),
+    max_waiting=max(0, GEMINI_MAX_WAITING // WEB_CONCURRENCY),
+    wait_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT_S", "10")),
+)
+
+# ---------- circuit breakers (one per model) ----------
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker(
+                model,
+                failure_ratio=float(os.getenv("GEMINI_BREAKER_FAILURE_RATIO", "0.5")),
+                min_calls=int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "5")),
+                window=int(os.getenv("GEMINI_BREAKER_WINDOW", "20")),
+                slow_call_s=float(os.getenv("GEMINI_BREAKER_SLOW_CALL_S", "20")),
+                open_s=float(os.getenv("GEMINI_BREAKER_OPEN_S", "30")),
+            )
+        return breaker
+
+def is_available(model: str) -> bool:
+    """
+    False while the model's breaker is open or no API key is set: callers should degrade right away.
+    """
+    return configured() and breaker_for(model).available()
+
+def ensure_available(model: str) -> None:
+    """
+    Raise GeminiNotConfigured / CircuitOpenError (without calling upstream) when is_available is False.
+    """
+    if not configured():
+        raise GeminiNotConfigured("GENAI_API_KEY not set")
+    if not breaker_for(model).available():
+        raise CircuitOpenError(f"Circuit '{model}' is open")
+
+@contextmanager
+def _observed(model: str):
+    # latency as seen by the caller (queueing included) and failures by type
+    t0 = time.perf_counter()
+    try:
+        yield
+    except GeminiNotConfigured:
+        # a configuration state, not an upstream failure
+        raise
+    except Exception as e:
+        metrics.inc("omni_upstream_errors_total", help="Failed or rejected model calls.", model=model, error=type(e).__name__)
+        raise
+    finally:
+        metrics.observe(f"gemini:{model}", time.perf_counter() - t0)
+
+def generate_content(model: str, contents, **kwargs):
+    """
+    client.models.generate_content behind the global limiter and the model's circuit breaker.
+    Raises utils.breaker.CircuitOpenError without calling upstream when open,
+    utils.limiter.LimiterFullError when no model slot is available in time,
+    GeminiNotConfigured when GENAI_API_KEY is missing.
+    """
+    with _observed(model):
+        models = get_client().models
+        # an open breaker fails before queueing for a slot; the probe itself is taken inside it
+        ensure_available(model)
+        with limiter.slot():
+            return breaker_for(model).call(models.generate_content, model=model, contents=contents, **kwargs)
+
+def generate_content_stream(model: str, contents, **kwargs):
+    """
+    client.models.generate_content_stream with the same limiter/breaker guards.
+    Yields response chunks; the model slot is held until the stream ends or is closed.
+    Closing the generator early (caller got what it needed) is not a failure.
+    """
+    with _observed(model):
+        models = get_client().models
+        ensure_available(model)
+        breaker = breaker_for(model)
+        with limiter.slot():
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit '{model}' is open")
+            t0 = time.monotonic()
+            ok = False
+            try:
+                for chunk in models.generate_content_stream(model=model, contents=contents, **kwargs):
+                    yield chunk
+                ok = True
+            except GeneratorExit:
+                ok = True
+                raise
+            finally:
+                breaker.record(ok, time.monotonic() - t0)
+
+async def agenerate_content(model: str, contents, **kwargs):
+    """
+    generate_content on the async client (client.aio): no thread is held while waiting.
+    """
+    with _observed(model):
+        models = get_client().aio.models
+        ensure_available(model)
+        async with limiter.aslot():
+            return await breaker_for(model).acall(models.generate_content, model=model, contents=contents, **kwargs)
 
-client = genai.Client(api_key=API_KEY)
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {model: b.stats() for model, b in breakers.items()}
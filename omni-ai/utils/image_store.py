@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ImageStore:
+    """
+    Content-addressed store for rendered images: the id is a hash of the bytes,
+    so it doubles as a strong ETag and stored images never change.
+    - memory: LRU bounded by total bytes
+    - disk (directory set): files shared by every worker process and kept across restarts,
+      swept every `sweep_s` seconds: files older than `ttl` go first, then the least
+      recently written ones until the directory is within max_bytes
+    """
+
+    def __init__(self, max_bytes: int, directory: str | None = None, ttl: float | None = None, sweep_s: float = 60):
+        self.directory = directory or None
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_s = sweep_s
+        self.evicted = 0
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._mem = LRUCache(max_items=100000, max_weight=max_bytes, weigh=len)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def image_id(raw: bytes) -> str:
+        return hashlib.sha256(raw).hexdigest()[:32]
+
+    @staticmethod
+    def valid_id(image_id: str) -> bool:
+        return bool(_ID_RE.match(image_id or ""))
+
+    def put(self, raw: bytes) -> str:
+        image_id = self.image_id(raw)
+        if self.directory:
+            path = self.path(image_id)
+            try:
+                # already stored: refresh its age so the sweep keeps it
+                os.utime(path)
+            except FileNotFoundError:
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(raw)
+                os.replace(tmp, path)
+            self._maybe_sweep()
+        else:
+            self._mem.set(image_id, raw)
+        return image_id
+
+    def get(self, image_id: str) -> bytes | None:
+        if not self.valid_id(image_id):
+            return None
+        if self.directory:
+            try:
+                with open(self.path(image_id), "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return self._mem.get(image_id)
+
+    def path(self, image_id: str) -> str | None:
+        """
+        File path for disk stores (lets the web server stream the file), else None.
+        """
+        if not self.directory or not self.valid_id(image_id):
+            return None
+        return os.path.join(self.directory, image_id)
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_s
+            self.sweep(now)
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self, now: float | None = None) -> int:
+        """
+        Apply the disk bounds (other workers may sweep the same directory). Returns files removed.
+        """
+        if not self.directory:
+            return 0
+        now = now or time.time()
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            expired = self.ttl and now - mtime > self.ttl
+            if not expired and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.evicted += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {"disk": bool(self.directory), "disk_evicted": self.evicted, **self._mem.stats()}
+
+
+image_store = ImageStore(
+    max_bytes=int(float(os.getenv("IMAGE_STORE_MAX_MB", "256")) * 1024 * 1024),
+    directory=os.getenv("IMAGE_STORE_DIR"),
+    ttl=float(os.getenv("IMAGE_STORE_TTL_S", "604800")) or None,
+    sweep_s=float(os.getenv("IMAGE_STORE_SWEEP_S", "60")),
+)
@@ -1,10 +1,17 @@
 import base64
 import logging
+import os
+from functools import lru_cache
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 
 logger = logging.getLogger(__name__)
 
+# Output codec for rendered images: png | webp | jpeg
+RENDER_FORMAT = os.getenv("RENDER_FORMAT", "png").lower()
+RENDER_QUALITY = int(os.getenv("RENDER_QUALITY", "85"))
+RENDER_PNG_OPTIMIZE = os.getenv("RENDER_PNG_OPTIMIZE", "").lower() in ("1", "true", "yes")
+
 def extract_image_from_response(response):
     try:
         for cand in response.candidates:
@@ -15,53 +22,134 @@ def extract_image_from_response(response):
         logger.error(f"Image extraction failed: {e}")
     return None
 
+def sniff_mime(raw_bytes: bytes) -> str:
+    if raw_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if raw_bytes[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if raw_bytes[:4] == b"RIFF" and raw_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if raw_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
 def to_data_url(raw_bytes: bytes) -> str:
-    return "data:image/png;base64," + base64.b64encode(raw_bytes).decode("utf-8")
+    return f"data:{sniff_mime(raw_bytes)};base64," + base64.b64encode(raw_bytes).decode("utf-8")
 
 def _parse_hhmm(s: str) -> int:
     # "09:30" -> minutes since 00:00
     h, m = s.split(":")
     return int(h) * 60 + int(m)
 
-def render_schedule_image(schedule, base_image_bytes: bytes | None = None) -> str:
-    """
-    schedule: list of {start:"HH:MM", end:"HH:MM", activity:"..."}
-    base_image_bytes: optional PNG/JPEG bytes (we'll draw over it)
-    returns: data:image/png;base64,...
-    """
-    W, H = 900, 600
+# ---------- schedule renderer ----------
+W, H = 900, 600
+# Timeline area
+LEFT, TOP, RIGHT, BOTTOM = 40, 80, W - 40, H - 40
 
-    if base_image_bytes:
-        try:
-            img = Image.open(BytesIO(base_image_bytes)).convert("RGB").resize((W, H))
-        except Exception:
-            img = Image.new("RGB", (W, H), "white")
-    else:
-        img = Image.new("RGB", (W, H), "white")
-
-    draw = ImageDraw.Draw(img)
-
-    # Fonts (fallback safe)
+@lru_cache(maxsize=1)
+def _fonts():
+    # Fonts (fallback safe), loaded once per process
     try:
-        font_title = ImageFont.truetype("arial.ttf", 28)
-        font_text = ImageFont.truetype("arial.ttf", 18)
-        font_small = ImageFont.truetype("arial.ttf", 14)
+        return (
+            ImageFont.truetype("arial.ttf", 28),
+            ImageFont.truetype("arial.ttf", 18),
+            ImageFont.truetype("arial.ttf", 14),
+        )
     except Exception:
-        font_title = ImageFont.load_default()
-        font_text = ImageFont.load_default()
-        font_small = ImageFont.load_default()
+        default = ImageFont.load_default()
+        return default, default, default
 
-    # Header
+@lru_cache(maxsize=1)
+def _template_layer():
+    """
+    Transparent layer with the static parts: header + background panel.
+    """
+    font_title, _, _ = _fonts()
+    layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
     draw.text((30, 20), "OMNI — AI Daily Schedule", fill="black", font=font_title)
+    draw.rounded_rectangle((LEFT, TOP, RIGHT, BOTTOM), radius=18, outline="black", width=2)
+    return layer
+
+@lru_cache(maxsize=1)
+def _blank_canvas():
+    # plain white canvas with the template already applied
+    img = Image.new("RGB", (W, H), "white")
+    layer = _template_layer()
+    img.paste(layer, (0, 0), layer)
+    return img
+
+@lru_cache(maxsize=32)
+def _tick_label(hh: int):
+    """
+    Transparent "HH:00" label and its (x, y) offset from the text origin; a few hundred bytes each.
+    """
+    _, _, font_small = _fonts()
+    text = f"{hh:02d}:00"
+    x0, y0, x1, y1 = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox((0, 0), text, font=font_small)
+    label = Image.new("RGBA", (max(1, x1 - x0), max(1, y1 - y0)), (0, 0, 0, 0))
+    ImageDraw.Draw(label).text((-x0, -y0), text, fill="black", font=font_small)
+    return label, (x0, y0)
+
+def _draw_ticks(img, day_start: int, day_end: int) -> None:
+    # hour ticks for a time range (minutes); lines are cheap, the rasterized labels are cached
+    total = max(1, day_end - day_start)
+    draw = ImageDraw.Draw(img)
+    for t in range(day_start, day_end + 1, 60):
+        y = TOP + int((t - day_start) / total * (BOTTOM - TOP))
+        draw.line((LEFT, y, RIGHT, y), fill="#dddddd", width=1)
+        label, (dx, dy) = _tick_label(t // 60)
+        img.paste(label, (LEFT + 10 + dx, y - 10 + dy), label)
 
-    # Timeline area
-    left = 40
-    top = 80
-    right = W - 40
-    bottom = H - 40
+def encode_image(img, fmt: str | None = None, quality: int | None = None) -> bytes:
+    """
+    fmt: "png" (optionally optimized, RENDER_PNG_OPTIMIZE), "webp" or "jpeg"; default RENDER_FORMAT
+    quality: 1-100 for webp/jpeg; default RENDER_QUALITY
+    """
+    fmt = (fmt or RENDER_FORMAT).lower()
+    quality = quality or RENDER_QUALITY
+    buf = BytesIO()
+    if fmt == "webp":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    elif fmt in ("jpeg", "jpg"):
+        img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
+    else:
+        img.save(buf, format="PNG", optimize=RENDER_PNG_OPTIMIZE)
+    return buf.getvalue()
+
+def transcode_image(raw: bytes, fmt: str, quality: int | None = None, max_side: int | None = None) -> bytes:
+    """
+    Re-encode image bytes with encode_image, downscaling so the longest side is <= max_side.
+    """
+    img = Image.open(BytesIO(raw))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+    return encode_image(img, fmt, quality)
+
+def render_schedule_image(schedule, base_image_bytes: bytes | None = None, base_image=None,
+                          fmt: str | None = None, quality: int | None = None) -> bytes:
+    """
+    schedule: list of {start:"HH:MM", end:"HH:MM", activity:"..."}
+    base_image_bytes: optional PNG/JPEG bytes (we'll draw over it)
+    base_image: optional decoded 900x600 RGB image (e.g. from the background cache), left untouched
+    fmt / quality: output codec, see encode_image
+    returns: encoded image bytes
+    """
+    base = base_image
+    if base is None and base_image_bytes:
+        try:
+            base = Image.open(BytesIO(base_image_bytes)).convert("RGB").resize((W, H))
+        except Exception:
+            base = None
 
-    # Background panel
-    draw.rounded_rectangle((left, top, right, bottom), radius=18, outline="black", width=2)
+    if base is None:
+        img = _blank_canvas().copy()
+    else:
+        img = base.copy()
+        layer = _template_layer()
+        img.paste(layer, (0, 0), layer)
 
     # Determine time range from schedule
     starts = [_parse_hhmm(x["start"]) for x in schedule]
@@ -70,28 +158,39 @@ def render_schedule_image(schedule, base_image_bytes: bytes | None = None) -> st
     day_end = max(ends) if ends else 17 * 60
     total = max(1, day_end - day_start)
 
-    # Draw hour ticks
-    for t in range(day_start, day_end + 1, 60):
-        y = top + int((t - day_start) / total * (bottom - top))
-        draw.line((left, y, right, y), fill="#dddddd", width=1)
-        hh = t // 60
-        draw.text((left + 10, y - 10), f"{hh:02d}:00", fill="black", font=font_small)
+    _draw_ticks(img, day_start, day_end)
+
+    # Draw blocks (the only per-request drawing)
+    draw = ImageDraw.Draw(img)
+    _, font_text, _ = _fonts()
+    block_left = LEFT + 120
+    block_right = RIGHT - 20
 
-    # Draw blocks
     for item in schedule:
         s = _parse_hhmm(item["start"])
         e = _parse_hhmm(item["end"])
-        y1 = top + int((s - day_start) / total * (bottom - top))
-        y2 = top + int((e - day_start) / total * (bottom - top))
+        y1 = TOP + int((s - day_start) / total * (BOTTOM - TOP))
+        y2 = TOP + int((e - day_start) / total * (BOTTOM - TOP))
         y2 = max(y2, y1 + 28)  # ensure visible
 
-        block_left = left + 120
-        block_right = right - 20
-
         draw.rounded_rectangle((block_left, y1 + 2, block_right, y2 - 2), radius=14, outline="black", width=2, fill="#f7f7f7")
         draw.text((block_left + 14, y1 + 8), f"{item['start']}–{item['end']}  {item['activity']}", fill="black", font=font_text)
 
-    # Export
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return to_data_url(buf.getvalue())
+    return encode_image(img, fmt, quality)
+
+def compose_images(images, labels=(), columns: int = 4, fmt: str | None = None, quality: int | None = None) -> bytes:
+    """
+    Tile encoded W x H images into one grid image, each with an optional label in its header.
+    """
+    _, font_text, _ = _fonts()
+    columns = max(1, min(columns, len(images)))
+    rows = (len(images) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * W, rows * H), "white")
+    for k, raw in enumerate(images):
+        tile = Image.open(BytesIO(raw)).convert("RGB")
+        if tile.size != (W, H):
+            tile = tile.resize((W, H))
+        if k < len(labels):
+            ImageDraw.Draw(tile).text((W - 240, 30), str(labels[k]), fill="black", font=font_text)
+        sheet.paste(tile, ((k % columns) * W, (k // columns) * H))
+    return encode_image(sheet, fmt, quality)
@@ -0,0 +1,147 @@
+import json
+import re
+
+# characters the scanner reacts to; everything else is skipped in bulk
+_STRUCTURAL = re.compile(r'["{}\[\]:]')
+_IN_STRING = re.compile(r'["\\]')
+
+
+class JSONObjectScanner:
+    """
+    Incremental, brace/string-aware scanner for the first balanced JSON object in
+    streamed text (model output with prose, code fences or trailing braces around it).
+
+    feed(text) consumes the next chunk in O(len(chunk)) and returns the entries of
+    `array_key` (a top-level array of objects) that completed in that chunk.
+    `done` turns True as soon as the top-level object closes; value() parses it.
+    """
+
+    def __init__(self, array_key: str | None = None):
+        self.array_key = array_key
+        self.buf = ""
+        self.start = None      # index of the top-level "{"
+        self.end = None        # index after the matching "}"
+        self._pos = 0
+        self._stack = []       # open containers: "{" / "["
+        self._keys = []        # per container: last key (objects) / key of the array
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._entry_start = None
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def feed(self, text: str) -> list:
+        if self.done or not text:
+            return []
+        self.buf += text
+        entries = []
+        buf = self.buf
+        i = self._pos
+        n = len(buf)
+
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _IN_STRING.search(buf, i)
+                if m is None:
+                    i = n
+                    break
+                i = m.start()
+                if buf[i] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    self._last_string = buf[self._string_start:i]
+                i += 1
+                continue
+
+            if self.start is None:
+                # prose before the object: only look for the opening brace
+                i = buf.find("{", i)
+                if i < 0:
+                    i = n
+                    break
+                self.start = i
+                self._stack.append("{")
+                self._keys.append(None)
+                i += 1
+                continue
+
+            m = _STRUCTURAL.search(buf, i)
+            if m is None:
+                i = n
+                break
+            i = m.start()
+            ch = buf[i]
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ":":
+                if self._stack[-1] == "{":
+                    self._keys[-1] = self._last_string
+            elif ch == "{" or ch == "[":
+                if ch == "{" and self._in_entry_array():
+                    self._entry_start = i
+                # arrays remember the key they belong to
+                key = self._keys[-1] if ch == "[" and self._stack[-1] == "{" else None
+                self._stack.append(ch)
+                self._keys.append(key)
+            else:
+                self._stack.pop()
+                self._keys.pop()
+                if not self._stack:
+                    self.end = i + 1
+                    break
+                if ch == "}" and self._entry_start is not None and self._in_entry_array():
+                    entries.append(_loads(buf[self._entry_start:i + 1]))
+                    self._entry_start = None
+            i += 1
+
+        self._pos = i + 1 if self.done else i
+        return entries
+
+    def value(self):
+        if not self.done:
+            raise ValueError("JSON object is not complete.")
+        return _loads(self.buf[self.start:self.end])
+
+    def _in_entry_array(self) -> bool:
+        # directly inside the top-level array named array_key
+        return (
+            self.array_key is not None
+            and len(self._stack) == 2
+            and self._stack[1] == "["
+            and self._keys[1] == self.array_key
+        )
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in model output: {e}") from e
+
+
+def first_object(text: str):
+    """
+    Parse the first balanced {...} in text that is valid JSON.
+    """
+    offset = 0
+    while True:
+        scanner = JSONObjectScanner()
+        scanner.feed(text[offset:])
+        if not scanner.done:
+            raise ValueError("No JSON object found in Gemini output.")
+        try:
+            return scanner.value()
+        except ValueError:
+            # e.g. "{braces}" in prose before the real object: try the next one
+            offset += scanner.start + 1
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class LimiterFullError(RuntimeError):
+    pass
+
+
+class ModelLimiter:
+    """
+    Process-wide cap on concurrent model calls with a bounded FIFO wait queue.
+
+    Threads (Flask / WSGI) and coroutines (ASGI) share the same slots:
+    - at most `max_concurrency` calls run at once
+    - at most `max_waiting` callers queue for a slot; beyond that LimiterFullError
+    - a queued caller gives up with LimiterFullError after `wait_timeout` seconds
+    A released slot is handed straight to the oldest waiter.
+    """
+
+    def __init__(self, max_concurrency: int, max_waiting: int, wait_timeout: float | None = None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_waiting = max(0, int(max_waiting))
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._waiters = deque()  # threading.Event | (loop, future)
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _acquire_or_enqueue(self, waiter) -> bool:
+        with self._lock:
+            if self.in_flight < self.max_concurrency and not self._waiters:
+                self.in_flight += 1
+                return True
+            if len(self._waiters) >= self.max_waiting:
+                self.rejected += 1
+                raise LimiterFullError("Too many model calls queued")
+            self._waiters.append(waiter)
+            return False
+
+    def _dequeue(self, waiter) -> bool:
+        """
+        Drop a waiter that gave up. False if it was granted a slot in the meantime.
+        """
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            # slot passes to the next waiter, in_flight is unchanged
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, fut = waiter
+            loop.call_soon_threadsafe(_grant, fut)
+
+    def acquire(self) -> None:
+        event = threading.Event()
+        if self._acquire_or_enqueue(event):
+            return
+        if not event.wait(self.wait_timeout) and self._dequeue(event):
+            with self._lock:
+                self.timeouts += 1
+            raise LimiterFullError("Timed out waiting for a model slot")
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        if self._acquire_or_enqueue(waiter):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.wait_timeout)
+        except asyncio.TimeoutError:
+            if self._dequeue(waiter):
+                with self._lock:
+                    self.timeouts += 1
+                raise LimiterFullError("Timed out waiting for a model slot")
+            # granted just as we timed out: keep the slot
+        except asyncio.CancelledError:
+            if not self._dequeue(waiter):
+                self.release()
+            raise
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def _grant(fut) -> None:
+    if not fut.done():
+        fut.set_result(None)
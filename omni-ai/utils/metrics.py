@@ -0,0 +1,161 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0)
+
+_lock = threading.Lock()
+_stages = {}    # stage -> [bucket counts..., +Inf count, sum]
+_counters = {}  # (name, sorted label items) -> value
+_help = {}      # counter name -> help text
+_caches = {}    # name -> object with stats() -> {"size", "hits", "misses", ...}
+
+# Per-request breakdown {stage: seconds}, shared by the threads / tasks working for one request
+_trace = contextvars.ContextVar("omni_trace", default=None)
+
+
+# ---------- recording ----------
+def observe(stage: str, seconds: float) -> None:
+    i = 0
+    while i < len(BUCKETS) and seconds > BUCKETS[i]:
+        i += 1
+    with _lock:
+        hist = _stages.get(stage)
+        if hist is None:
+            hist = _stages[stage] = [0] * (len(BUCKETS) + 1) + [0.0]
+        hist[i] += 1
+        hist[-1] += seconds
+        trace = _trace.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + seconds
+
+@contextmanager
+def timer(stage: str):
+    """
+    Time the block into the `stage` histogram (and the current request trace), also when it raises.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+def timed(stage: str):
+    """
+    Decorator form of timer().
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def inc(name: str, value: float = 1, help: str = "", **labels) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        if help:
+            _help.setdefault(name, help)
+
+def register_cache(name: str, cache) -> None:
+    """
+    Export a cache's hit/miss/size stats (read at scrape time).
+    """
+    if cache is not None:
+        _caches[name] = cache
+
+
+# ---------- per-request trace ----------
+def start_trace():
+    """
+    Start collecting a stage breakdown for the current request. Returns a token for end_trace().
+    """
+    return _trace.set({})
+
+def end_trace(token) -> dict:
+    trace = _trace.get() or {}
+    _trace.reset(token)
+    return trace
+
+def bind(fn):
+    """
+    fn wrapped to run in the caller's context, so stages timed in executor threads
+    land in the caller's request trace.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+def server_timing(trace: dict) -> str:
+    """
+    Server-Timing header value, durations in milliseconds.
+    """
+    return ", ".join(f"{stage.replace(':', '_')};dur={seconds * 1000:.1f}" for stage, seconds in trace.items())
+
+
+# ---------- exposition ----------
+def _labels(items) -> str:
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(sampled=()) -> str:
+    """
+    Prometheus text exposition of all metrics.
+    sampled: extra (name, type, help, [(labels dict, value), ...]) families read by the caller
+    from its own stats (counter or gauge).
+    """
+    with _lock:
+        stages = {stage: list(hist) for stage, hist in _stages.items()}
+        counters = dict(_counters)
+        helps = dict(_help)
+
+    lines = [
+        "# HELP omni_stage_seconds Time spent per processing stage.",
+        "# TYPE omni_stage_seconds histogram",
+    ]
+    for stage in sorted(stages):
+        hist = stages[stage]
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), hist):
+            cumulative += count
+            lines.append(f"omni_stage_seconds_bucket{_labels([('stage', stage), ('le', bound)])} {cumulative}")
+        lines.append(f"omni_stage_seconds_sum{_labels([('stage', stage)])} {hist[-1]!r}")
+        lines.append(f"omni_stage_seconds_count{_labels([('stage', stage)])} {cumulative}")
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# HELP {name} {helps.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(labels)} {_num(value)}")
+
+    cache_families = (
+        ("omni_cache_hits_total", "counter", "Cache hits.", "hits"),
+        ("omni_cache_misses_total", "counter", "Cache misses.", "misses"),
+        ("omni_cache_entries", "gauge", "Entries held by the cache.", "size"),
+    )
+    cache_stats = {name: cache.stats() for name, cache in sorted(_caches.items())}
+    for metric, kind, text, field in cache_families:
+        lines.append(f"# HELP {metric} {text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, stats in cache_stats.items():
+            lines.append(f"{metric}{_labels([('cache', name)])} {_num(stats.get(field, 0))}")
+
+    for metric, kind, text, samples in sampled:
+        lines.append(f"# HELP {metric} {text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in samples:
+            lines.append(f"{metric}{_labels(sorted(labels.items()))} {_num(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+import atexit
+import logging
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from utils.image_utils import compose_images, render_schedule_image, transcode_image
+
+logger = logging.getLogger(__name__)
+
+# inline: render on the request thread | process: render in a pool of worker processes
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "inline").lower()
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+# jobs queued or running at once; further callers block until a slot frees up
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", str(4 * RENDER_WORKERS)))
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, RENDER_MAX_PENDING))
+_shared_dir = None
+
+
+# ---------- worker side ----------
+# Base images are shared as raw RGB files and mapped read-only, once per worker and key
+_worker_bases = OrderedDict()
+
+def _mapped_base(path: str, size):
+    img = _worker_bases.get(path)
+    if img is None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        img = Image.frombuffer("RGB", size, mm, "raw", "RGB", 0, 1)
+        _worker_bases[path] = img
+        if len(_worker_bases) > 16:
+            _worker_bases.popitem(last=False)
+    else:
+        _worker_bases.move_to_end(path)
+    return img
+
+def _render_job(schedule, base_path, base_raw, size, fmt, quality) -> bytes:
+    base = None
+    if base_path:
+        base = _mapped_base(base_path, size)
+    elif base_raw:
+        base = Image.frombuffer("RGB", size, base_raw, "raw", "RGB", 0, 1)
+    # render_schedule_image copies the base before drawing
+    return render_schedule_image(schedule, base_image=base, fmt=fmt, quality=quality)
+
+
+# ---------- parent side ----------
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, RENDER_WORKERS), mp_context=multiprocessing.get_context("fork"))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _share_base(img):
+    """
+    Write a cached (RGB) background once as raw bytes; workers map it instead of receiving a copy per job.
+    Returns (path, None), or (None, raw bytes) for images without a cache key.
+    """
+    global _shared_dir
+    key = img.info.get("cache_key")
+    if not key:
+        return None, img.tobytes()
+
+    with _pool_lock:
+        if _shared_dir is None:
+            _shared_dir = tempfile.mkdtemp(prefix="omni-render-")
+            atexit.register(shutil.rmtree, _shared_dir, True)
+
+    path = os.path.join(_shared_dir, f"{key}.rgb")
+    if not os.path.exists(path):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(img.tobytes())
+        os.replace(tmp, path)
+    return path, None
+
+def _run(fn, *args):
+    with _slots:
+        try:
+            return _get_pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            logger.error("Render pool broke; rendering inline and restarting the pool")
+            _reset_pool()
+            return fn(*args)
+
+def render_schedule(schedule, base_image=None, fmt: str | None = None, quality: int | None = None) -> bytes:
+    """
+    render_schedule_image on the configured backend. Returns encoded bytes.
+    """
+    if RENDER_BACKEND != "process":
+        return render_schedule_image(schedule, base_image=base_image, fmt=fmt, quality=quality)
+
+    base_path, base_raw = (None, None)
+    size = None
+    if base_image is not None:
+        base_path, base_raw = _share_base(base_image)
+        size = base_image.size
+    return _run(_render_job, schedule, base_path, base_raw, size, fmt, quality)
+
+def transcode(raw: bytes, fmt: str, quality: int | None = None, max_side: int | None = None) -> bytes:
+    """
+    transcode_image on the configured backend.
+    """
+    if RENDER_BACKEND != "process":
+        return transcode_image(raw, fmt, quality, max_side)
+    return _run(transcode_image, raw, fmt, quality, max_side)
+
+def compose(images, labels=(), columns: int = 4, fmt: str | None = None, quality: int | None = None) -> bytes:
+    """
+    compose_images on the configured backend.
+    """
+    if RENDER_BACKEND != "process":
+        return compose_images(images, labels, columns, fmt, quality)
+    return _run(compose_images, list(images), list(labels), columns, fmt, quality)
+
+def start() -> None:
+    """
+    Fork the workers now, before the app starts its own threads.
+    """
+    if RENDER_BACKEND == "process":
+        _get_pool().submit(int).result()
+
+
+start()
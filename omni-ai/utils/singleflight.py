@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import json
+import threading
+
+_registry = {}
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs fn,
+    the others wait and share its result (or its exception).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._acalls = {}  # key -> asyncio.Future, for ado()
+        self._lock = threading.Lock()
+        self.calls = 0       # upstream executions
+        self.coalesced = 0   # callers that shared another caller's execution
+        _registry[name] = self
+
+    def do(self, key: str, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key: str, fn, *args, **kwargs):
+        """
+        do() for coroutine functions, on the running event loop.
+        """
+        with self._lock:
+            fut = self._acalls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._acalls[key] = asyncio.get_running_loop().create_future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # shield: a follower going away must not cancel the shared call
+            return await asyncio.shield(fut)
+
+        try:
+            result = await fn(*args, **kwargs)
+            fut.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            with self._lock:
+                del self._acalls[key]
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls) + len(self._acalls)}
+
+
+def canonical_key(payload) -> str:
+    """
+    Stable hash of a JSON-like payload (key order and whitespace do not matter).
+    """
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def stats() -> dict:
+    return {name: flight.stats() for name, flight in _registry.items()}